@@ -0,0 +1,33 @@
+from django.urls import URLPattern, URLResolver
+
+from . import async_views
+
+# Router route name -> the async view serving it under ASYNC_READ_VIEWS
+ASYNC_VIEWS = {
+    'offers-list': async_views.offer_list,
+    'offers-detail': async_views.offer_detail,
+    'projects-list': async_views.project_list,
+    'projects-detail': async_views.project_detail,
+    'organizations-list': async_views.organization_list,
+    'organizations-detail': async_views.organization_detail,
+    'recenzja-list': async_views.review_list,
+    'volunteers-me': async_views.me,
+}
+
+
+def with_async_views(patterns):
+    """
+    ``patterns`` with the routes named in ASYNC_VIEWS served by the async views: same paths
+    and names (format suffixes included), in place of the viewset routes rather than in
+    front of them, so every name still has one target and reverse() is unaffected.
+    """
+    result = []
+    for entry in patterns:
+        if isinstance(entry, URLResolver) and entry.namespace is None:
+            entry = URLResolver(
+                entry.pattern, with_async_views(entry.url_patterns), entry.default_kwargs, entry.app_name, entry.namespace,
+            )
+        elif isinstance(entry, URLPattern) and entry.name in ASYNC_VIEWS:
+            entry = URLPattern(entry.pattern, ASYNC_VIEWS[entry.name], entry.default_args, entry.name)
+        result.append(entry)
+    return result
@@ -0,0 +1,216 @@
+"""
+Async read path of the ASGI application (ASYNC_READ_VIEWS, see wolontariat/asgi_urls.py).
+
+GET requests for the offer, project and organization listings and details, the review
+listing and the current profile are answered here. Their queries go through Django's async
+ORM (acount, aaggregate, aget, async for), so a request waiting for the database is
+suspended instead of holding a worker. What is synchronous underneath (DRF's
+authentication, permissions and content negotiation, the caches, serializers over model
+instances) runs in a thread with sync_to_async. The responses are those of the viewsets,
+with the same ETags and X-Cache headers; the parity tests in api/tests.py compare them.
+
+Everything else on these URLs (writes, HEAD, the browsable API, ?expand=, cursor
+pagination, invalid pages) is handed to the viewset, so every URL keeps a single
+behaviour. Errors of the read path itself (authentication, permissions, 404) are answered
+through the viewset's handle_exception(), as its dispatch would.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from wolontariat import response_cache
+
+from .caching import ResponseCacheMixin
+from .conditional import ConditionalGetMixin, conditional_response, content_etag, set_validators
+from .pagination import KeysetPagination, OptInCursorPagination
+from .projections import ProjectedListMixin
+from .renderers import ORJSONRenderer
+from .serializers import UzytkownikSerializer
+from .views import OfertaViewSet, OrganizacjaViewSet, ProjektViewSet, RecenzjaViewSet, UzytkownikViewSet
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+
+def async_read_view(viewset, actions, basename, read, detail=False):
+    """
+    The URL of ``viewset`` routed to ``actions``, as the router would mount it, with GET
+    answered by ``read(view, request)``: a coroutine returning the Response, or None to
+    leave the request to the viewset.
+    """
+    initkwargs = {'basename': basename, 'detail': detail}
+    # As the router: @action keyword arguments, or the suffix of the standard routes
+    initkwargs.update(getattr(getattr(viewset, actions['get']), 'kwargs', {'suffix': 'Instance' if detail else 'List'}))
+    fallback = sync_to_async(viewset.as_view(actions, **initkwargs))
+
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            response = await _read(viewset(**initkwargs), actions['get'], read, request, kwargs)
+            if response is not None:
+                return response
+        return await fallback(request, *args, **kwargs)
+
+    # Read by the browsable API's breadcrumbs, as on the router's views
+    view.cls, view.initkwargs, view.actions = viewset, initkwargs, actions
+    # Writes go to the viewset, which does its own CSRF checks (SessionAuthentication)
+    return csrf_exempt(view)
+
+
+async def _read(view, action, read, request, kwargs):
+    # What APIView.dispatch sets up before calling the action
+    view.action_map = {'get': action}
+    view.args, view.kwargs = (), kwargs
+    request = view.initialize_request(request, **kwargs)
+    view.request = request
+    view.headers = view.default_response_headers
+    try:
+        await sync_to_async(view.initial)(request)
+        if not isinstance(request.accepted_renderer, ORJSONRenderer):
+            return None
+        response = await read(view, request)
+    except (APIException, Http404) as exc:
+        # Denied, not found...: answered here as dispatch would, not by running the viewset again
+        response = await sync_to_async(view.handle_exception)(exc)
+    if response is None:
+        return None
+    return view.finalize_response(request, response)
+
+
+async def _respond(view, request, queryset, build, detail=False):
+    """``build()`` inside the conditional GET and the response cache, in the order the viewsets apply them."""
+    etag = last_modified = None
+    if isinstance(view, ConditionalGetMixin):
+        if detail:
+            version = await queryset.order_by().aaggregate(**view.version_aggregates())
+        else:
+            version = await sync_to_async(view.list_version)()
+        # A missing object gets no validators: build() answers 404
+        if not detail or version['count_0']:
+            etag, last_modified = view.validators(version, detail)
+            not_modified = conditional_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+    key = data = None
+    if isinstance(view, ResponseCacheMixin):
+        key, data = await sync_to_async(_cache_lookup)(view, request)
+    if data is not None:
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+    else:
+        response = await build()
+        if response is None:
+            return None
+        if key is not None and response.status_code == 200:
+            await sync_to_async(response_cache.store)(key, response.data)
+            response['X-Cache'] = 'MISS'
+
+    if etag is not None and response.status_code == 200:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def _cache_lookup(view, request):
+    key = view.response_cache_key(request)
+    return key, response_cache.lookup(key) if key is not None else None
+
+
+async def _paginated(view, request, queryset, serialize):
+    """PageNumberPagination's response, counted and sliced with the async ORM; None for an invalid page."""
+    paginator = view.paginator
+    page_size = paginator.get_page_size(request) if paginator is not None else None
+    if page_size is None:
+        return Response(await serialize([row async for row in queryset]))
+
+    number = request.query_params.get(paginator.page_query_param, '1')
+    if not (number.isascii() and number.isdigit()):
+        return None
+    number = int(number)
+    count = await queryset.acount()
+    # An empty listing still has its first page (Paginator's allow_empty_first_page)
+    pages = max(1, math.ceil(count / page_size))
+    if not 1 <= number <= pages:
+        return None
+    bottom = (number - 1) * page_size
+    page = [row async for row in queryset[bottom:min(bottom + page_size, count)]]
+
+    url = request.build_absolute_uri()
+    param = paginator.page_query_param
+    next_link = replace_query_param(url, param, number + 1) if number < pages else None
+    previous_link = None
+    if number > 1:
+        previous_link = remove_query_param(url, param) if number == 2 else replace_query_param(url, param, number - 1)
+    return Response({'count': count, 'next': next_link, 'previous': previous_link, 'results': await serialize(page)})
+
+
+async def _list(view, request):
+    params = request.query_params
+    if params.get(OptInCursorPagination.mode_query_param) == 'cursor' or KeysetPagination.cursor_query_param in params:
+        return None
+    queryset = view.filter_queryset(view.get_queryset())
+
+    if isinstance(view, ProjectedListMixin):
+        if not view.uses_projection(request):
+            return None
+        projection = view.list_projection
+        rows = projection.rows(queryset)
+
+        async def serialize(page):
+            fetched = {}
+            if hasattr(projection, 'participants'):
+                fetched['zlecenia'] = [row async for row in projection.participants(page)] if page else []
+            return view.projected_data(request, page, **fetched)
+
+        build = lambda: _paginated(view, request, rows, serialize)
+    else:
+        async def serialize(page):
+            return await sync_to_async(lambda: view.get_serializer(page, many=True).data)()
+
+        build = lambda: _paginated(view, request, queryset, serialize)
+    return await _respond(view, request, queryset, build)
+
+
+async def _retrieve(view, request):
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    try:
+        queryset = view.filter_queryset(view.get_queryset()).filter(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+    async def build():
+        try:
+            instance = await queryset.aget()
+        except ObjectDoesNotExist:
+            # get_object()'s 404
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        view.check_object_permissions(request, instance)
+        return Response(await sync_to_async(lambda: view.get_serializer(instance).data)())
+
+    return await _respond(view, request, queryset, build, detail=True)
+
+
+async def _me(view, request):
+    data = await sync_to_async(lambda: UzytkownikSerializer(request.user, context=view.get_serializer_context()).data)()
+    etag = content_etag(data)
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    response = Response(data)
+    set_validators(response, etag)
+    return response
+
+
+offer_list = async_read_view(OfertaViewSet, LIST_ACTIONS, 'offers', _list)
+offer_detail = async_read_view(OfertaViewSet, DETAIL_ACTIONS, 'offers', _retrieve, detail=True)
+project_list = async_read_view(ProjektViewSet, LIST_ACTIONS, 'projects', _list)
+project_detail = async_read_view(ProjektViewSet, DETAIL_ACTIONS, 'projects', _retrieve, detail=True)
+organization_list = async_read_view(OrganizacjaViewSet, {'get': 'list'}, 'organizations', _list)
+organization_detail = async_read_view(OrganizacjaViewSet, {'get': 'retrieve'}, 'organizations', _retrieve, detail=True)
+review_list = async_read_view(RecenzjaViewSet, LIST_ACTIONS, 'recenzja', _list)
+me = async_read_view(UzytkownikViewSet, {'get': 'me'}, 'volunteers', _me)
@@ -0,0 +1,87 @@
+"""
+Token authentication backed by the ``tokens`` cache.
+
+DRF's TokenAuthentication joins the token and its user on every request. Here the user's
+columns and their organization's are cached for TOKEN_CACHE_TIMEOUT seconds, so an
+authenticated request usually reaches the view without a query. The entries hold no
+credentials: not the token key (the request carries it) and not the password hash, which
+stays deferred on the rebuilt user and is loaded only if something reads it.
+
+Entries are dropped when the token is deleted (logout) and whenever the user or their
+organization is saved (see api/signals.py), so a deactivated user is rejected on the next
+request. QuerySet.update() sends no signals: after a bulk change of users (deactivating
+them, say) call forget_user_tokens() with their ids, or the cached entries stay valid
+until they expire.
+"""
+import hashlib
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from wolontariat.metrics import cache_lookup
+from wolontariat.models import Organizacja, Uzytkownik
+
+
+def token_cache():
+    return caches['tokens']
+
+
+def _cache_key(key):
+    # Keys are credentials: keep them out of the cache server's key space
+    return 'token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def forget_tokens(keys) -> None:
+    """Drop cached tokens now and again on commit, in case a request re-cached the old row meanwhile."""
+    cache_keys = [_cache_key(key) for key in keys]
+    if cache_keys:
+        token_cache().delete_many(cache_keys)
+        transaction.on_commit(lambda: token_cache().delete_many(cache_keys))
+
+
+def forget_user_tokens(user_ids) -> None:
+    forget_tokens(Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True))
+
+
+def _columns(instance, exclude=()):
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields if field.attname not in exclude}
+
+
+def _cache_entry(token):
+    user = token.user
+    return {
+        'created': token.created,
+        'user': _columns(user, exclude={'password'}),
+        'organizacja': _columns(user.organizacja) if user.organizacja_id else None,
+    }
+
+
+def _from_entry(key, entry):
+    user = Uzytkownik.from_db(DEFAULT_DB_ALIAS, list(entry['user']), list(entry['user'].values()))
+    if entry['organizacja'] is not None:
+        user.organizacja = Organizacja.from_db(DEFAULT_DB_ALIAS, list(entry['organizacja']), list(entry['organizacja'].values()))
+    token = Token(key=key, user=user, created=entry['created'])
+    token._state.adding, token._state.db = False, DEFAULT_DB_ALIAS
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        entry = token_cache().get(cache_key)
+        cache_lookup('tokens', entry is not None)
+        if entry is None:
+            try:
+                token = Token.objects.select_related('user__organizacja').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            token_cache().set(cache_key, _cache_entry(token))
+        else:
+            token = _from_entry(key, entry)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
@@ -0,0 +1,50 @@
+from rest_framework.response import Response
+
+from wolontariat import response_cache
+
+
+class ResponseCacheMixin:
+    """
+    Serve ``cached_actions`` from the response cache (wolontariat/response_cache.py).
+
+    The serialized data is cached, not the rendered bytes, so content negotiation and the
+    ETag headers of ConditionalGetMixin still apply. Views name the invalidation tags their
+    response depends on in ``response_cache_tags``; ``X-Cache`` tells whether it was a hit.
+    """
+    cached_actions = ('list',)
+
+    def use_response_cache(self, request):
+        return True
+
+    def response_cache_tags(self):
+        raise NotImplementedError
+
+    def response_cache_key(self, request):
+        """The cache key of this request's response, or None when it is not cached."""
+        if self.action not in self.cached_actions or not self.use_response_cache(request):
+            return None
+        view = (self.basename, self.action, self.kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        return response_cache.cache_key(view, request.query_params.lists(), self.response_cache_tags())
+
+    def _cached(self, request, handler, *args, **kwargs):
+        key = self.response_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+
+        data = response_cache.lookup(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.store(key, response.data)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, super().retrieve, *args, **kwargs)
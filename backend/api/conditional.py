@@ -0,0 +1,118 @@
+"""
+Conditional GET for read-mostly resources.
+
+A listing's version is the generation of the response cache tags it depends on (see
+wolontariat/response_cache.py): the writes that invalidate its cached responses bump them,
+so revalidating a list reads the cache and runs no query, however many rows it filters.
+A single object's version is one aggregate over its row and the related rows its
+representation shows: the latest ``updated_at`` plus row counts, so deletions change it
+too. When the client's ETag matches, the view answers 304 before the page is loaded or
+serialized.
+"""
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from wolontariat import response_cache
+
+
+def _quoted(digest):
+    # Weak: the version identifies the data, not the exact bytes of the rendering
+    return 'W/"%s"' % digest[:32]
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Browsers keep the response but revalidate it on every use; shared caches stay out
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+
+
+def conditional_response(request, etag, last_modified=None):
+    """304 (carrying the validators) when the request's validators match, otherwise None."""
+    headers = HttpResponse()
+    set_validators(headers, etag, last_modified)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp, response=headers)
+    return None if response is headers else response
+
+
+def content_etag(data):
+    """ETag of already serialized data, for small responses with no cheaper version (e.g. the current profile)."""
+    payload = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    return _quoted(hashlib.sha256(payload).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    ETag for ``list``, ETag / Last-Modified for ``retrieve``.
+
+    Lists are versioned by ``response_cache_tags`` (ResponseCacheMixin). For objects,
+    ``etag_timestamps`` name the ``updated_at`` columns (own and related) the serializer
+    depends on; ``etag_counts`` name what is counted, so removed related rows also produce
+    a new version.
+    """
+    etag_timestamps = ('updated_at',)
+    etag_counts = ('id',)
+
+    def version_aggregates(self):
+        aggregates = {f'max_{i}': Max(name) for i, name in enumerate(self.etag_timestamps)}
+        aggregates.update({f'count_{i}': Count(name, distinct=True) for i, name in enumerate(self.etag_counts)})
+        return aggregates
+
+    def list_version(self):
+        tags = self.response_cache_tags()
+        return dict(zip(tags, response_cache.generations(tags)))
+
+    def queryset_version(self, queryset):
+        return queryset.order_by().aggregate(**self.version_aggregates())
+
+    def version_etag(self, version):
+        request = self.request
+        key = '|'.join([request.build_absolute_uri(), request.accepted_media_type or '']
+                       + [str(version[name]) for name in sorted(version)])
+        return _quoted(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def validators(self, version, detail=False):
+        """(ETag, Last-Modified) of a version from ``list_version`` or ``queryset_version``."""
+        # Last-Modified only describes a single object: deleting from a list does not move it
+        last_modified = None
+        if detail:
+            timestamps = [version[f'max_{i}'] for i in range(len(self.etag_timestamps))]
+            last_modified = max(filter(None, timestamps), default=None)
+        return self.version_etag(version), last_modified
+
+    def _conditional(self, request, version, handler, *args, detail=False, **kwargs):
+        etag, last_modified = self.validators(version, detail)
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validators(response, etag, last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, self.list_version(), super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            return super().retrieve(request, *args, **kwargs)
+        version = self.queryset_version(queryset)
+        if not version['count_0']:
+            # Let the regular lookup produce the 404
+            return super().retrieve(request, *args, **kwargs)
+        return self._conditional(request, version, super().retrieve, *args, detail=True, **kwargs)
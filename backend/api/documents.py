@@ -0,0 +1,154 @@
+"""
+One response path for generated documents (certificate PDFs, ZIP exports).
+
+Files are streamed from storage instead of being read into memory. Under gunicorn a
+FileResponse over a real file goes out through ``os.sendfile``. Single byte ranges are
+honoured, and DOCUMENT_SENDFILE hands stored files to the front web server entirely.
+"""
+import hashlib
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) of a single ``Range: bytes=...`` header, or None when the whole
+    file should be sent (no header, or a form we do not serve such as multiple ranges).
+    """
+    match = _RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _content_type(filename, content_type=None):
+    return content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def _file_size(fh):
+    size = getattr(fh, 'size', None)
+    if size is None:
+        position = fh.tell()
+        size = fh.seek(0, 2)
+        fh.seek(position)
+    return size
+
+
+def _iter_range(fh, start, length):
+    with fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, fh, filename, content_type=None, etag=None):
+    """
+    Stream a seekable file object (storage file, spooled temp file or BytesIO) as an attachment,
+    with Content-Length and single-range (206) support. The file is closed by the response.
+    """
+    size = _file_size(fh)
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is not None and if_range != etag:
+        # The client's partial copy is of another version; send the whole file
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        fh.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(fh, as_attachment=True, filename=filename, content_type=content_type)
+        response.block_size = CHUNK_SIZE
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_range(fh, start, end - start + 1), status=206,
+            content_type=_content_type(filename, content_type),
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def stored_document_response(request, storage, name, filename, content_type=None):
+    """
+    Serve ``name`` from ``storage``. Stored documents never change under the same name (certificates
+    are content-addressed, exports are per job), so the name doubles as a strong ETag.
+    """
+    etag = '"%s"' % hashlib.sha256(name.encode('utf-8')).hexdigest()[:32]
+
+    if settings.DOCUMENT_SENDFILE:
+        response = _sendfile_response(storage, name, filename, content_type)
+        if response is not None:
+            response['ETag'] = etag
+            return response
+
+    try:
+        fh = storage.open(name, 'rb')
+    except FileNotFoundError:
+        raise Http404('Document is no longer available')
+    return file_response(request, fh, filename, content_type=content_type, etag=etag)
+
+
+def _sendfile_response(storage, name, filename, content_type):
+    """Empty response telling nginx (X-Accel-Redirect) or Apache/lighttpd (X-Sendfile) to send the file."""
+    response = HttpResponse(content_type=_content_type(filename, content_type))
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    if settings.DOCUMENT_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.DOCUMENT_SENDFILE_ROOT.rstrip('/') + '/' + quote(name)
+        return response
+    if settings.DOCUMENT_SENDFILE == 'x-sendfile':
+        try:
+            response['X-Sendfile'] = storage.path(name)
+        except NotImplementedError:
+            # Remote storage (e.g. S3): nothing on disk for the web server to send
+            return None
+        return response
+    return None
+
+
+def streaming_document_response(chunks, filename, content_type):
+    """Attachment produced on the fly (e.g. a ZIP assembled while it is sent); length is unknown."""
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
@@ -0,0 +1,67 @@
+"""
+GET /api/events/: the logged-in user's events (wolontariat/events.py) as server-sent events.
+
+A plain async Django view, not DRF: it has to stay suspended on the queue without holding a
+thread, which needs the ASGI application (wolontariat/asgi.py). EventSource cannot send
+headers, so besides ``Authorization: Token <key>`` the token may come as ``?token=<key>``.
+The token is checked against the database, not the ``tokens`` cache: a stream is opened once
+and kept for long, and a revoked token must not open one from a cache the revocation missed.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from wolontariat import events
+
+# Milliseconds EventSource waits before reconnecting
+RETRY = 3000
+
+
+def _authenticate(request):
+    authentication = TokenAuthentication()
+    credentials = authentication.authenticate(request)
+    if credentials is None and request.GET.get('token'):
+        credentials = authentication.authenticate_credentials(request.GET['token'])
+    if credentials is None:
+        raise exceptions.NotAuthenticated()
+    return credentials[0]
+
+
+async def event_stream(request):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would tie up a worker for as long as the client stays
+        return JsonResponse({'error': 'Events are served by the ASGI application only'}, status=501)
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except exceptions.APIException as exc:
+        return JsonResponse({'error': str(exc.detail)}, status=exc.status_code)
+
+    async def stream():
+        listener = events.listener()
+        queue = await listener.subscribe(user.pk)
+        try:
+            # Subscribed before the first byte: the client sees every event from here on
+            yield f'retry: {RETRY}\n\n'.encode()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(queue.get(), settings.EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    chunk = b': keep-alive\n\n'
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            listener.unsubscribe(user.pk, queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Unbuffered behind nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,199 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime, time, timezone
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# NULLs sort after every real value (Postgres' default for ASC), so a nullable ordering
+# column is keyed on COALESCE(column, <max>). The matching index must use the same expression.
+NULL_SENTINELS = {
+    models.DateField: date.max,
+    models.DateTimeField: datetime.combine(date.max, time.min, tzinfo=timezone.utc),
+}
+
+
+def keyset_expression(model, field_name):
+    """Expression a keyset is built on: the column itself, or a COALESCE for nullable columns."""
+    field = model._meta.get_field(field_name)
+    if not field.null:
+        return None
+    for field_class, sentinel in NULL_SENTINELS.items():
+        if isinstance(field, field_class):
+            return Coalesce(field_name, Value(sentinel))
+    raise ImproperlyConfigured(f"Cannot key a cursor on nullable field '{field_name}'.")
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a composite ordering such as ('data', 'id').
+
+    Unlike DRF's CursorPagination it compares the full ordering tuple, so pages stay
+    O(page_size) however many rows share the leading value, and it never runs COUNT(*).
+    The last ordering field must be unique.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        model = queryset.model
+
+        # (attribute, descending, model field) for every ordering component
+        self.keys = []
+        annotations = {}
+        for item in self.ordering:
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            field = model._meta.get_field(name)
+            expression = keyset_expression(model, name)
+            if expression is not None:
+                alias = f'_keyset_{name}'
+                annotations[alias] = expression
+                name = alias
+            self.keys.append((name, descending, field))
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+
+        values, self.reverse = self.decode_cursor(request)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values))
+
+        order_by = [('-' if descending != self.reverse else '') + name for name, descending, _ in self.keys]
+        rows = list(queryset.order_by(*order_by)[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = rows
+        return rows
+
+    def _seek(self, values):
+        """
+        Rows strictly after ``values`` in traversal order, expanded lexicographically:
+        (a > x) OR (a = x AND b > y) ... The redundant a >= x bound lets Postgres start
+        the index scan at the cursor instead of filtering from the first row.
+        """
+        seek = Q()
+        equal = Q()
+        for (name, descending, _), value in zip(self.keys, values):
+            op = 'lt' if descending != self.reverse else 'gt'
+            seek |= equal & Q(**{f'{name}__{op}': value})
+            equal &= Q(**{name: value})
+        lead_name, lead_descending, _ = self.keys[0]
+        lead_op = 'lte' if lead_descending != self.reverse else 'gte'
+        return Q(**{f'{lead_name}__{lead_op}': values[0]}) & seek
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values, reverse = payload['v'], bool(payload.get('r'))
+            if not isinstance(values, list) or len(values) != len(self.keys):
+                raise ValueError
+            # The values go straight into the seek filter: each must parse as its column's type.
+            # COALESCE keys have the column's type too, and never hold NULL.
+            values = [field.to_python(value) for (_, _, field), value in zip(self.keys, values)]
+            if None in values:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error, DjangoValidationError):
+            raise NotFound('Invalid cursor')
+        return values, reverse
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for name, _, _ in self.keys:
+            # Model instances, or dicts from the values() list path (api/projections.py)
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            values.append(value.isoformat() if isinstance(value, (date, datetime)) else value)
+        payload = {'v': values}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Page numbers by default (keeps `count` for existing clients). Sending
+    ``?pagination=cursor`` — or following a ``cursor`` link — switches the request to
+    keyset pagination on the view's ``cursor_ordering``, skipping COUNT(*) and OFFSET.
+    Search results are ordered by relevance, which a cursor cannot follow: with ``?search=``
+    cursor mode is refused rather than silently returning id order.
+    """
+    mode_query_param = 'pagination'
+    default_cursor_ordering = ('id',)
+
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if params.get(self.mode_query_param) == 'cursor' or KeysetPagination.cursor_query_param in params:
+            if 'search_rank' in queryset.query.annotations:
+                raise ValidationError({self.mode_query_param: 'Cursor pagination is not available for search results; use page numbers.'})
+            ordering = getattr(view, 'cursor_ordering', self.default_cursor_ordering)
+            self.keyset = KeysetPagination(ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class KeysetOnlyPagination(OptInCursorPagination):
+    """Always keyset pagination on the view's ``cursor_ordering``: for tables too big for COUNT(*) and OFFSET."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = KeysetPagination(getattr(view, 'cursor_ordering', self.default_cursor_ordering))
+        return self.keyset.paginate_queryset(queryset, request, view)
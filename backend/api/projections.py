@@ -0,0 +1,191 @@
+"""
+values()-based read path for the hot list endpoints.
+
+A ModelSerializer builds a model instance per row and runs every field object over it.
+Listings are flat enough to be read straight from ``values()`` rows instead, so each
+projection here selects exactly the columns its serializer shows and assembles the same
+dicts. The parity tests in api/tests.py compare every projection with its serializer.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from wolontariat.models import Zlecenie
+from wolontariat.performance import timed
+
+from .serializers import (
+    OfertaListSerializer, ProjektSerializer, RecenzjaSerializer, query_param_names,
+)
+
+# Field objects are stateless once configured; reused so dates render exactly as DRF does
+_DATE = serializers.DateField()
+_DATETIME = serializers.DateTimeField()
+
+_USER_COLUMNS = ('id', 'username', 'first_name', 'last_name', 'rola', 'wiek')
+
+
+def _date(value):
+    return None if value is None else _DATE.to_representation(value)
+
+
+def _datetime(value):
+    return None if value is None else _DATETIME.to_representation(value)
+
+
+def _user(row, prefix):
+    """UzytkownikListSerializer output from the ``prefix``-ed user columns of a row."""
+    wiek = row[prefix + 'wiek']
+    return {
+        'id': row[prefix + 'id'],
+        'username': row[prefix + 'username'],
+        'first_name': row[prefix + 'first_name'],
+        'last_name': row[prefix + 'last_name'],
+        'rola': row[prefix + 'rola'],
+        'czy_maloletni': wiek is not None and wiek < 18,
+    }
+
+
+class OfferListProjection:
+    serializer_class = OfertaListSerializer
+
+    def rows(self, queryset):
+        return queryset.select_related(None).prefetch_related(None).values(
+            'id', 'organizacja', 'organizacja__nazwa_organizacji', 'projekt', 'projekt__nazwa_projektu',
+            'tytul_oferty', 'lokalizacja', 'tematyka', 'czas_trwania', 'wymagania', 'data', 'data_wyslania',
+            'czy_ukonczone', 'max_uczestnikow', 'liczba_uczestnikow', 'liczba_potwierdzonych', 'liczba_ukonczonych',
+            *(f'wolontariusz__{column}' for column in _USER_COLUMNS),
+        )
+
+    def participants(self, rows):
+        """The Zlecenie rows of the offers in ``rows`` (a list), as ``data`` reads them."""
+        return (
+            Zlecenie.objects.filter(oferta_id__in=[row['id'] for row in rows]).order_by('id')
+            .values('oferta_id', 'czy_potwierdzone', 'czy_ukonczone', *(f'wolontariusz__{c}' for c in _USER_COLUMNS))
+        )
+
+    def data(self, rows, zlecenia=None):
+        """``zlecenia``: the rows of ``participants(rows)`` when fetched already (the async views)."""
+        rows = list(rows)
+        if zlecenia is None:
+            zlecenia = self.participants(rows) if rows else ()
+        participants = defaultdict(list)
+        for zlecenie in zlecenia:
+            participant = _user(zlecenie, 'wolontariusz__')
+            participant['czy_potwierdzone'] = zlecenie['czy_potwierdzone']
+            participant['czy_ukonczone'] = zlecenie['czy_ukonczone']
+            participants[zlecenie['oferta_id']].append(participant)
+
+        return [
+            {
+                'id': row['id'],
+                'organizacja': row['organizacja'],
+                'organizacja_nazwa': row['organizacja__nazwa_organizacji'],
+                'projekt': row['projekt'],
+                'projekt_nazwa': row['projekt__nazwa_projektu'],
+                'tytul_oferty': row['tytul_oferty'],
+                'lokalizacja': row['lokalizacja'],
+                'tematyka': row['tematyka'],
+                'czas_trwania': row['czas_trwania'],
+                'wymagania': row['wymagania'],
+                'data': _date(row['data']),
+                'data_wyslania': _datetime(row['data_wyslania']),
+                'wolontariusz': row['wolontariusz__id'],
+                'wolontariusz_info': _user(row, 'wolontariusz__') if row['wolontariusz__id'] is not None else None,
+                'wolontariusze': participants[row['id']],
+                'max_uczestnikow': row['max_uczestnikow'],
+                'liczba_uczestnikow': row['liczba_uczestnikow'],
+                'liczba_potwierdzonych': row['liczba_potwierdzonych'],
+                'liczba_ukonczonych': row['liczba_ukonczonych'],
+                'czy_ukonczone': row['czy_ukonczone'],
+            }
+            for row in rows
+        ]
+
+
+class ProjectListProjection:
+    serializer_class = ProjektSerializer
+
+    def rows(self, queryset):
+        return queryset.select_related(None).values(
+            'id', 'organizacja', 'organizacja__nazwa_organizacji', 'nazwa_projektu', 'opis_projektu', 'liczba_ofert',
+        )
+
+    def data(self, rows):
+        return [
+            {
+                'id': row['id'],
+                'organizacja': row['organizacja'],
+                'organizacja_nazwa': row['organizacja__nazwa_organizacji'],
+                'nazwa_projektu': row['nazwa_projektu'],
+                'opis_projektu': row['opis_projektu'],
+                'oferty_count': row['liczba_ofert'],
+            }
+            for row in rows
+        ]
+
+
+class ReviewListProjection:
+    serializer_class = RecenzjaSerializer
+
+    def rows(self, queryset):
+        return queryset.select_related(None).values(
+            'id', 'organizacja__nazwa_organizacji', 'wolontariusz__username', 'wolontariusz__rola',
+            'oferta', 'ocena', 'komentarz', 'created_at',
+        )
+
+    def data(self, rows):
+        return [
+            {
+                'id': row['id'],
+                # StringRelatedField: Organizacja.__str__ / Uzytkownik.__str__
+                'organizacja': row['organizacja__nazwa_organizacji'],
+                'wolontariusz': f"{row['wolontariusz__username']} ({row['wolontariusz__rola']})",
+                'oferta': row['oferta'],
+                'ocena': row['ocena'],
+                'komentarz': row['komentarz'],
+                'created_at': _datetime(row['created_at']),
+            }
+            for row in rows
+        ]
+
+
+class ApplicationProjection:
+    """Zlecenie rows for the change feed (GET /api/changes/); the same flags as an offer's participants."""
+
+    def rows(self, queryset):
+        return queryset.values('id', 'oferta', 'wolontariusz', 'czy_potwierdzone', 'czy_ukonczone', 'updated_at')
+
+    def data(self, rows):
+        return [{**row, 'updated_at': _datetime(row['updated_at'])} for row in rows]
+
+
+class ProjectedListMixin:
+    """
+    Serve ``list`` through ``list_projection`` (FAST_LIST_SERIALIZATION switches it off).
+    ``?fields=`` is applied to the projected dicts; ``?expand=`` needs the serializers.
+    """
+    list_projection = None
+
+    def uses_projection(self, request):
+        return self.list_projection is not None and settings.FAST_LIST_SERIALIZATION and 'expand' not in request.query_params
+
+    def projected_data(self, request, rows, **fetched):
+        with timed('serialize'):
+            data = self.list_projection.data(rows, **fetched)
+            only = query_param_names(request, 'fields')
+            if only:
+                data = [{name: value for name, value in item.items() if name in only} for item in data]
+        return data
+
+    def list(self, request, *args, **kwargs):
+        if not self.uses_projection(request):
+            return super().list(request, *args, **kwargs)
+
+        rows = self.list_projection.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        data = self.projected_data(request, page if page is not None else rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
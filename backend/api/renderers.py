@@ -0,0 +1,32 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from wolontariat.performance import timed
+
+_encoder = JSONEncoder()
+
+# Dates go through DRF's encoder too ('Z' for UTC, times cut to milliseconds)
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson, byte for byte the same output as DRF's compact JSON.
+    Types orjson does not know (Decimal, lazy translations, querysets...) are handed to
+    DRF's JSONEncoder. Indented output (the browsable API, ``; indent=4``) stays on the
+    stdlib renderer: orjson can only indent by two spaces.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_encoder.default, option=_OPTIONS)
+        # As in DRF: escape U+2028/U+2029 so the output is also valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
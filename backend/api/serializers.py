@@ -1,13 +1,57 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.reverse import reverse
 from django.contrib.auth.password_validation import validate_password
-from wolontariat.models import Projekt, Oferta, Uzytkownik, Organizacja, Recenzja, Zlecenie
+from django.db.models import Prefetch
+from wolontariat import messaging
+from wolontariat.performance import timed
+from wolontariat.models import Projekt, Oferta, Uzytkownik, Organizacja, Recenzja, Zlecenie, Zadanie, Wiadomosc
+
+def query_param_names(request, name):
+    """Comma-separated names from every ``?name=`` parameter."""
+    return {field.strip() for value in request.query_params.getlist(name) for field in value.split(',') if field.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for read requests. ``?fields=id,tytul_oferty`` keeps only the listed
+    fields; ``?expand=wolontariusze`` swaps a field for the richer representation declared in
+    ``Meta.expandable_fields`` (name -> (serializer class, kwargs)). Only the top-level
+    serializer of a response is affected, nested ones keep their shape.
+    """
+
+    def _is_root(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self._is_root():
+            return fields
+
+        expand = query_param_names(request, 'expand')
+        for name, (serializer_class, kwargs) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand:
+                fields[name] = serializer_class(read_only=True, **kwargs)
+
+        only = query_param_names(request, 'fields')
+        if only:
+            for name in set(fields) - only:
+                del fields[name]
+        return fields
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
 
-class OrganizacjaSerializer(serializers.ModelSerializer):
+class OrganizacjaSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Organizacja
         fields = ['id', 'nazwa_organizacji', 'nr_telefonu', 'nip', 'weryfikacja']
 
-class UzytkownikSerializer(serializers.ModelSerializer):
+class UzytkownikSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     organizacja = OrganizacjaSerializer(read_only=True)
     organizacja_id = serializers.PrimaryKeyRelatedField(
         source='organizacja', queryset=Organizacja.objects.all(), write_only=True, required=False
@@ -29,9 +73,33 @@ class UzytkownikSerializer(serializers.ModelSerializer):
         except Exception:
             return False
 
-class ProjektSerializer(serializers.ModelSerializer):
+class UzytkownikListSerializer(serializers.ModelSerializer):
+    """Volunteer as shown in listings: no contact details or organization."""
+    czy_maloletni = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = Uzytkownik
+        fields = ['id', 'username', 'first_name', 'last_name', 'rola', 'czy_maloletni']
+        read_only_fields = fields
+
+    get_czy_maloletni = UzytkownikSerializer.get_czy_maloletni
+
+class UczestnikSerializer(serializers.BaseSerializer):
+    """A Zlecenie shown as its volunteer plus the application status."""
+    user_serializer = UzytkownikSerializer
+
+    def to_representation(self, zlecenie):
+        data = self.user_serializer(zlecenie.wolontariusz).data
+        data['czy_potwierdzone'] = zlecenie.czy_potwierdzone
+        data['czy_ukonczone'] = zlecenie.czy_ukonczone
+        return data
+
+class UczestnikListSerializer(UczestnikSerializer):
+    user_serializer = UzytkownikListSerializer
+
+class ProjektSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     organizacja_nazwa = serializers.CharField(source='organizacja.nazwa_organizacji', read_only=True)
-    oferty_count = serializers.IntegerField(source='oferty.count', read_only=True)
+    oferty_count = serializers.IntegerField(source='liczba_ofert', read_only=True)
 
     class Meta:
         model = Projekt
@@ -39,13 +107,14 @@ class ProjektSerializer(serializers.ModelSerializer):
             'id', 'organizacja', 'organizacja_nazwa', 'nazwa_projektu',
             'opis_projektu', 'oferty_count'
         ]
+        expandable_fields = {'organizacja': (OrganizacjaSerializer, {})}
 
-class OfertaSerializer(serializers.ModelSerializer):
+class OfertaSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     projekt_nazwa = serializers.CharField(source='projekt.nazwa_projektu', read_only=True)
     organizacja_nazwa = serializers.CharField(source='organizacja.nazwa_organizacji', read_only=True)
     wolontariusz_info = UzytkownikSerializer(source='wolontariusz', read_only=True)
-    wolontariusze = serializers.SerializerMethodField()
-    liczba_uczestnikow = serializers.SerializerMethodField()
+    # Volunteers with their specific Zlecenie status (served from the prefetch cache when available)
+    wolontariusze = UczestnikSerializer(source='zlecenia', many=True, read_only=True)
 
     class Meta:
         model = Oferta
@@ -54,23 +123,44 @@ class OfertaSerializer(serializers.ModelSerializer):
             'tytul_oferty', 'lokalizacja', 'tematyka', 'czas_trwania', 'wymagania',
             'data',
             'data_wyslania', 'wolontariusz', 'wolontariusz_info',
-            'wolontariusze', 'liczba_uczestnikow', 'czy_ukonczone'
+            'wolontariusze', 'max_uczestnikow', 'liczba_uczestnikow', 'liczba_potwierdzonych', 'liczba_ukonczonych',
+            'czy_ukonczone'
         ]
         read_only_fields = ['organizacja', 'data_wyslania']
+        expandable_fields = {'organizacja': (OrganizacjaSerializer, {})}
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load everything the serializer touches in a fixed number of queries:
+        one JOIN for the offer's FKs and one prefetch for all participants
+        (with their organizations), regardless of page size.
+        """
+        return queryset.select_related(
+            'projekt', 'organizacja', 'wolontariusz__organizacja'
+        ).prefetch_related(
+            Prefetch('zlecenia', queryset=Zlecenie.objects.select_related('wolontariusz__organizacja').order_by('id'))
+        )
+
+    def validate_max_uczestnikow(self, value):
+        if value is not None and self.instance is not None and value < self.instance.liczba_uczestnikow:
+            raise serializers.ValidationError("Limit nie może być mniejszy niż liczba zgłoszonych uczestników.")
+        return value
 
-    def get_wolontariusze(self, obj):
-        # Fetch volunteers with their specific Zlecenie status
-        zlecenia = Zlecenie.objects.filter(oferta=obj).select_related('wolontariusz')
-        results = []
-        for z in zlecenia:
-            user_data = UzytkownikSerializer(z.wolontariusz).data
-            user_data['czy_potwierdzone'] = z.czy_potwierdzone
-            user_data['czy_ukonczone'] = z.czy_ukonczone
-            results.append(user_data)
-        return results
-
-    def get_liczba_uczestnikow(self, obj):
-        return Zlecenie.objects.filter(oferta=obj).count()
+class OfertaListSerializer(OfertaSerializer):
+    """
+    Offer as listed: volunteers without contact details or organization, which listings never
+    show. ``?expand=wolontariusze,wolontariusz_info`` returns the full profiles of the detail view.
+    """
+    wolontariusz_info = UzytkownikListSerializer(source='wolontariusz', read_only=True)
+    wolontariusze = UczestnikListSerializer(source='zlecenia', many=True, read_only=True)
+
+    class Meta(OfertaSerializer.Meta):
+        expandable_fields = {
+            **OfertaSerializer.Meta.expandable_fields,
+            'wolontariusz_info': (UzytkownikSerializer, {'source': 'wolontariusz'}),
+            'wolontariusze': (UczestnikSerializer, {'source': 'zlecenia', 'many': True}),
+        }
 
 class OfertaCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -78,7 +168,7 @@ class OfertaCreateSerializer(serializers.ModelSerializer):
         fields = [
             'projekt', 'tytul_oferty', 'lokalizacja',
             'tematyka', 'czas_trwania', 'wymagania', 'data',
-            'data_wyslania'
+            'data_wyslania', 'max_uczestnikow'
         ]
 
 class RegistrationSerializer(serializers.ModelSerializer):
@@ -99,7 +189,28 @@ class RegistrationSerializer(serializers.ModelSerializer):
         user = Uzytkownik.objects.create_user(**validated_data)
         return user
 
-class RecenzjaSerializer(serializers.ModelSerializer):
+class WiadomoscSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    nadawca = UzytkownikListSerializer(read_only=True)
+    odbiorca = UzytkownikListSerializer(read_only=True)
+    odbiorca_id = serializers.PrimaryKeyRelatedField(
+        source='odbiorca', queryset=Uzytkownik.objects.filter(is_active=True), write_only=True
+    )
+
+    class Meta:
+        model = Wiadomosc
+        fields = ['id', 'nadawca', 'odbiorca', 'odbiorca_id', 'tresc', 'data_wyslania', 'przeczytana']
+        read_only_fields = ['id', 'data_wyslania', 'przeczytana']
+
+    def validate(self, attrs):
+        if attrs['odbiorca'] == self.context['request'].user:
+            raise serializers.ValidationError("Nie można wysłać wiadomości do samego siebie.")
+        return attrs
+
+    def create(self, validated_data):
+        # Keeps the recipient's unread counter in step
+        return messaging.send(**validated_data)
+
+class RecenzjaSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     organizacja = serializers.StringRelatedField(read_only=True)
     wolontariusz = serializers.StringRelatedField(read_only=True)
     oferta = serializers.PrimaryKeyRelatedField(queryset=Oferta.objects.all(), required=False, allow_null=True)
@@ -194,3 +305,24 @@ class RecenzjaCreateSerializer(serializers.ModelSerializer):
         org = request.user.organizacja
         validated_data['organizacja'] = org
         return super().create(validated_data)
+
+
+class ZadanieSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Zadanie
+        fields = [
+            'id', 'rodzaj', 'status', 'nazwa_pliku', 'blad', 'proby',
+            'created_at', 'started_at', 'finished_at', 'status_url', 'download_url',
+        ]
+        read_only_fields = fields
+
+    def get_status_url(self, obj):
+        return reverse('jobs-detail', args=[obj.pk], request=self.context.get('request'))
+
+    def get_download_url(self, obj):
+        if obj.status != Zadanie.GOTOWE:
+            return None
+        return reverse('jobs-download', args=[obj.pk], request=self.context.get('request'))
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from wolontariat.models import Organizacja, Uzytkownik
+
+from .authentication import forget_tokens, forget_user_tokens
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # Logout deletes the token; it must stop working in every process right away
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=Uzytkownik)
+def uzytkownik_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Profile edits show up in /volunteers/me/ and deactivation must take effect immediately.
+    # Deleting a user deletes the token, which is handled above.
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    forget_user_tokens([instance.pk])
+
+
+@receiver(post_save, sender=Organizacja)
+@receiver(pre_delete, sender=Organizacja)  # members are detached with a bulk UPDATE, without signals
+def organizacja_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        forget_user_tokens(instance.uzytkownicy.values_list('id', flat=True))
@@ -1,3 +1,1589 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from wolontariat.certificates import certificate_storage, render_offer_certificate, render_user_certificate
+from wolontariat.changes import compact
+from wolontariat.jobs import claim, enqueue, expire_exports, result_exists, run
+from wolontariat.models import Organizacja, Uzytkownik, Projekt, Oferta, Recenzja, Zlecenie, Zadanie, Wiadomosc, Zmiana
+from wolontariat.pdf_utils import get_pl_font_names
+from wolontariat.synthetic import PASSWORD, generate, reset
+from wolontariat import events, messaging, metrics, middleware, performance, response_cache, search
+from wolontariat.counters import (
+    ALREADY_APPLIED, APPLIED, FULL, apply_for_offer, recount_offers, recount_projects, recount_unread,
+)
+
+from . import authentication
+from .async_urls import ASYNC_VIEWS
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+
+
+def make_fixture(n_offers=3, n_volunteers=3, prefix=''):
+    """Organization + project with ``n_offers`` offers, each joined by ``n_volunteers`` volunteers."""
+    org = Organizacja.objects.create(nazwa_organizacji=f'{prefix}Fundacja', nr_telefonu='501123456', nip=prefix.rjust(10, '0'))
+    org_user = Uzytkownik.objects.create_user(
+        username=f'{prefix}org', email=f'{prefix}org@example.com', password='haslo123',
+        rola='organizacja', nr_telefonu='600100100', organizacja=org,
+    )
+    volunteers = [
+        Uzytkownik.objects.create_user(
+            username=f'{prefix}vol{i}', email=f'{prefix}vol{i}@example.com', password='haslo123',
+            rola='wolontariusz', nr_telefonu='600300300', wiek=20 + i,
+        )
+        for i in range(n_volunteers)
+    ]
+    projekt = Projekt.objects.create(organizacja=org, nazwa_projektu=f'{prefix}Projekt', opis_projektu='Opis')
+    offers = []
+    for i in range(n_offers):
+        offer = Oferta.objects.create(
+            organizacja=org, projekt=projekt, tytul_oferty=f'Oferta {i}', lokalizacja='Kraków',
+            wolontariusz=volunteers[0] if volunteers else None,
+        )
+        for vol in volunteers:
+            Zlecenie.objects.create(oferta=offer, wolontariusz=vol)
+        offers.append(offer)
+    # Applications created directly skip the counters the offer actions keep
+    recount_offers([offer.pk for offer in offers])
+    return org, org_user, volunteers, projekt, offers
+
+
+class OfferListQueryCountTests(TestCase):
+    def _count_queries(self, url):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_offer_list_query_count_is_constant(self):
+        make_fixture(n_offers=2, n_volunteers=1, prefix='a')
+        small, _ = self._count_queries('/api/offers/')
+
+        make_fixture(n_offers=20, n_volunteers=5, prefix='b')
+        large, response = self._count_queries('/api/offers/')
+
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(small, large)
+        # COUNT for pagination + offers page + participants prefetch
+        self.assertEqual(large, 3)
+
+    def test_offer_list_payload_keeps_participant_details(self):
+        org, _, volunteers, _, offers = make_fixture(n_offers=1, n_volunteers=2)
+        Zlecenie.objects.filter(oferta=offers[0], wolontariusz=volunteers[1]).update(czy_potwierdzone=True)
+
+        _, response = self._count_queries('/api/offers/')
+        offer = response.data['results'][0]
+        self.assertEqual(offer['liczba_uczestnikow'], 2)
+        self.assertEqual(offer['organizacja_nazwa'], org.nazwa_organizacji)
+        by_id = {v['id']: v for v in offer['wolontariusze']}
+        self.assertTrue(by_id[volunteers[1].id]['czy_potwierdzone'])
+        self.assertFalse(by_id[volunteers[0].id]['czy_potwierdzone'])
+
+    def test_project_offers_query_count_is_constant(self):
+        _, _, _, projekt, _ = make_fixture(n_offers=10, n_volunteers=4)
+        count, response = self._count_queries(f'/api/projects/{projekt.id}/oferty/')
+        self.assertEqual(len(response.data), 10)
+        # project lookup + offers + participants prefetch
+        self.assertEqual(count, 3)
+
+    def test_confirm_volunteer_response_is_not_stale(self):
+        _, org_user, volunteers, _, offers = make_fixture(n_offers=1, n_volunteers=1)
+        client = APIClient()
+        client.force_authenticate(org_user)
+        response = client.post(
+            f'/api/offers/{offers[0].id}/confirm_volunteer/', {'wolontariusz_id': volunteers[0].id}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['wolontariusze'][0]['czy_potwierdzone'])
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.org, self.org_user, self.volunteers, self.projekt, self.offers = make_fixture(n_offers=2, n_volunteers=0)
+        self.volunteer = Uzytkownik.objects.create_user(
+            username='nowy', email='nowy@example.com', password='haslo123', rola='wolontariusz', nr_telefonu='600300300',
+        )
+        self.client = APIClient()
+
+    def _counters(self, offer):
+        offer.refresh_from_db()
+        return offer.liczba_uczestnikow, offer.liczba_potwierdzonych, offer.liczba_ukonczonych
+
+    def test_application_lifecycle(self):
+        offer = self.offers[0]
+        url = f'/api/offers/{offer.id}/'
+        self.client.force_authenticate(self.volunteer)
+        response = self.client.post(url + 'apply/')
+        self.assertEqual(response.data['liczba_uczestnikow'], 1)
+        self.client.post(url + 'apply/')
+        self.assertEqual(self._counters(offer), (1, 0, 0))
+
+        self.client.force_authenticate(self.org_user)
+        for action in ['confirm_volunteer', 'confirm_volunteer', 'approve_volunteer']:
+            self.client.post(url + action + '/', {'wolontariusz_id': self.volunteer.id}, format='json')
+        self.assertEqual(self._counters(offer), (1, 1, 1))
+
+        self.client.force_authenticate(self.volunteer)
+        response = self.client.post(url + 'withdraw/')
+        self.assertEqual(response.data['liczba_uczestnikow'], 0)
+        self.assertEqual(self._counters(offer), (0, 0, 0))
+
+    def test_bulk_actions_and_free_filter(self):
+        offer = self.offers[0]
+        Zlecenie.objects.create(oferta=offer, wolontariusz=self.volunteer)
+        recount_offers([offer.pk])
+        self.client.force_authenticate(self.org_user)
+        self.client.post(f'/api/offers/{offer.id}/confirm_volunteers/', {'all': True}, format='json')
+        self.client.post(f'/api/offers/{offer.id}/approve_volunteers/', {'all': True}, format='json')
+        self.assertEqual(self._counters(offer), (1, 1, 1))
+
+        free = self.client.get('/api/offers/?tylko_wolne=true').data['results']
+        self.assertEqual([row['id'] for row in free], [self.offers[1].id])
+
+    def test_saving_a_loaded_offer_keeps_concurrent_counts(self):
+        stale = Oferta.objects.get(pk=self.offers[0].pk)
+        apply_for_offer(stale.pk, self.volunteer.pk)
+        stale.tytul_oferty = 'Nowy tytuł'
+        stale.save()
+        self.assertEqual(self._counters(self.offers[0]), (1, 0, 0))
+
+    def test_save_of_a_deleted_or_forced_row_inserts_it(self):
+        offer = Oferta.objects.get(pk=self.offers[0].pk)
+        offer.liczba_uczestnikow = 2
+        Oferta.objects.filter(pk=offer.pk).delete()
+        offer.save()
+        self.assertEqual(self._counters(offer), (2, 0, 0))
+
+        Oferta.objects.filter(pk=offer.pk).delete()
+        offer.save(force_insert=True)
+        self.assertEqual(self._counters(offer), (2, 0, 0))
+        # Named explicitly, a counter is written as given
+        offer.liczba_uczestnikow = 5
+        offer.save(update_fields=['liczba_uczestnikow'])
+        self.assertEqual(self._counters(offer), (5, 0, 0))
+
+    def test_project_offer_count(self):
+        other = Projekt.objects.create(organizacja=self.org, nazwa_projektu='Inny', opis_projektu='')
+        self.offers[0].projekt = other
+        self.offers[0].save()
+        self.offers[1].delete()
+        self.projekt.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.projekt.liczba_ofert, other.liczba_ofert), (0, 1))
+        self.assertEqual(self.client.get(f'/api/projects/{other.id}/').data['oferty_count'], 1)
+
+    def test_deleting_volunteer_and_repair(self):
+        offer = self.offers[0]
+        self.client.force_authenticate(self.volunteer)
+        self.client.post(f'/api/offers/{offer.id}/apply/')
+        self.volunteer.delete()
+        self.assertEqual(self._counters(offer), (0, 0, 0))
+
+        Oferta.objects.filter(pk=offer.pk).update(liczba_uczestnikow=7)
+        Projekt.objects.filter(pk=self.projekt.pk).update(liczba_ofert=0)
+        out = io.StringIO()
+        call_command('repair_counters', '--dry-run', stdout=out)
+        self.assertIn('1 offers, 1 projects and 0 users out of date', out.getvalue())
+        call_command('repair_counters', stdout=out)
+        self.assertEqual(self._counters(offer), (0, 0, 0))
+        self.assertEqual((recount_offers(dry_run=True), recount_projects(dry_run=True)), (0, 0))
+
+
+class OfferCapacityTests(TransactionTestCase):
+    def setUp(self):
+        _, _, _, _, offers = make_fixture(n_offers=1, n_volunteers=0)
+        self.offer = offers[0]
+
+    def _volunteers(self, n):
+        return Uzytkownik.objects.bulk_create(
+            Uzytkownik(username=f'tlum{i}', email=f'tlum{i}@example.com', password='!', rola='wolontariusz', nr_telefonu='600300300')
+            for i in range(n)
+        )
+
+    def _concurrently(self, applicants, threads=50):
+        """Apply for the offer with ``applicants`` (volunteer ids) from ``threads`` connections started together."""
+        start, results = threading.Barrier(threads), []
+
+        def worker(ids):
+            try:
+                start.wait(10)
+                results.extend(apply_for_offer(self.offer.pk, vol_id) for vol_id in ids)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(applicants[i::threads],)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results
+
+    def test_capacity_through_the_api(self):
+        Oferta.objects.filter(pk=self.offer.pk).update(max_uczestnikow=1)
+        first, second = self._volunteers(2)
+        client = APIClient()
+        client.force_authenticate(first)
+        self.assertEqual(client.post(f'/api/offers/{self.offer.id}/apply/').status_code, 200)
+        client.force_authenticate(second)
+        self.assertEqual(client.post(f'/api/offers/{self.offer.id}/apply/').status_code, 409)
+
+        client.force_authenticate(first)
+        client.post(f'/api/offers/{self.offer.id}/withdraw/')
+        client.force_authenticate(second)
+        self.assertEqual(client.post(f'/api/offers/{self.offer.id}/apply/').data['liczba_uczestnikow'], 1)
+
+    def test_hundreds_of_simultaneous_applicants_do_not_oversubscribe(self):
+        Oferta.objects.filter(pk=self.offer.pk).update(max_uczestnikow=25)
+        results = self._concurrently([vol.pk for vol in self._volunteers(300)])
+
+        self.assertEqual((results.count(APPLIED), results.count(FULL)), (25, 275))
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.liczba_uczestnikow, 25)
+        self.assertEqual(Zlecenie.objects.filter(oferta=self.offer).count(), 25)
+
+    def test_repeated_application_counts_once(self):
+        volunteer = self._volunteers(1)[0]
+        results = self._concurrently([volunteer.pk] * 50)
+
+        self.assertEqual((results.count(APPLIED), results.count(ALREADY_APPLIED)), (1, 49))
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.liczba_uczestnikow, 1)
+
+
+class MessagingTests(TestCase):
+    def setUp(self):
+        _, self.org_user, (self.anna, self.piotr), _, _ = make_fixture(n_offers=0, n_volunteers=2)
+        self.client = APIClient()
+
+    def _send(self, sender, recipient, tresc='Dzień dobry'):
+        self.client.force_authenticate(sender)
+        return self.client.post('/api/messages/', {'odbiorca_id': recipient.id, 'tresc': tresc}, format='json')
+
+    def _unread(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/messages/unread_count/').data['nieprzeczytane']
+
+    def test_send_inbox_and_unread_counter(self):
+        response = self._send(self.anna, self.org_user)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['nadawca']['id'], self.anna.id)
+        self._send(self.piotr, self.org_user)
+        self.assertEqual(self._send(self.anna, self.anna).status_code, 400)
+
+        self.client.force_authenticate(self.org_user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/api/messages/unread_count/').data['nieprzeczytane'], 2)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        inbox = self.client.get('/api/messages/').data
+        self.assertEqual([m['nadawca']['id'] for m in inbox['results']], [self.piotr.id, self.anna.id])
+        self.assertNotIn('count', inbox)
+
+        self.client.force_authenticate(self.piotr)
+        self.assertEqual(self.client.get('/api/messages/').data['results'], [])
+        self.assertEqual(self.client.get(f'/api/messages/{response.data["id"]}/').status_code, 404)
+
+    def test_mark_read(self):
+        first = self._send(self.anna, self.org_user).data['id']
+        self._send(self.anna, self.org_user)
+        self._send(self.piotr, self.org_user)
+
+        self.client.force_authenticate(self.org_user)
+        for _ in range(2):
+            response = self.client.post('/api/messages/mark_read/', {'ids': [first]}, format='json')
+        self.assertEqual(response.data, {'oznaczone': 0, 'nieprzeczytane': 2})
+        response = self.client.post('/api/messages/mark_read/', {'nadawca': self.anna.id}, format='json')
+        self.assertEqual(response.data, {'oznaczone': 1, 'nieprzeczytane': 1})
+        unread = self.client.get('/api/messages/?nieprzeczytane=true').data['results']
+        self.assertEqual([m['nadawca']['id'] for m in unread], [self.piotr.id])
+        self.client.post('/api/messages/mark_read/', {'all': True}, format='json')
+        self.assertEqual(self._unread(self.org_user), 0)
+
+        # Only the recipient can mark a message read
+        self._send(self.anna, self.piotr)
+        self.client.force_authenticate(self.org_user)
+        self.assertEqual(self.client.post('/api/messages/mark_read/', {'all': True}, format='json').data['oznaczone'], 0)
+        self.assertEqual(self._unread(self.piotr), 1)
+
+    def test_conversation_is_keyset_paginated(self):
+        for i in range(15):
+            self._send(self.anna, self.org_user, f'A{i}')
+            self._send(self.org_user, self.anna, f'O{i}')
+        self._send(self.piotr, self.org_user, 'inna rozmowa')
+
+        self.client.force_authenticate(self.anna)
+        url, seen = f'/api/messages/conversation/?uzytkownik={self.org_user.id}', []
+        while url:
+            page = self.client.get(url).data
+            seen += [m['tresc'] for m in page['results']]
+            url = page['next']
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(seen[:2], ['O14', 'A14'])
+        self.assertEqual(self.client.get('/api/messages/conversation/?uzytkownik=x').status_code, 400)
+
+    def test_inbox_uses_the_keyset_index(self):
+        self._send(self.anna, self.org_user)
+        inbox = Wiadomosc.objects.filter(odbiorca=self.org_user).order_by('-data_wyslania', '-id')[:21]
+        with transaction.atomic(), connection.cursor() as cursor:
+            # A handful of rows is cheaper to sort; ask whether the index can serve the order at all
+            for setting in ('enable_seqscan', 'enable_bitmapscan', 'enable_sort'):
+                cursor.execute(f'SET LOCAL {setting} = off')
+            plan = inbox.explain()
+        self.assertIn('wiadomosc_skrzynka_keyset', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_deleting_sender_and_repair(self):
+        self._send(self.anna, self.org_user)
+        self.anna.delete()
+        self.assertEqual(self._unread(self.org_user), 0)
+
+        messaging.send(self.piotr, self.org_user, 'Hej')
+        Uzytkownik.objects.filter(pk=self.org_user.pk).update(nieprzeczytane_wiadomosci=5)
+        self.assertEqual(recount_unread(dry_run=True), 1)
+        recount_unread()
+        self.assertEqual(self._unread(self.org_user), 1)
+
+
+class EventStreamTests(TransactionTestCase):
+    def setUp(self):
+        _, self.org_user, self.volunteers, _, (self.offer,) = make_fixture(n_offers=1, n_volunteers=2)
+        self.tokens = {user.pk: Token.objects.create(user=user).key for user in [self.org_user, *self.volunteers]}
+
+    async def _connect(self, user):
+        response = await self.async_client.get('/api/events/', headers={'authorization': f'Token {self.tokens[user.pk]}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        # The first bytes are sent once the subscription is live
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return stream
+
+    async def _event(self, stream):
+        event, data = (await asyncio.wait_for(anext(stream), 5)).decode().split('\n')[:2]
+        return event.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    @sync_to_async
+    def _post(self, user, url, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(url, data, format='json')
+
+    async def test_revoked_token_cannot_open_a_stream_from_a_stale_cache(self):
+        anna = self.volunteers[0]
+        key = self.tokens[anna.pk]
+        token = await Token.objects.select_related('user__organizacja').aget(key=key)
+        await token.adelete()
+        # As left by a cache the logout's eviction did not reach
+        authentication.token_cache().set(authentication._cache_key(key), authentication._cache_entry(token))
+        response = await self.async_client.get('/api/events/', headers={'authorization': f'Token {key}'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_application_events_reach_only_their_recipients(self):
+        anna, piotr = self.volunteers
+        anna_stream, piotr_stream, org_stream = [await self._connect(user) for user in (anna, piotr, self.org_user)]
+
+        await self._post(self.org_user, f'/api/offers/{self.offer.id}/confirm_volunteer/', {'wolontariusz_id': anna.id})
+        await self._post(self.org_user, f'/api/offers/{self.offer.id}/confirm_volunteers/', {'all': True})
+        self.assertEqual(await self._event(anna_stream), (events.APPLICATION_CONFIRMED, {'oferta': self.offer.id}))
+        self.assertEqual(await self._event(piotr_stream), (events.APPLICATION_CONFIRMED, {'oferta': self.offer.id}))
+
+        await self._post(anna, f'/api/offers/{self.offer.id}/withdraw/')
+        await self._post(anna, f'/api/offers/{self.offer.id}/apply/')
+        expected = {'oferta': self.offer.id, 'wolontariusz': anna.id}
+        self.assertEqual(await self._event(org_stream), (events.APPLICATION_WITHDRAWN, expected))
+        self.assertEqual(await self._event(org_stream), (events.APPLICATION_CREATED, expected))
+
+        await sync_to_async(messaging.send)(self.org_user, piotr, 'Dziękujemy')
+        event, data = await self._event(piotr_stream)
+        self.assertEqual((event, data['nadawca']), (events.MESSAGE_RECEIVED, self.org_user.id))
+
+    async def test_rolled_back_changes_are_not_announced(self):
+        anna = self.volunteers[0]
+        stream = await self._connect(anna)
+
+        @sync_to_async
+        def publish():
+            with transaction.atomic():
+                events.publish([anna.id], 'rolled_back', {})
+                transaction.set_rollback(True)
+            events.publish([anna.id], 'committed', {})
+
+        await publish()
+        self.assertEqual(await self._event(stream), ('committed', {}))
+
+    async def test_authentication(self):
+        response = await self.async_client.get('/api/events/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/events/?token=nonsense')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(f'/api/events/?token={self.tokens[self.org_user.pk]}')
+        self.assertEqual(response.status_code, 200)
+        await response.streaming_content.aclose()
+
+    def test_not_served_under_wsgi(self):
+        response = self.client.get('/api/events/', HTTP_AUTHORIZATION=f'Token {self.tokens[self.org_user.pk]}')
+        self.assertEqual(response.status_code, 501)
+
+
+class ChangeFeedTests(TransactionTestCase):
+    # Not TestCase: the feed only shows committed transactions
+    def setUp(self):
+        self.org, self.org_user, self.volunteers, self.projekt, self.offers = make_fixture(n_offers=2, n_volunteers=2)
+        self.client = APIClient()
+        self.head = self.client.get('/api/changes/').data['next']
+
+    def _sync(self, since):
+        """Every change after ``since`` as {(model, id): change}, and the final token."""
+        changed = {}
+        while True:
+            data = self.client.get('/api/changes/', {'since': since}).data
+            changed.update({(change['model'], change['id']): change for change in data['changes']})
+            since = data['next']
+            if not data['more']:
+                return changed, since
+
+    def test_changes_since_a_token(self):
+        offer, other = self.offers
+        Oferta.objects.filter(pk=offer.pk).update(tytul_oferty='Nowy tytuł')
+        offer.refresh_from_db()
+        offer.lokalizacja = 'Gdańsk'
+        offer.save()
+        Zlecenie.objects.filter(oferta=other).update(czy_potwierdzone=True)
+        withdrawn = Zlecenie.objects.filter(oferta=other).first().pk
+        Zlecenie.objects.filter(pk=withdrawn).delete()
+        projekt = Projekt.objects.create(organizacja=self.org, nazwa_projektu='Drugi', opis_projektu='Opis')
+
+        with mock.patch('api.views.CHANGES_LIMIT', 2):
+            changed, token = self._sync(self.head)
+        applications = [(Zmiana.ZLECENIE, z.id) for z in Zlecenie.objects.filter(oferta=other)]
+        self.assertEqual(set(changed), {
+            (Zmiana.OFERTA, offer.id), (Zmiana.PROJEKT, projekt.id), (Zmiana.ZLECENIE, withdrawn), *applications,
+        })
+        self.assertEqual(changed[Zmiana.OFERTA, offer.id]['data']['tytul_oferty'], 'Nowy tytuł')
+        self.assertEqual(changed[Zmiana.OFERTA, offer.id]['data']['lokalizacja'], 'Gdańsk')
+        self.assertEqual(changed[Zmiana.ZLECENIE, withdrawn], {'model': 'zlecenie', 'id': withdrawn, 'deleted': True, 'data': None})
+        self.assertTrue(changed[applications[0]]['data']['czy_potwierdzone'])
+        self.assertEqual(self._sync(token), ({}, token))
+
+    def test_open_transaction_holds_the_feed_back(self):
+        writing, release = threading.Event(), threading.Event()
+
+        def slow_writer():
+            try:
+                with transaction.atomic():
+                    Oferta.objects.filter(pk=self.offers[0].pk).update(lokalizacja='Opole')
+                    writing.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=slow_writer)
+        thread.start()
+        writing.wait(10)
+        # Committed after the slow writer took its transaction id, so a plain id order would skip it
+        Oferta.objects.filter(pk=self.offers[1].pk).update(lokalizacja='Łódź')
+        changed, token = self._sync(self.head)
+        self.assertEqual(changed, {})
+        self.assertEqual(token, self.head)
+
+        release.set()
+        thread.join()
+        changed, _ = self._sync(token)
+        self.assertEqual(set(changed), {(Zmiana.OFERTA, offer.id) for offer in self.offers})
+
+    def test_compaction_keeps_the_latest_entry(self):
+        offer = self.offers[0]
+        for lokalizacja in ('Opole', 'Łódź', 'Lublin'):
+            Oferta.objects.filter(pk=offer.pk).update(lokalizacja=lokalizacja)
+        self.assertGreaterEqual(compact(), 2)
+        self.assertEqual(compact(dry_run=True), 0)
+        changed, _ = self._sync(self.head)
+        self.assertEqual(changed[Zmiana.OFERTA, offer.id]['data']['lokalizacja'], 'Lublin')
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get('/api/changes/', {'since': 'nonsense'}).status_code, 400)
+
+
+class SyntheticDataTests(TestCase):
+    SIZE = dict(organizations=3, volunteers=60, projects_per_organization=2, offers_per_project=3, applications_per_offer=4,
+                messages_per_volunteer=4, base_date=date(2025, 6, 1))
+
+    def _snapshot(self):
+        return (
+            list(Oferta.objects.order_by('id').values_list('tytul_oferty', 'lokalizacja', 'data', 'liczba_uczestnikow')),
+            list(Zlecenie.objects.order_by('id').values_list('oferta_id', 'wolontariusz_id', 'czy_potwierdzone')),
+            list(Wiadomosc.objects.order_by('id').values_list('nadawca_id', 'odbiorca_id', 'przeczytana')),
+        )
+
+    def test_same_seed_same_data(self):
+        reset()
+        counts = generate(seed=7, **self.SIZE)
+        self.assertEqual(counts['Oferta'], Oferta.objects.count())
+        self.assertGreater(counts['Zlecenie'], 0)
+        self.assertGreater(counts['Wiadomosc'], 0)
+        first = self._snapshot()
+        reset()
+        self.assertFalse(Uzytkownik.objects.exists())
+        generate(seed=7, **self.SIZE)
+        self.assertEqual(self._snapshot(), first)
+        reset()
+        generate(seed=8, **self.SIZE)
+        self.assertNotEqual(self._snapshot(), first)
+
+    def test_counters_and_logins(self):
+        generate(**self.SIZE)
+        self.assertEqual(recount_offers(dry_run=True), 0)
+        self.assertEqual(recount_projects(dry_run=True), 0)
+        self.assertEqual(recount_unread(dry_run=True), 0)
+        self.assertFalse(Zlecenie.objects.filter(czy_ukonczone=True, oferta__czy_ukonczone=False).exists())
+
+        user = Uzytkownik.objects.filter(rola='organizacja').first()
+        response = APIClient().post('/api/auth/login/', {'username': user.email, 'password': PASSWORD}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class BenchmarkApiTests(TestCase):
+    def test_report_and_compare(self):
+        generate(**SyntheticDataTests.SIZE)
+        with tempfile.TemporaryDirectory() as tmp:
+            report = os.path.join(tmp, 'report.json')
+            # Latency is too noisy to assert on here; queries and bytes are exact
+            options = dict(existing=True, requests=3, warmup=1, only='projects,messages,changes', max_p95_ms=1000,
+                           stdout=io.StringIO())
+            call_command('benchmark_api', output=report, **options)
+            with open(report) as f:
+                results = json.load(f)['endpoints']
+            self.assertEqual(set(results), {
+                'projects.list', 'projects.search', 'projects.detail', 'projects.offers',
+                'messages.inbox', 'messages.unread_count', 'changes.head',
+            })
+            self.assertEqual(results['messages.unread_count']['status'], 200)
+            self.assertEqual(results['messages.unread_count']['queries'], 1)
+            self.assertGreater(results['projects.list']['bytes'], 0)
+
+            out = io.StringIO()
+            call_command('benchmark_api', compare=report, **dict(options, stdout=out))
+            self.assertIn('No regressions', out.getvalue())
+
+            # A baseline that needed one query less makes the same run a regression
+            with open(report) as f:
+                baseline = json.load(f)
+            baseline['endpoints']['messages.unread_count']['queries'] = 0
+            with open(report, 'w') as f:
+                json.dump(baseline, f)
+            with self.assertRaisesMessage(CommandError, 'messages.unread_count: queries 0 -> 1'):
+                call_command('benchmark_api', compare=report, **options)
+
+
+class BulkApplicationTests(TestCase):
+    def setUp(self):
+        _, self.org_user, self.volunteers, _, offers = make_fixture(n_offers=1, n_volunteers=4)
+        self.offer = offers[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def _post(self, action, data):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(f'/api/offers/{self.offer.id}/{action}/', data, format='json')
+        # The offer's counters take one more UPDATE (see CounterTests)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "wolontariat_zlecenie"')]
+        return response, updates
+
+    def test_confirm_listed_volunteers_with_one_update(self):
+        first, second, third, _ = self.volunteers
+        Zlecenie.objects.filter(oferta=self.offer, wolontariusz=third).update(czy_potwierdzone=True)
+
+        response, updates = self._post('confirm_volunteers', {'wolontariusz_ids': [first.id, second.id, third.id, 999999]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['results'], [
+            {'wolontariusz_id': first.id, 'status': 'updated'},
+            {'wolontariusz_id': second.id, 'status': 'updated'},
+            {'wolontariusz_id': third.id, 'status': 'unchanged'},
+            {'wolontariusz_id': 999999, 'status': 'not_found'},
+        ])
+        self.assertEqual(Zlecenie.objects.filter(oferta=self.offer, czy_potwierdzone=True).count(), 3)
+
+    def test_approve_all_pending_only_touches_accepted_volunteers(self):
+        accepted = self.volunteers[:2]
+        Zlecenie.objects.filter(oferta=self.offer, wolontariusz__in=accepted).update(czy_potwierdzone=True)
+
+        response, updates = self._post('approve_volunteers', {'all': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual({r['wolontariusz_id'] for r in response.data['results']}, {v.id for v in accepted})
+        completed = Zlecenie.objects.filter(oferta=self.offer, czy_ukonczone=True)
+        self.assertEqual(set(completed.values_list('wolontariusz_id', flat=True)), {v.id for v in accepted})
+
+        response, updates = self._post('approve_volunteers', {'all': True})
+        self.assertEqual((response.data['updated'], updates), (0, []))
+
+    def test_invalid_requests(self):
+        self.assertEqual(self._post('confirm_volunteers', {})[0].status_code, 400)
+        self.assertEqual(self._post('confirm_volunteers', {'wolontariusz_ids': ['x']})[0].status_code, 400)
+        self.client.force_authenticate(make_fixture(n_offers=0, n_volunteers=0, prefix='other')[1])
+        self.assertEqual(self._post('confirm_volunteers', {'all': True})[0].status_code, 403)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        _, _, self.volunteers, self.projekt, self.offers = make_fixture(n_offers=2, n_volunteers=2)
+        self.client = APIClient()
+
+    def test_list_is_slim_and_detail_is_full(self):
+        listed = self.client.get('/api/offers/').data['results'][0]
+        participant = listed['wolontariusze'][0]
+        self.assertNotIn('email', participant)
+        self.assertNotIn('organizacja', participant)
+        self.assertIn('czy_potwierdzone', participant)
+        self.assertNotIn('email', listed['wolontariusz_info'])
+
+        detail = self.client.get(f'/api/offers/{self.offers[0].id}/').data
+        self.assertIn('email', detail['wolontariusze'][0])
+        self.assertIn('nr_telefonu', detail['wolontariusz_info'])
+
+    def test_expand_restores_full_participants(self):
+        listed = self.client.get('/api/offers/?expand=wolontariusze').data['results'][0]
+        self.assertIn('email', listed['wolontariusze'][0])
+        self.assertNotIn('email', listed['wolontariusz_info'])
+
+        projekt = self.client.get(f'/api/projects/{self.projekt.id}/?expand=organizacja').data
+        self.assertEqual(projekt['organizacja']['nazwa_organizacji'], 'Fundacja')
+
+    def test_fields_selects_top_level_fields(self):
+        listed = self.client.get('/api/offers/?fields=id,tytul_oferty&fields=wolontariusze').data['results']
+        self.assertEqual(set(listed[0]), {'id', 'tytul_oferty', 'wolontariusze'})
+        self.assertIn('username', listed[0]['wolontariusze'][0])
+
+        projects = self.client.get('/api/projects/?fields=nazwa_projektu').data['results']
+        self.assertEqual(projects, [{'nazwa_projektu': 'Projekt'}])
+
+
+@override_settings(CACHES={**settings.CACHES, 'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class ProjectedListParityTests(TestCase):
+    """The values() list path must return exactly what the serializers return."""
+
+    def setUp(self):
+        org, org_user, volunteers, projekt, offers = make_fixture(n_offers=3, n_volunteers=3)
+        make_fixture(n_offers=2, n_volunteers=0, prefix='b')
+        volunteers[1].wiek = 16
+        volunteers[1].save()
+        volunteers[2].wiek = None
+        volunteers[2].save()
+        offers[0].data = date(2025, 5, 1)
+        offers[0].wolontariusz = None
+        offers[0].save()
+        Zlecenie.objects.filter(oferta=offers[1]).update(czy_potwierdzone=True, czy_ukonczone=True)
+        Projekt.objects.create(organizacja=org, nazwa_projektu='Pusty', opis_projektu='')
+        for i, volunteer in enumerate(volunteers):
+            Recenzja.objects.create(organizacja=org, wolontariusz=volunteer, oferta=offers[i] if i else None, ocena=4, komentarz=f'K{i}')
+        self.client = APIClient()
+        self.client.force_authenticate(org_user)
+
+    def _both(self, url):
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(url)
+        projected = self.client.get(url)
+        self.assertEqual(projected.status_code, 200)
+        projected, expected = json.loads(projected.content), json.loads(expected.content)
+        if 'pagination=cursor' not in url:
+            # Page-number listings have no ORDER BY of their own; compare them as sets of rows
+            for data in (projected, expected):
+                data['results'].sort(key=lambda row: row.get('id', 0))
+        return projected, expected
+
+    def test_offer_list_parity(self):
+        for url in ['/api/offers/', '/api/offers/?pagination=cursor', '/api/offers/?search=oferta',
+                    '/api/offers/?fields=id,wolontariusze,data']:
+            projected, expected = self._both(url)
+            self.assertTrue(expected['results'])
+            self.assertEqual(projected, expected, url)
+
+    def test_project_and_review_list_parity(self):
+        for url in ['/api/projects/', '/api/projects/?search=projekt', '/api/reviews/', '/api/reviews/?pagination=cursor']:
+            projected, expected = self._both(url)
+            self.assertTrue(expected['results'])
+            self.assertEqual(projected, expected, url)
+
+    def test_projected_offer_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/offers/')
+        # COUNT + page + participants, as with the serializers
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+
+@override_settings(ROOT_URLCONF='wolontariat.asgi_urls')
+class AsyncReadViewTests(TestCase):
+    URLS = [
+        '/api/offers/', '/api/offers/?page=2', '/api/offers/?search=oferta', '/api/offers/?fields=id,wolontariusze',
+        '/api/offers/?expand=wolontariusze', '/api/offers/?pagination=cursor', '/api/offers/?page=9',
+        '/api/projects/', '/api/projects/?organizacja={org}', '/api/organizations/', '/api/organizations/{org}/',
+        '/api/reviews/', '/api/offers/{offer}/', '/api/offers/0/', '/api/offers/x/', '/api/projects/{project}/',
+        '/api/volunteers/me/', '/api/offers/?format=api',
+    ]
+    # Pages carrying a fresh CSRF token each time
+    HTML = {'/api/offers/?format=api'}
+
+    def setUp(self):
+        self.org, self.org_user, self.volunteers, self.projekt, self.offers = make_fixture(n_offers=25, n_volunteers=2)
+        self.org.weryfikacja = True
+        self.org.save()
+        Recenzja.objects.create(organizacja=self.org, wolontariusz=self.volunteers[0], oferta=self.offers[0], ocena=5, komentarz='Super')
+        self.token = Token.objects.create(user=self.org_user)
+
+    def _get(self, url, urlconf, **headers):
+        # No cached response, but the same tag generations (the version of a list's ETag)
+        tags = [response_cache.OFFERS, response_cache.PROJECTS, response_cache.ORGANIZATIONS,
+                response_cache.organization_tag(self.org.pk), response_cache.project_tag(self.projekt.pk)]
+        generations = response_cache.generations(tags)
+        response_cache.response_cache().clear()
+        response_cache.response_cache().set_many({f'tag:{tag}': g for tag, g in zip(tags, generations)}, timeout=None)
+        with self.settings(ROOT_URLCONF=urlconf):
+            return self.client.get(url, **headers)
+
+    def test_same_responses_as_the_viewsets(self):
+        for url in self.URLS:
+            url = url.format(org=self.org.pk, offer=self.offers[0].pk, project=self.projekt.pk)
+            for headers in ({}, {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}):
+                expected = self._get(url, 'wolontariat.urls', **headers)
+                actual = self._get(url, 'wolontariat.asgi_urls', **headers)
+                self.assertEqual(actual.status_code, expected.status_code, url)
+                if url not in self.HTML:
+                    self.assertEqual(actual.content, expected.content, url)
+                for header in ('ETag', 'Last-Modified', 'X-Cache', 'Vary', 'Content-Type'):
+                    self.assertEqual(actual.get(header), expected.get(header), (url, header))
+
+    def test_async_path_queries_and_caching(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._get('/api/offers/', 'wolontariat.asgi_urls')
+        self.assertTrue(asyncio.iscoroutinefunction(response.resolver_match.func))
+        # COUNT + page + participants, as in the viewset
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/offers/')['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/offers/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_async_views_replace_the_router_routes(self):
+        for name, view in ASYNC_VIEWS.items():
+            kwargs = {'pk': self.offers[0].pk} if name.endswith('-detail') else {}
+            url = reverse(name, kwargs=kwargs, urlconf='wolontariat.asgi_urls')
+            self.assertEqual(url, reverse(name, kwargs=kwargs, urlconf='wolontariat.urls'))
+            self.assertIs(resolve(url, urlconf='wolontariat.asgi_urls').func, view)
+        self.assertIs(resolve('/api/offers.json', urlconf='wolontariat.asgi_urls').func, ASYNC_VIEWS['offers-list'])
+
+    def test_errors_are_answered_in_one_pass(self):
+        for url, status in (('/api/offers/0/', 404), ('/api/volunteers/me/', 401)):
+            counts = []
+            for urlconf in ('wolontariat.urls', 'wolontariat.asgi_urls'):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self._get(url, urlconf)
+                self.assertEqual(response.status_code, status, url)
+                counts.append(len(ctx.captured_queries))
+            self.assertEqual(counts[1], counts[0], url)
+
+    def test_writes_go_to_the_viewset(self):
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        response = self.client.post('/api/offers/', {'projekt': self.projekt.pk, 'tytul_oferty': 'Nowa', 'lokalizacja': 'Gdańsk'},
+                                    content_type='application/json', **auth)
+        self.assertEqual(response.status_code, 201)
+        response = self.client.patch(f'/api/projects/{self.projekt.pk}/', {'nazwa_projektu': 'Zmieniony'},
+                                     content_type='application/json', **auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(f'/api/projects/{self.projekt.pk}/').json()['nazwa_projektu'], 'Zmieniony')
+        self.assertEqual(self.client.post('/api/offers/', {}, content_type='application/json').status_code, 401)
+
+    async def test_under_the_async_client(self):
+        response = await self.async_client.get('/api/offers/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 25)
+        response = await self.async_client.get('/api/volunteers/me/', headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.json()['email'], 'org@example.com')
+
+
+class BenchmarkConcurrencyTests(TransactionTestCase):
+    def test_both_servers_answer_under_load(self):
+        # Committed, so that the gunicorn processes see the rows
+        make_fixture(n_offers=3, n_volunteers=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            report = os.path.join(tmp, 'report.json')
+            call_command('benchmark_concurrency', duration=1, warmup=0, concurrency='1,4', workers=1, output=report,
+                         stdout=io.StringIO())
+            with open(report) as f:
+                results = json.load(f)['servers']
+        self.assertEqual(set(results), {'wsgi', 'asgi'})
+        for levels in results.values():
+            self.assertEqual(set(levels), {'1', '4'})
+            for result in levels.values():
+                self.assertGreater(result['requests'], 0)
+                self.assertEqual(result['errors'], 0)
+
+
+class JsonRendererTests(SimpleTestCase):
+    def test_orjson_output_matches_drf(self):
+        data = {
+            'text': 'zażółć\u2028gęślą', 'decimal': Decimal('12.50'), 'lazy': gettext_lazy('Invalid token.'),
+            'datetime': datetime(2025, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'date': date(2025, 5, 1), 'time': time(8, 15, 30, 250000), 1: [None, True, 1.5],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+        indented = ORJSONRenderer().render(data, 'application/json; indent=4')
+        self.assertEqual(indented, JSONRenderer().render(data, 'application/json; indent=4'))
+
+    def test_parser(self):
+        self.assertEqual(ORJSONParser().parse(io.BytesIO('{"a": ["ł", 1]}'.encode())), {'a': ['ł', 1]})
+        for body in [b'{"a": NaN}', b'{"a": ']:
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+
+@override_settings(COMPRESSION_MIN_LENGTH=200)
+class CompressionTests(TestCase):
+    def setUp(self):
+        make_fixture(n_offers=3, n_volunteers=3)
+        self.client = APIClient()
+        self.plain = self.client.get('/api/offers/')
+
+    def test_negotiation(self):
+        self.assertEqual(middleware.negotiate(''), None)
+        self.assertEqual(middleware.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(middleware.negotiate('gzip;q=0, identity'), None)
+        self.assertEqual(middleware.negotiate('*;q=0.5, gzip;q=0.8'), 'gzip')
+        preferred = 'br' if middleware.brotli is not None else 'gzip'
+        self.assertEqual(middleware.negotiate('gzip, deflate, br'), preferred)
+        self.assertEqual(middleware.negotiate('br;q=0.5, gzip;q=1.0'), 'gzip')
+
+    def test_gzip(self):
+        response = self.client.get('/api/offers/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), self.plain.content)
+        self.assertLess(int(response['Content-Length']), len(self.plain.content))
+
+    @skipUnless(middleware.brotli, 'brotli is not installed')
+    def test_brotli(self):
+        response = self.client.get('/api/offers/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(response.content), self.plain.content)
+
+    def test_identity_and_small_bodies(self):
+        self.assertFalse(self.plain.has_header('Content-Encoding'))
+        with self.settings(COMPRESSION_MIN_LENGTH=len(self.plain.content) + 1):
+            response = self.client.get('/api/offers/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        chunks = [b'{"id": %d, "tytul_oferty": "Oferta"}\n' % i for i in range(100)]
+        for content_type, compressed in [('application/json', True), ('text/event-stream', False), ('application/pdf', False)]:
+            response = StreamingHttpResponse(iter(chunks), content_type=content_type)
+            response = middleware.CompressionMiddleware(lambda request: response)(request)
+            body = b''.join(response.streaming_content)
+            self.assertEqual(response.has_header('Content-Encoding'), compressed, content_type)
+            self.assertEqual(gzip.decompress(body) if compressed else body, b''.join(chunks))
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=1, PERFORMANCE_SLOW_MS=60000)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        make_fixture(n_offers=3, n_volunteers=2)
+
+    def _metrics(self, response):
+        return {metric.split(';')[0]: metric for metric in response['Server-Timing'].split(', ')}
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/offers/')
+        metrics = self._metrics(response)
+        self.assertEqual(set(metrics), {'total', 'db', 'serialize', 'render'})
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', metrics['db'])
+
+        response_cache.response_cache().clear()
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            self.assertIn('serialize', self._metrics(self.client.get('/api/offers/')))
+        with self.settings(PERFORMANCE_SAMPLE_RATE=0):
+            self.assertFalse(self.client.get('/api/offers/').has_header('Server-Timing'))
+
+    def test_slow_request_log_with_repeated_queries(self):
+        def view(request):
+            # An N+1 shape: the same statement per item, with IN lists of any length
+            for ids in ([1], [1, 2], [1, 2, 3]):
+                list(Oferta.objects.filter(pk__in=ids))
+            Projekt.objects.count()
+            with performance.timed('pdf'):
+                pass
+            return HttpResponse()
+
+        request = RequestFactory().get('/api/offers/?token=secret')
+        with self.settings(PERFORMANCE_SLOW_MS=0), self.assertLogs('wolontariat.performance', 'WARNING') as logs:
+            response = performance.PerformanceMiddleware(view)(request)
+        metrics = self._metrics(response)
+        self.assertIn('desc="4 queries"', metrics['db'])
+        self.assertEqual(metrics['repeated'], 'repeated;desc="2 repeated queries"')
+        self.assertIn('pdf', metrics)
+
+        record = logs.records[0].performance
+        self.assertEqual((record['path'], record['status'], record['queries']), ('/api/offers/', 200, 4))
+        self.assertEqual(len(record['repeated']), 1)
+        self.assertEqual(record['repeated'][0]['count'], 3)
+        self.assertIn('IN (%s, ...)', record['repeated'][0]['sql'])
+        self.assertNotIn('secret', logs.output[0])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        _, self.org_user, self.volunteers, _, self.offers = make_fixture(n_offers=2, n_volunteers=1)
+
+    def _value(self, name, **labels):
+        return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_cache_and_query_metrics(self):
+        duration = dict(view='offers-list', method='GET', status='200')
+        before = {
+            'requests': self._value('wolontariat_http_request_duration_seconds_count', **duration),
+            'hits': self._value('wolontariat_cache_lookups_total', cache='responses', result='hit'),
+            'misses': self._value('wolontariat_cache_lookups_total', cache='responses', result='miss'),
+            'queries': self._value('wolontariat_db_queries_total'),
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/offers/')
+            self.client.get('/api/offers/')
+        self.assertEqual(self._value('wolontariat_http_request_duration_seconds_count', **duration), before['requests'] + 2)
+        self.assertEqual(self._value('wolontariat_cache_lookups_total', cache='responses', result='miss'), before['misses'] + 1)
+        self.assertEqual(self._value('wolontariat_cache_lookups_total', cache='responses', result='hit'), before['hits'] + 1)
+        self.assertEqual(self._value('wolontariat_db_queries_total'), before['queries'] + len(ctx.captured_queries))
+
+        apply = dict(view='offers-apply', method='POST', status='200')
+        applied = self._value('wolontariat_http_request_duration_seconds_count', **apply)
+        token = Token.objects.create(user=Uzytkownik.objects.create_user(
+            username='nowy', email='nowy@example.com', password='haslo123', rola='wolontariusz', nr_telefonu='600300300',
+        ))
+        response = self.client.post(f'/api/offers/{self.offers[0].pk}/apply/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._value('wolontariat_http_request_duration_seconds_count', **apply), applied + 1)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'wolontariat_http_request_duration_seconds_bucket{', response.content)
+        self.assertIn(b'wolontariat_http_requests_in_progress', response.content)
+
+    def test_render_duration(self):
+        before = self._value('wolontariat_document_render_seconds_count', template='offer_certificate')
+        render_offer_certificate('Anna', 'Oferta')
+        self.assertEqual(self._value('wolontariat_document_render_seconds_count', template='offer_certificate'), before + 1)
+
+    @override_settings(METRICS_TOKEN='sekret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer inny').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer sekret').status_code, 200)
+
+    def test_processes_are_added_up(self):
+        script = (
+            'import django, sys; django.setup(); from prometheus_client import generate_latest; '
+            'from wolontariat import metrics; '
+            'metrics.cache_lookup("tokens", True) if sys.argv[1] == "hit" else print(generate_latest(metrics.registry()).decode())'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory, DJANGO_SETTINGS_MODULE='wolontariat.settings')
+            run = lambda argument: subprocess.run(
+                [sys.executable, '-c', script, argument], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            run('hit')
+            run('hit')
+            self.assertIn('wolontariat_cache_lookups_total{cache="tokens",result="hit"} 2.0', run('collect'))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        _, _, _, self.projekt, _ = make_fixture(n_offers=0, n_volunteers=0)
+        self.projekt.opis_projektu = 'Pomoc w schronisku dla zwierząt'
+        self.projekt.save()
+        org = self.projekt.organizacja
+        self.title_hit = Oferta.objects.create(
+            organizacja=org, projekt=self.projekt, tytul_oferty='Sprzątanie parku', lokalizacja='Gdańsk',
+        )
+        self.requirements_hit = Oferta.objects.create(
+            organizacja=org, projekt=self.projekt, tytul_oferty='Festyn', lokalizacja='Kraków',
+            wymagania='Pomoc przy sprzątaniu po imprezie, sprzątanie',
+        )
+        self.miss = Oferta.objects.create(
+            organizacja=org, projekt=self.projekt, tytul_oferty='Korepetycje', lokalizacja='Łódź',
+        )
+
+    def _search(self, url):
+        response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_offer_search_ignores_polish_diacritics_and_ranks_title_first(self):
+        self.assertEqual(self._search('/api/offers/?search=sprzatanie'), [self.title_hit.id, self.requirements_hit.id])
+        self.assertEqual(self._search('/api/offers/?search=LODZ'), [self.miss.id])
+
+    def test_offer_search_matches_project_description(self):
+        self.assertEqual(len(self._search('/api/offers/?search=schronisko')), 0)
+        self.assertEqual(len(self._search('/api/offers/?search=schronisku')), 3)
+
+    def test_project_description_change_reindexes_offers(self):
+        self.projekt.opis_projektu = 'Zbiórka żywności'
+        self.projekt.save()
+        self.assertEqual(len(self._search('/api/offers/?search=zywnosci')), 3)
+        self.assertEqual(len(self._search('/api/offers/?search=schronisku')), 0)
+
+    def test_project_search(self):
+        self.assertEqual(self._search('/api/projects/?search=zwierzat'), [self.projekt.id])
+        self.assertEqual(self._search('/api/projects/?search=korepetycje'), [])
+
+    def test_typos_match_descriptions_too(self):
+        if not search.trigram_available():
+            self.skipTest('pg_trgm is not installed')
+        self.assertEqual(self._search('/api/projects/?search=schronisko'), [self.projekt.id])
+        self.assertEqual(self._search('/api/offers/?search=imprezy'), [self.requirements_hit.id])
+
+    def test_every_match_is_ranked_and_counted(self):
+        # The oldest offer is the best match, and the count is not capped
+        response = APIClient().get('/api/offers/?search=sprzatanie')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['id'], self.title_hit.id)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        _, _, _, projekt, _ = make_fixture(n_offers=0, n_volunteers=0)
+        dates = [None, date(2025, 3, 1), date(2025, 1, 1), None, date(2025, 1, 1)] * 9
+        self.offers = [
+            Oferta.objects.create(organizacja=projekt.organizacja, projekt=projekt, tytul_oferty=f'O{i}', lokalizacja='X', data=d)
+            for i, d in enumerate(dates)
+        ]
+
+    def _walk(self, url, link='next'):
+        client = APIClient()
+        pages = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data[link]
+        return pages
+
+    def test_cursor_pages_follow_date_then_id_with_undated_last(self):
+        pages = self._walk('/api/offers/?pagination=cursor')
+        expected = sorted(self.offers, key=lambda o: (o.data is None, o.data or date.min, o.id))
+        self.assertEqual([len(p) for p in pages], [20, 20, 5])
+        self.assertEqual(sum(pages, []), [o.id for o in expected])
+
+    def test_previous_link_returns_previous_page(self):
+        client = APIClient()
+        first = client.get('/api/offers/?pagination=cursor').data
+        self.assertIsNone(first['previous'])
+        second = client.get(first['next']).data
+        back = client.get(second['previous']).data
+        self.assertEqual([r['id'] for r in back['results']], [r['id'] for r in first['results']])
+
+    def test_page_number_mode_is_default(self):
+        response = APIClient().get('/api/offers/')
+        self.assertEqual(response.data['count'], len(self.offers))
+        pages = [APIClient().get(f'/api/offers/?page={n}').data['results'] for n in (1, 2, 3)]
+        self.assertEqual([row['id'] for page in pages for row in page], [o.id for o in reversed(self.offers)])
+
+    def test_cursor_mode_is_refused_for_search(self):
+        response = APIClient().get('/api/offers/?search=O1&pagination=cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pagination', response.data)
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(APIClient().get('/api/offers/?cursor=garbage').status_code, 404)
+
+    def test_tampered_cursor_values_are_404(self):
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps({'v': values}).encode()).decode()
+
+        client = APIClient()
+        for url, values in [
+            ('/api/offers/', ['garbage', 1]),
+            ('/api/offers/', [None, 1]),
+            ('/api/offers/', ['2025-01-01']),
+            ('/api/projects/', [{'a': 1}]),
+            ('/api/reviews/', ['nope', 1]),
+        ]:
+            with self.subTest(url=url, values=values):
+                self.assertEqual(client.get(f'{url}?cursor={cursor(values)}').status_code, 404)
+        # A well-formed cursor still pages
+        self.assertEqual(client.get(f"/api/offers/?cursor={cursor(['2025-01-01', self.offers[2].id])}").status_code, 200)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.org, self.org_user, self.volunteers, self.projekt, self.offers = make_fixture(n_offers=3, n_volunteers=2)
+        self.client = APIClient()
+
+    def _revalidate(self, url, etag):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(ctx.captured_queries)
+
+    def test_unchanged_list_is_304_without_queries(self):
+        first = self.client.get('/api/offers/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+
+        response, queries = self._revalidate('/api/offers/', first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(queries, 0)
+
+    def test_participant_change_or_delete_changes_etag(self):
+        etag = self.client.get('/api/offers/')['ETag']
+        zlecenie = Zlecenie.objects.filter(oferta=self.offers[0]).first()
+        zlecenie.czy_potwierdzone = True
+        zlecenie.save()
+        response, _ = self._revalidate('/api/offers/', etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.offers[2].delete()
+        response, _ = self._revalidate('/api/offers/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_etag_depends_on_filters(self):
+        etag = self.client.get('/api/offers/')['ETag']
+        self.assertNotEqual(self.client.get('/api/offers/?lokalizacja=Krak')['ETag'], etag)
+
+    def test_project_etag_follows_its_offers(self):
+        url = f'/api/projects/{self.projekt.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self._revalidate(url, etag)[0].status_code, 304)
+        Oferta.objects.create(organizacja=self.org, projekt=self.projekt, tytul_oferty='Nowa', lokalizacja='Kraków')
+        self.assertEqual(self._revalidate(url, etag)[0].status_code, 200)
+
+    def test_detail_if_modified_since(self):
+        url = f'/api/offers/{self.offers[0].id}/'
+        first = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/api/offers/999999/').status_code, 404)
+
+    def test_current_profile_etag(self):
+        self.client.force_authenticate(self.volunteers[0])
+        etag = self.client.get('/api/volunteers/me/')['ETag']
+        self.assertEqual(self.client.get('/api/volunteers/me/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.volunteers[0].first_name = 'Zmienione'
+        self.volunteers[0].save()
+        self.assertEqual(self.client.get('/api/volunteers/me/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-cache-tests'},
+})
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache.response_cache().clear()
+        self.a = make_fixture(n_offers=2, n_volunteers=1, prefix='a')
+        self.b = make_fixture(n_offers=2, n_volunteers=1, prefix='b')
+        self.client = APIClient()
+
+    def _get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Cache')
+
+    def test_repeated_anonymous_list_is_served_from_cache(self):
+        self.assertEqual(self._get('/api/offers/?lokalizacja=Krak&page=1'), 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/offers/?page=1&lokalizacja=Krak&tematyka=')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['count'], 4)
+        # The ETag version comes from the tag generations too
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(response_cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_invalidation_is_scoped_to_the_project_and_organization(self):
+        _, _, _, projekt_a, offers_a = self.a
+        org_b, _, _, projekt_b, _ = self.b
+        urls = ['/api/offers/', f'/api/offers/?projekt={projekt_a.id}', f'/api/offers/?projekt={projekt_b.id}',
+                f'/api/projects/?organizacja={org_b.id}']
+        for url in urls:
+            self._get(url)
+
+        offers_a[0].tytul_oferty = 'Zmieniona'
+        offers_a[0].save()
+        self.assertEqual([self._get(url) for url in urls], ['MISS', 'MISS', 'HIT', 'HIT'])
+        titles = {o['id']: o['tytul_oferty'] for o in self.client.get(f'/api/offers/?projekt={projekt_a.id}').data['results']}
+        self.assertEqual(titles[offers_a[0].id], 'Zmieniona')
+
+    def test_participant_and_move_invalidate_listings(self):
+        _, _, volunteers_a, projekt_a, offers_a = self.a
+        _, _, _, projekt_b, _ = self.b
+        url_a, url_b = f'/api/offers/?projekt={projekt_a.id}', f'/api/offers/?projekt={projekt_b.id}'
+        self._get(url_a)
+        Zlecenie.objects.filter(oferta=offers_a[0]).update(czy_potwierdzone=True)  # bypasses signals
+        self.assertEqual(self._get(url_a), 'HIT')
+        Zlecenie.objects.get(oferta=offers_a[0], wolontariusz=volunteers_a[0]).save()
+        self.assertEqual(self._get(url_a), 'MISS')
+
+        self._get(url_b)
+        offers_a[1].projekt = projekt_b
+        offers_a[1].save()
+        self.assertEqual(self._get(url_a), 'MISS')
+        self.assertEqual(self._get(url_b), 'MISS')
+
+    def test_organization_detail_and_authenticated_offers(self):
+        org_a, org_user, _, _, _ = self.a
+        Organizacja.objects.filter(pk=org_a.pk).update(weryfikacja=True)
+        org_a.refresh_from_db()
+        url = f'/api/organizations/{org_a.id}/'
+        self.assertEqual(self._get(url), 'MISS')
+        self.assertEqual(self._get(url), 'HIT')
+        org_a.nazwa_organizacji = 'Nowa nazwa'
+        org_a.save()
+        self.assertEqual(self.client.get(url).data['nazwa_organizacji'], 'Nowa nazwa')
+
+        self.client.force_authenticate(org_user)
+        self.assertIsNone(self._get('/api/offers/'))
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'token-cache-tests'},
+})
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        _, self.org_user, _, _, _ = make_fixture(n_offers=0, n_volunteers=0)
+        self.token = Token.objects.create(user=self.org_user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _me(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/volunteers/me/')
+        return response, len(ctx.captured_queries)
+
+    def test_cached_token_needs_no_queries(self):
+        response, queries = self._me()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 1)
+        response, queries = self._me()
+        self.assertEqual(response.data['organizacja']['nazwa_organizacji'], 'Fundacja')
+        self.assertEqual(queries, 0)
+
+    def test_profile_and_organization_changes_are_visible(self):
+        self._me()
+        self.org_user.first_name = 'Anna'
+        self.org_user.save()
+        self.assertEqual(self._me()[0].data['first_name'], 'Anna')
+
+        organizacja = self.org_user.organizacja
+        organizacja.nazwa_organizacji = 'Nowa'
+        organizacja.save()
+        self.assertEqual(self._me()[0].data['organizacja']['nazwa_organizacji'], 'Nowa')
+
+    def test_logout_and_deactivation_revoke_cached_token(self):
+        self._me()
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(self._me()[0].status_code, 401)
+
+        token = Token.objects.create(user=self.org_user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self._me()
+        self.org_user.is_active = False
+        self.org_user.save()
+        self.assertEqual(self._me()[0].status_code, 401)
+
+    def test_cache_holds_no_credentials(self):
+        self._me()
+        entry = authentication.token_cache().get(authentication._cache_key(self.token.key))
+        self.assertNotIn(self.token.key, repr(entry))
+        self.assertNotIn(self.org_user.password, repr(entry))
+
+        # The rebuilt user loads the hash only when asked, and is safe to save
+        response, queries = self._me()
+        self.assertEqual(queries, 0)
+        user = response.wsgi_request.user
+        self.assertTrue(user.check_password('haslo123'))
+        Uzytkownik.objects.filter(pk=user.pk).update(nieprzeczytane_wiadomosci=3)
+        user.first_name = 'Anna'
+        user.save()
+        self.org_user.refresh_from_db()
+        self.assertTrue(self.org_user.check_password('haslo123'))
+        self.assertEqual((self.org_user.first_name, self.org_user.nieprzeczytane_wiadomosci), ('Anna', 3))
+
+    def test_bulk_deactivation_with_forget_user_tokens(self):
+        self._me()
+        Uzytkownik.objects.filter(pk=self.org_user.pk).update(is_active=False)
+        authentication.forget_user_tokens([self.org_user.pk])
+        self.assertEqual(self._me()[0].status_code, 401)
+
+
+@override_settings(STORAGES={**settings.STORAGES, 'certificates': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+class CertificateCacheTests(TestCase):
+    def setUp(self):
+        _, self.org_user, volunteers, _, self.offers = make_fixture(n_offers=2, n_volunteers=1)
+        self.volunteer = volunteers[0]
+        Zlecenie.objects.filter(oferta=self.offers[0]).update(czy_ukonczone=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.volunteer)
+
+    def _download(self, url='/api/volunteers/my_certificate/'):
+        """Request a certificate; when it is queued, run the worker and follow the job to the PDF."""
+        response = self.client.get(url)
+        if response.status_code == 202:
+            self.assertEqual(response['Location'], response.data['status_url'])
+            call_command('run_jobs', once=True, stdout=io.StringIO())
+            job = self.client.get(response['Location']).data
+            self.assertEqual(job['status'], Zadanie.GOTOWE)
+            response = self.client.get(job['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        return b''.join(response.streaming_content)
+
+    def test_first_request_is_queued_and_second_is_served_from_cache(self):
+        with mock.patch('wolontariat.certificates.render_user_certificate', wraps=render_user_certificate) as render:
+            self.assertEqual(self.client.get('/api/volunteers/my_certificate/').status_code, 202)
+            self.assertEqual(render.call_count, 0)
+            first = self._download()
+            second = self.client.get('/api/volunteers/my_certificate/')
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first, b''.join(second.streaming_content))
+
+    def test_repeated_requests_share_one_queued_job(self):
+        first = self.client.get('/api/auth/certificate/')
+        second = self.client.get('/api/auth/certificate/')
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(Zadanie.objects.count(), 1)
+
+    def test_approving_another_assignment_rerenders(self):
+        with mock.patch('wolontariat.certificates.render_user_certificate', wraps=render_user_certificate) as render:
+            self._download()
+            org_client = APIClient()
+            org_client.force_authenticate(self.org_user)
+            org_client.post(
+                f'/api/offers/{self.offers[1].id}/approve_volunteer/', {'wolontariusz_id': self.volunteer.id}, format='json'
+            )
+            self._download()
+        self.assertEqual(render.call_count, 2)
+        storage = storages[settings.CERTIFICATE_STORAGE]
+        self.assertEqual(len(storage.listdir(f'certificates/{self.volunteer.id}')[1]), 1)
+
+    def test_offer_certificate_is_cached(self):
+        url = f'/api/offers/{self.offers[0].id}/certificate/'
+        with mock.patch('wolontariat.certificates.render_offer_certificate', wraps=render_offer_certificate) as render:
+            self.assertEqual(self._download(url), self._download(url))
+        self.assertEqual(render.call_count, 1)
+
+    def test_range_request_returns_partial_content(self):
+        pdf = self._download()
+        response = self.client.get('/api/volunteers/my_certificate/', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(pdf)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), pdf[10:20])
+
+        response = self.client.get('/api/volunteers/my_certificate/', HTTP_RANGE=f'bytes={len(pdf)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_full_download_sets_length_and_etag(self):
+        pdf = self._download()
+        response = self.client.get('/api/volunteers/my_certificate/')
+        self.assertEqual(response['Content-Length'], str(len(pdf)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        stale = self.client.get('/api/volunteers/my_certificate/', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"other"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_sendfile_offload(self):
+        self._download()
+        with self.settings(DOCUMENT_SENDFILE='x-accel-redirect', DOCUMENT_SENDFILE_ROOT='/protected/'):
+            response = self.client.get('/api/volunteers/my_certificate/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['X-Accel-Redirect'].startswith(f'/protected/certificates/{self.volunteer.id}/'))
+        self.assertEqual(response.content, b'')
+
+    def test_jobs_are_private_to_their_requester(self):
+        job_id = self.client.get('/api/volunteers/my_certificate/').data['id']
+        other = APIClient()
+        other.force_authenticate(self.org_user)
+        self.assertEqual(other.get(f'/api/jobs/{job_id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/download/').status_code, 409)
+
+
+@override_settings(STORAGES={**settings.STORAGES, 'certificates': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+class BulkCertificateTests(TestCase):
+    def setUp(self):
+        _, self.org_user, self.volunteers, self.projekt, self.offers = make_fixture(n_offers=2, n_volunteers=3)
+        Zlecenie.objects.filter(oferta=self.offers[0]).update(czy_ukonczone=True)
+        Zlecenie.objects.filter(oferta=self.offers[1], wolontariusz=self.volunteers[2]).update(czy_ukonczone=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def _zip(self, url):
+        """GET the export: queued (202) the first time, then served from the finished job."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        call_command('run_jobs', once=True, stdout=io.StringIO())
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        return {name: archive.read(name) for name in archive.namelist()}
+
+    @override_settings(CERTIFICATE_WORKERS=1)
+    def test_offer_zip_contains_every_completing_volunteer(self):
+        files = self._zip(f'/api/offers/{self.offers[0].id}/certificates/')
+        self.assertEqual(len(files), 3)
+        self.assertTrue(all(data.startswith(b'%PDF') for data in files.values()))
+
+    @override_settings(CERTIFICATE_WORKERS=1)
+    def test_project_zip_contains_one_certificate_per_volunteer(self):
+        files = self._zip(f'/api/projects/{self.projekt.id}/certificates/')
+        self.assertEqual(sorted(files), sorted(f'zaswiadczenie_{v.username}.pdf' for v in self.volunteers))
+
+    @override_settings(CERTIFICATE_WORKERS=1)
+    def test_changed_certificates_need_a_new_export(self):
+        url = f'/api/offers/{self.offers[0].id}/certificates/'
+        self._zip(url)
+        self.offers[0].tytul_oferty = 'Nowy tytuł'
+        self.offers[0].save()
+        self.assertEqual(self.client.get(url).status_code, 202)
+
+    def test_volunteer_cannot_download_offer_zip(self):
+        self.client.force_authenticate(self.volunteers[0])
+        self.assertEqual(self.client.get(f'/api/offers/{self.offers[0].id}/certificates/').status_code, 403)
+
+    def test_zip_export_job(self):
+        response = self.client.post(f'/api/offers/{self.offers[0].id}/certificates/')
+        self.assertEqual(response.status_code, 202)
+        with override_settings(CERTIFICATE_WORKERS=1):
+            call_command('run_jobs', once=True, stdout=io.StringIO())
+        download = self.client.get(self.client.get(response['Location']).data['download_url'])
+        self.assertEqual(download['Content-Type'], 'application/zip')
+        self.assertEqual(len(zipfile.ZipFile(io.BytesIO(b''.join(download.streaming_content))).namelist()), 3)
+
+    def test_command_renders_in_process_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'out.zip')
+            call_command('generate_certificates', project=self.projekt.id, workers=2, output=output, stdout=io.StringIO())
+            self.assertEqual(len(zipfile.ZipFile(output).namelist()), 3)
+
+
+@skipIf(get_pl_font_names()[0] == 'Helvetica', 'no TTF font with Polish glyphs installed')
+class CertificateRenderingTests(SimpleTestCase):
+    def test_polish_text_is_drawn_with_embedded_font(self):
+        pdf = render_offer_certificate('Łukasz', 'Zbiórka żywności')
+        self.assertIn(b'/FontFile2', pdf)
+        self.assertNotIn(b'/Helvetica', pdf)
+
+    def test_background_form_is_shared_by_all_pages(self):
+        assignments = [(i, f'Oferta {i}', 'Projekt') for i in range(60)]
+        pdf = render_user_certificate('vol', 'vol@example.com', assignments)
+        self.assertGreater(pdf.count(b'/Type /Page\n'), 1)
+        self.assertEqual(pdf.count(b'/Subtype /Form'), 1)
+
+    def test_repeated_renders_embed_the_same_font_subset(self):
+        first = render_offer_certificate('Anna', 'Oferta')
+        second = render_offer_certificate('Żaneta', 'Sprzątanie')
+
+        def font_file(pdf):
+            start = pdf.index(b'/Length1')
+            return pdf[start:pdf.index(b'endstream', start)]
+
+        self.assertEqual(font_file(first), font_file(second))
+
+
+class JobQueueTests(TransactionTestCase):
+    def setUp(self):
+        _, self.org_user, _, _, self.offers = make_fixture(n_offers=1, n_volunteers=0)
+        self.jobs = [
+            enqueue(Zadanie.ZIP_OFERTY, self.org_user, f'{i}.zip', oferta_id=self.offers[0].id) for i in range(2)
+        ]
+
+    def test_claim_skips_rows_locked_by_another_worker(self):
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_first_job():
+            with transaction.atomic():
+                Zadanie.objects.select_for_update().get(pk=self.jobs[0].pk)
+                locked.set()
+                release.wait(5)
+            connection.close()
+
+        worker = threading.Thread(target=hold_first_job)
+        worker.start()
+        try:
+            locked.wait(5)
+            self.assertEqual(claim().pk, self.jobs[1].pk)
+            self.assertIsNone(claim())
+        finally:
+            release.set()
+            worker.join()
+        self.assertEqual(claim().pk, self.jobs[0].pk)
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_failing_job_is_retried_then_marked_failed(self):
+        Zadanie.objects.filter(pk=self.jobs[1].pk).delete()
+        Oferta.objects.filter(pk=self.offers[0].pk).delete()
+        run(claim())
+        self.assertEqual(Zadanie.objects.get(pk=self.jobs[0].pk).status, Zadanie.OCZEKUJE)
+        run(claim())
+        job = Zadanie.objects.get(pk=self.jobs[0].pk)
+        self.assertEqual(job.status, Zadanie.BLAD)
+        self.assertIn('DoesNotExist', job.blad)
+
+    @override_settings(JOB_MAX_ATTEMPTS=2, JOB_TIMEOUT=60)
+    def test_job_that_keeps_killing_workers_is_marked_failed(self):
+        long_ago = timezone.now() - timedelta(minutes=5)
+        Zadanie.objects.filter(pk=self.jobs[0].pk).update(status=Zadanie.W_TOKU, started_at=long_ago, proby=1)
+        # Abandoned once: claimed again
+        self.assertEqual(claim().pk, self.jobs[0].pk)
+        Zadanie.objects.filter(pk=self.jobs[0].pk).update(started_at=long_ago)
+        # Abandoned on its last attempt: failed, and the next job is claimed instead
+        self.assertEqual(claim().pk, self.jobs[1].pk)
+        job = Zadanie.objects.get(pk=self.jobs[0].pk)
+        self.assertEqual((job.status, job.proby), (Zadanie.BLAD, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(STORAGES={**settings.STORAGES, 'certificates': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+    def test_old_exports_are_deleted(self):
+        storage = certificate_storage()
+        names = [storage.save(f'exports/{job.pk}/{job.nazwa_pliku}', ContentFile(b'zip')) for job in self.jobs]
+        Zadanie.objects.filter(pk=self.jobs[0].pk).update(status=Zadanie.GOTOWE, plik=names[0], finished_at=timezone.now() - timedelta(days=2))
+        Zadanie.objects.filter(pk=self.jobs[1].pk).update(status=Zadanie.GOTOWE, plik=names[1], finished_at=timezone.now())
+
+        self.assertEqual(expire_exports(), 1)
+        self.assertFalse(storage.exists(names[0]))
+        self.assertFalse(result_exists(Zadanie.objects.get(pk=self.jobs[0].pk)))
+        self.assertTrue(storage.exists(names[1]))
+
+        # Deleting the user deletes their jobs and what they exported
+        self.org_user.delete()
+        self.assertFalse(storage.exists(names[1]))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import events, views
 
 router = DefaultRouter()
 router.register(r'projects', views.ProjektViewSet, basename='projects')
@@ -8,6 +8,8 @@ router.register(r'offers', views.OfertaViewSet, basename='offers')
 router.register(r'volunteers', views.UzytkownikViewSet, basename='volunteers')
 router.register(r'organizations', views.OrganizacjaViewSet, basename='organizations')
 router.register(r'reviews', views.RecenzjaViewSet, basename='recenzja')
+router.register(r'jobs', views.ZadanieViewSet, basename='jobs')
+router.register(r'messages', views.WiadomoscViewSet, basename='messages')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -18,6 +20,12 @@ urlpatterns = [
     path('auth/logout/', views.logout, name='logout'),
     path('auth/certificate/', views.certificate, name='certificate'),
 
+    # Incremental sync: rows changed since a position in the change log
+    path('changes/', views.change_feed, name='changes'),
+
+    # Server-sent events, ASGI only
+    path('events/', events.event_stream, name='events'),
+
     # Keep DRF's built-in session auth for admin
     # path('auth/', include('rest_framework.urls')),
 ]
@@ -1,40 +1,121 @@
-from rest_framework import viewsets, status
+import base64
+import binascii
+from collections import defaultdict
+
+from rest_framework import mixins, viewsets, status
+from rest_framework.generics import get_object_or_404
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.authtoken.models import Token
-from django.db.models import Q
 from django.contrib.auth import authenticate
-from django.http import HttpResponse
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from wolontariat.pdf_utils import get_pl_font_names
-from wolontariat.models import Projekt, Oferta, Uzytkownik, Organizacja, Recenzja, Zlecenie
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from wolontariat.search import search_offers, search_projects
+from wolontariat.certificates import (
+    certificate_storage, is_cached, user_certificate_job_for, offer_certificate_job_for, invalidate_certificates,
+    offer_certificate_jobs, project_certificate_jobs, export_digest,
+)
+from wolontariat.counters import (
+    ALREADY_APPLIED, CLOSED, FULL, OFFER_COUNTERS, adjust_offer, application_deltas, apply_for_offer,
+)
+from wolontariat.jobs import enqueue, result_exists
+from wolontariat.metrics import cache_lookup
+from wolontariat import changes, events, messaging
+from wolontariat.response_cache import OFFERS, ORGANIZATIONS, PROJECTS, invalidate_projects, organization_tag, project_tag
+from wolontariat.models import Projekt, Oferta, Uzytkownik, Organizacja, Recenzja, Zlecenie, Zadanie, Wiadomosc, Zmiana
 from .serializers import (
-    ProjektSerializer, OfertaSerializer, OfertaCreateSerializer,
+    ProjektSerializer, OfertaSerializer, OfertaListSerializer, OfertaCreateSerializer,
     UzytkownikSerializer, OrganizacjaSerializer,
-    RecenzjaSerializer, RecenzjaCreateSerializer
+    RecenzjaSerializer, RecenzjaCreateSerializer, ZadanieSerializer, WiadomoscSerializer
 )
 from .permissions import IsOrganization, IsOwnerOrReadOnly
+from .documents import stored_document_response
+from .caching import ResponseCacheMixin
+from .pagination import KeysetOnlyPagination
+from .projections import (
+    ApplicationProjection, OfferListProjection, ProjectListProjection, ProjectedListMixin, ReviewListProjection,
+)
+from .conditional import ConditionalGetMixin, conditional_response, content_etag, set_validators
+
+
+# Seconds a client should wait before polling a queued job again
+JOB_RETRY_AFTER = 1
+
+# Volunteers accepted by one confirm_volunteers / approve_volunteers call (messages by one mark_read)
+BULK_UPDATE_LIMIT = 500
+
+# Change log entries read by one GET /api/changes/
+CHANGES_LIMIT = 500
+
+# Change log model -> (model, projection rendering its rows as the list endpoints do)
+CHANGE_PROJECTIONS = {
+    Zmiana.OFERTA: (Oferta, OfferListProjection()),
+    Zmiana.PROJEKT: (Projekt, ProjectListProjection()),
+    Zmiana.ZLECENIE: (Zlecenie, ApplicationProjection()),
+    Zmiana.RECENZJA: (Recenzja, ReviewListProjection()),
+}
+
+
+def job_accepted_response(request, zadanie):
+    """202 pointing the client at the job's status endpoint (GET /api/jobs/{id}/)."""
+    data = ZadanieSerializer(zadanie, context={'request': request}).data
+    response = Response(data, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = data['status_url']
+    response['Retry-After'] = str(JOB_RETRY_AFTER)
+    return response
+
 
+def certificate_or_job(request, certificate_job, rodzaj, filename, **parametry):
+    """Serve the certificate if it has been rendered already, otherwise queue a job that renders it."""
+    cached = is_cached(certificate_job)
+    cache_lookup('certificates', cached)
+    if not cached:
+        zadanie = enqueue(rodzaj, request.user, filename, klucz=certificate_job.cache_name, **parametry)
+        return job_accepted_response(request, zadanie)
+    return stored_document_response(request, certificate_storage(), certificate_job.cache_name, filename)
 
 
-class ProjektViewSet(viewsets.ModelViewSet):
+def export_or_job(request, rodzaj, jobs, filename, **parametry):
+    """
+    Serve a finished export of exactly these certificates, otherwise queue a job that builds it:
+    ZIPs are never rendered inside a request worker. The job key carries the content digest,
+    so any change to the certificates makes earlier exports stale.
+    """
+    klucz = f'{rodzaj}:{export_digest(jobs)}'
+    if request.method == 'GET':
+        done = (
+            Zadanie.objects.filter(rodzaj=rodzaj, klucz=klucz, status=Zadanie.GOTOWE)
+            .exclude(plik='').order_by('-finished_at').first()
+        )
+        if done is not None and result_exists(done):
+            return stored_document_response(request, certificate_storage(), done.plik, filename)
+    zadanie = enqueue(rodzaj, request.user, filename, klucz=klucz, **parametry)
+    return job_accepted_response(request, zadanie)
+
+
+class ProjektViewSet(ConditionalGetMixin, ResponseCacheMixin, ProjectedListMixin, viewsets.ModelViewSet):
     serializer_class = ProjektSerializer
+    list_projection = ProjectListProjection()
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-id',)
+    etag_timestamps = ('updated_at', 'organizacja__updated_at', 'oferty__updated_at')
+    etag_counts = ('id', 'oferty')
+
+    def response_cache_tags(self):
+        organizacja_id = self.request.query_params.get('organizacja')
+        return [organization_tag(organizacja_id)] if organizacja_id else [PROJECTS]
 
     def get_queryset(self):
-        queryset = Projekt.objects.all()
+        # Newest first; a stable order keeps page numbers from repeating or skipping rows
+        queryset = Projekt.objects.order_by('-id')
         organizacja_id = self.request.query_params.get('organizacja')
         if organizacja_id:
             queryset = queryset.filter(organizacja_id=organizacja_id)
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(nazwa_projektu__icontains=search) |
-                Q(opis_projektu__icontains=search)
-            )
+            queryset = search_projects(queryset, search)
         return queryset
 
     def perform_create(self, serializer):
@@ -63,20 +144,58 @@ class ProjektViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def oferty(self, request, pk=None):
         project = self.get_object()
-        offers = project.oferty.all()
-        serializer = OfertaSerializer(offers, many=True)
+        offers = OfertaSerializer.setup_eager_loading(project.oferty.all())
+        serializer = OfertaListSerializer(offers, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
-class OfertaViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get', 'post'], permission_classes=[IsAuthenticated])
+    def certificates(self, request, pk=None):
+        """
+        ZIP with the certificates of every volunteer who completed an offer of this project.
+        GET serves the last export if the certificates have not changed since; otherwise, and
+        on POST, an export job is queued and the answer is 202 with its status URL.
+        """
+        project = self.get_object()
+
+        if request.user.rola not in ['organizacja', 'koordynator']:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        if request.user.rola == 'organizacja' and project.organizacja != request.user.organizacja:
+            return Response({'error': 'Not your project'}, status=status.HTTP_403_FORBIDDEN)
+
+        if not Zlecenie.objects.filter(oferta__projekt=project, czy_ukonczone=True).exists():
+            return Response({'error': 'No completed assignments'}, status=status.HTTP_404_NOT_FOUND)
+        filename = f"zaswiadczenia_projekt_{project.pk}.zip"
+        return export_or_job(request, Zadanie.ZIP_PROJEKTU, project_certificate_jobs(project), filename, projekt_id=project.pk)
+
+class OfertaViewSet(ConditionalGetMixin, ResponseCacheMixin, ProjectedListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
+    list_projection = OfferListProjection()
+    cursor_ordering = ('data', 'id')
+    etag_timestamps = ('updated_at', 'zlecenia__updated_at', 'projekt__updated_at', 'organizacja__updated_at')
+    etag_counts = ('id', 'zlecenia')
+
+    def use_response_cache(self, request):
+        # Anonymous visitors all see the same listing
+        return not request.user.is_authenticated
+
+    def response_cache_tags(self):
+        params = self.request.query_params
+        tags = []
+        if params.get('projekt'):
+            tags.append(project_tag(params['projekt']))
+        if params.get('organizacja'):
+            tags.append(organization_tag(params['organizacja']))
+        return tags or [OFFERS]
 
     def get_serializer_class(self):
         if self.action == 'create':
             return OfertaCreateSerializer
+        if self.action == 'list':
+            return OfertaListSerializer
         return OfertaSerializer
 
     def get_queryset(self):
-        queryset = Oferta.objects.all()
+        queryset = Oferta.objects.order_by('-id')
 
         projekt_id = self.request.query_params.get('projekt')
         if projekt_id:
@@ -95,25 +214,26 @@ class OfertaViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(czas_trwania__icontains=czas_trwania)
         tylko_wolne = self.request.query_params.get('tylko_wolne')
         if tylko_wolne and tylko_wolne.lower() == 'true':
-            queryset = queryset.filter(zlecenia__isnull=True)
+            queryset = queryset.filter(liczba_uczestnikow=0)
         wymagania = self.request.query_params.get('wymagania')
         if wymagania:
             queryset = queryset.filter(wymagania__icontains=wymagania)
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(tytul_oferty__icontains=search) |
-                Q(lokalizacja__icontains=search) |
-                Q(tematyka__icontains=search) |
-                Q(wymagania__icontains=search)
-            )
+            queryset = search_offers(queryset, search)
         completed = self.request.query_params.get('completed')
         if completed is not None:
             if completed.lower() == 'true':
                 queryset = queryset.filter(czy_ukonczone=True)
             else:
                 queryset = queryset.filter(czy_ukonczone=False)
-        return queryset
+        return OfertaSerializer.setup_eager_loading(queryset)
+
+    def _offer_data(self, offer):
+        # get_object() prefetched the participants; drop them so the response reflects the change
+        offer._prefetched_objects_cache = {}
+        offer.refresh_from_db(fields=OFFER_COUNTERS)
+        return OfertaSerializer(offer).data
 
     def perform_create(self, serializer):
         # RESTRICTION: Only Organizations can create offers
@@ -136,6 +256,15 @@ class OfertaViewSet(viewsets.ModelViewSet):
                 raise PermissionDenied("Nie możesz usunąć tej oferty.")
         instance.delete()
 
+    def _management_denied(self, request, offer):
+        """403 response unless the user may manage the offer's applications, otherwise None."""
+        if request.user.rola not in ['organizacja', 'koordynator']:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        # Only Organizations are restricted to their own offers. Coordinators can approve any.
+        if request.user.rola == 'organizacja' and offer.organizacja_id != request.user.organizacja_id:
+            return Response({'error': 'Not your offer'}, status=status.HTTP_403_FORBIDDEN)
+        return None
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def apply(self, request, pk=None):
         """Apply for an offer (volunteers only)"""
@@ -145,29 +274,39 @@ class OfertaViewSet(viewsets.ModelViewSet):
         if offer.czy_ukonczone:
             return Response({'error': 'Offer is closed'}, status=status.HTTP_400_BAD_REQUEST)
 
-        zlecenie, created = Zlecenie.objects.get_or_create(oferta=offer, wolontariusz=request.user)
-        if not created:
+        result = apply_for_offer(offer.pk, request.user.pk)
+        if result == ALREADY_APPLIED:
                 return Response({'message': 'Already applied'}, status=status.HTTP_200_OK)
-        return Response(OfertaSerializer(offer).data)
+        if result == CLOSED:
+            return Response({'error': 'Offer is closed'}, status=status.HTTP_400_BAD_REQUEST)
+        if result == FULL:
+            return Response({'error': 'Offer is full'}, status=status.HTTP_409_CONFLICT)
+        # Inserted without save(): invalidate what the Zlecenie signals would have
+        invalidate_projects([(offer.projekt_id, offer.organizacja_id)])
+        events.publish_to_organization(
+            offer.organizacja_id, events.APPLICATION_CREATED, {'oferta': offer.pk, 'wolontariusz': request.user.pk},
+        )
+        return Response(self._offer_data(offer))
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def confirm_volunteer(self, request, pk=None):
         """Organization/Coordinator accepts application"""
         offer = self.get_object()
-
-        if request.user.rola not in ['organizacja', 'koordynator']:
-                return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-
-        # Only Organizations are restricted to their own offers. Coordinators can approve any.
-        if request.user.rola == 'organizacja' and offer.organizacja != request.user.organizacja:
-                return Response({'error': 'Not your offer'}, status=status.HTTP_403_FORBIDDEN)
+        denied = self._management_denied(request, offer)
+        if denied:
+            return denied
 
         vol_id = request.data.get('wolontariusz_id')
         try:
-            zlecenie = Zlecenie.objects.get(oferta=offer, wolontariusz_id=vol_id)
-            zlecenie.czy_potwierdzone = True
-            zlecenie.save()
-            return Response(OfertaSerializer(offer).data)
+            with transaction.atomic():
+                # Locked, so two concurrent confirmations count once
+                zlecenie = Zlecenie.objects.select_for_update().get(oferta=offer, wolontariusz_id=vol_id)
+                if not zlecenie.czy_potwierdzone:
+                    zlecenie.czy_potwierdzone = True
+                    zlecenie.save()
+                    adjust_offer(offer.pk, potwierdzeni=1)
+                    events.publish([zlecenie.wolontariusz_id], events.APPLICATION_CONFIRMED, {'oferta': offer.pk})
+            return Response(self._offer_data(offer))
         except Zlecenie.DoesNotExist:
             return Response({'error': 'Application not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -175,27 +314,103 @@ class OfertaViewSet(viewsets.ModelViewSet):
     def approve_volunteer(self, request, pk=None):
         """Organization/Coordinator marks work as done"""
         offer = self.get_object()
-
-        if request.user.rola not in ['organizacja', 'koordynator']:
-                return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-
-        if request.user.rola == 'organizacja' and offer.organizacja != request.user.organizacja:
-                return Response({'error': 'Not your offer'}, status=status.HTTP_403_FORBIDDEN)
+        denied = self._management_denied(request, offer)
+        if denied:
+            return denied
 
         vol_id = request.data.get('wolontariusz_id')
         try:
-            zlecenie = Zlecenie.objects.get(oferta=offer, wolontariusz_id=vol_id)
-            zlecenie.czy_ukonczone = True
-            zlecenie.save()
-            return Response(OfertaSerializer(offer).data)
+            with transaction.atomic():
+                zlecenie = Zlecenie.objects.select_for_update().get(oferta=offer, wolontariusz_id=vol_id)
+                if not zlecenie.czy_ukonczone:
+                    zlecenie.czy_ukonczone = True
+                    zlecenie.save()
+                    adjust_offer(offer.pk, ukonczeni=1)
+                    events.publish([zlecenie.wolontariusz_id], events.APPLICATION_COMPLETED, {'oferta': offer.pk})
+            invalidate_certificates(zlecenie.wolontariusz_id)
+            return Response(self._offer_data(offer))
         except Zlecenie.DoesNotExist:
             return Response({'error': 'Volunteer not assigned'}, status=status.HTTP_404_NOT_FOUND)
 
+    def _bulk_update(self, request, pk, field, counter, pending, event):
+        """
+        Set ``field`` on many applications of the offer at once. The body is either
+        ``{"wolontariusz_ids": [...]}`` or ``{"all": true}`` for every application matching ``pending``.
+        One transaction: the rows are locked, then changed with a single UPDATE. The answer
+        lists each volunteer as "updated", "unchanged" (already set) or "not_found".
+        ``counter`` is the adjust_offer() argument that counts ``field``; ``event`` goes to the updated volunteers.
+        """
+        # Not get_object(): the participants prefetched for the full serializer are not needed here
+        offer = get_object_or_404(Oferta.objects.only('id', 'organizacja_id', 'projekt_id'), pk=pk)
+        self.check_object_permissions(request, offer)
+        denied = self._management_denied(request, offer)
+        if denied:
+            return denied
+
+        ids = request.data.get('wolontariusz_ids')
+        everyone = request.data.get('all') is True
+        if everyone == (ids is not None):
+            return Response({'error': 'Provide either wolontariusz_ids or all: true'}, status=status.HTTP_400_BAD_REQUEST)
+        if not everyone:
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                return Response({'error': 'wolontariusz_ids must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(ids) > BULK_UPDATE_LIMIT:
+                return Response({'error': f'At most {BULK_UPDATE_LIMIT} volunteers per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            applications = Zlecenie.objects.filter(oferta=offer)
+            applications = applications.filter(**pending) if everyone else applications.filter(wolontariusz_id__in=ids)
+            current = dict(applications.select_for_update().order_by('wolontariusz_id').values_list('wolontariusz_id', field))
+            changed = [vol_id for vol_id, value in current.items() if not value]
+            if changed:
+                # update() skips save(): set the ETag version and invalidate what the signals would have
+                Zlecenie.objects.filter(oferta=offer, wolontariusz_id__in=changed).update(
+                    **{field: True, 'updated_at': timezone.now()}
+                )
+                adjust_offer(offer.pk, **{counter: len(changed)})
+                invalidate_projects([(offer.projekt_id, offer.organizacja_id)])
+                events.publish(changed, event, {'oferta': offer.pk})
+
+        if field == 'czy_ukonczone':
+            for vol_id in changed:
+                invalidate_certificates(vol_id)
+
+        results = [
+            {'wolontariusz_id': vol_id, 'status': 'unchanged' if value else 'updated'}
+            for vol_id, value in current.items()
+        ]
+        if not everyone:
+            results += [{'wolontariusz_id': vol_id, 'status': 'not_found'} for vol_id in dict.fromkeys(ids) if vol_id not in current]
+        return Response({'oferta': offer.id, 'updated': len(changed), 'results': results})
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def confirm_volunteers(self, request, pk=None):
+        """Accept many applications at once"""
+        return self._bulk_update(
+            request, pk, 'czy_potwierdzone', 'potwierdzeni', pending={'czy_potwierdzone': False},
+            event=events.APPLICATION_CONFIRMED,
+        )
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def approve_volunteers(self, request, pk=None):
+        """Mark the work of many accepted volunteers as done"""
+        return self._bulk_update(
+            request, pk, 'czy_ukonczone', 'ukonczeni', pending={'czy_potwierdzone': True, 'czy_ukonczone': False},
+            event=events.APPLICATION_COMPLETED,
+        )
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def withdraw(self, request, pk=None):
         offer = self.get_object()
-        Zlecenie.objects.filter(oferta=offer, wolontariusz=request.user).delete()
-        return Response(OfertaSerializer(offer).data)
+        with transaction.atomic():
+            zlecenie = Zlecenie.objects.select_for_update().filter(oferta=offer, wolontariusz=request.user).first()
+            if zlecenie is not None:
+                zlecenie.delete()
+                adjust_offer(offer.pk, **application_deltas(zlecenie, sign=-1))
+                events.publish_to_organization(
+                    offer.organizacja_id, events.APPLICATION_WITHDRAWN, {'oferta': offer.pk, 'wolontariusz': request.user.pk},
+                )
+        return Response(self._offer_data(offer))
 
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def certificate(self, request, pk=None):
@@ -205,23 +420,29 @@ class OfertaViewSet(viewsets.ModelViewSet):
         if not has_completed:
             return Response({'error': 'You have not completed this offer'}, status=status.HTTP_403_FORBIDDEN)
 
-        buffer = BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=A4)
-        try:
-            regular_font, bold_font = get_pl_font_names()
-            pdf.setFont(bold_font, 20)
-        except:
-            pdf.setFont("Helvetica-Bold", 20)
-
-        pdf.drawCentredString(A4[0] / 2, A4[1] - 100, "Zaświadczenie")
-        pdf.drawString(100, A4[1] - 150, f"Wolontariusz: {request.user.username}")
-        pdf.drawString(100, A4[1] - 180, f"Ukończył ofertę: {offer.tytul_oferty}")
-        pdf.showPage()
-        pdf.save()
-        buffer.seek(0)
-        resp = HttpResponse(buffer.read(), content_type='application/pdf')
-        resp['Content-Disposition'] = f'attachment; filename="certificate.pdf"'
-        return resp
+        return certificate_or_job(
+            request, offer_certificate_job_for(request.user, offer), Zadanie.CERTYFIKAT_OFERTY, "certificate.pdf",
+            uzytkownik_id=request.user.pk, oferta_id=offer.pk,
+        )
+
+    @action(detail=True, methods=['get', 'post'], permission_classes=[IsAuthenticated])
+    def certificates(self, request, pk=None):
+        """
+        ZIP with the certificates of every volunteer who completed this offer.
+        GET serves the last export if the certificates have not changed since; otherwise, and
+        on POST, an export job is queued and the answer is 202 with its status URL.
+        """
+        offer = self.get_object()
+
+        if request.user.rola not in ['organizacja', 'koordynator']:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        if request.user.rola == 'organizacja' and offer.organizacja != request.user.organizacja:
+            return Response({'error': 'Not your offer'}, status=status.HTTP_403_FORBIDDEN)
+
+        if not offer.zlecenia.filter(czy_ukonczone=True).exists():
+            return Response({'error': 'No completed assignments'}, status=status.HTTP_404_NOT_FOUND)
+        filename = f"zaswiadczenia_oferta_{offer.pk}.zip"
+        return export_or_job(request, Zadanie.ZIP_OFERTY, offer_certificate_jobs(offer), filename, oferta_id=offer.pk)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_offers(self, request):
@@ -231,7 +452,8 @@ class OfertaViewSet(viewsets.ModelViewSet):
             offers = Oferta.objects.filter(organizacja=request.user.organizacja)
         else:
             offers = Oferta.objects.none()
-        return Response(OfertaSerializer(offers, many=True).data)
+        offers = OfertaSerializer.setup_eager_loading(offers)
+        return Response(OfertaListSerializer(offers, many=True, context=self.get_serializer_context()).data)
 
 class UzytkownikViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = UzytkownikSerializer
@@ -245,8 +467,14 @@ class UzytkownikViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current user profile"""
-        serializer = UzytkownikSerializer(request.user)
-        return Response(serializer.data)
+        serializer = UzytkownikSerializer(request.user, context=self.get_serializer_context())
+        etag = content_etag(serializer.data)
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        response = Response(serializer.data)
+        set_validators(response, etag)
+        return response
 
     @action(detail=False, methods=['get'])
     def volunteers(self, request):
@@ -264,7 +492,8 @@ class UzytkownikViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['get'])
     def certificate(self, request, pk=None):
         """
-        Generate and download a certificate for the volunteer's completed offers
+        Download a certificate for the volunteer's completed offers.
+        Answers 202 with a job (see ZadanieViewSet) while the PDF is being rendered.
         """
         user = self.get_object()
 
@@ -290,13 +519,11 @@ class UzytkownikViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
         try:
-            # Generate the certificate PDF
-            pdf_file = user.certyfikat_gen()
-
-            # Create the HTTP response with PDF content
-            response = HttpResponse(pdf_file, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="certificate_{user.username}.pdf"'
-            return response
+            # Serve the cached PDF, or queue a render and answer 202
+            return certificate_or_job(
+                request, user_certificate_job_for(user), Zadanie.CERTYFIKAT, f"certificate_{user.username}.pdf",
+                uzytkownik_id=user.pk,
+            )
 
         except Exception as e:
             return Response(
@@ -307,7 +534,8 @@ class UzytkownikViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_certificate(self, request):
         """
-        Generate and download certificate for the current user
+        Download certificate for the current user.
+        Answers 202 with a job (see ZadanieViewSet) while the PDF is being rendered.
         """
         user = request.user
 
@@ -326,13 +554,11 @@ class UzytkownikViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
         try:
-            # Generate the certificate PDF
-            pdf_file = user.certyfikat_gen()
-
-            # Create the HTTP response with PDF content
-            response = HttpResponse(pdf_file, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="certificate_{user.username}.pdf"'
-            return response
+            # Serve the cached PDF, or queue a render and answer 202
+            return certificate_or_job(
+                request, user_certificate_job_for(user), Zadanie.CERTYFIKAT, f"certificate_{user.username}.pdf",
+                uzytkownik_id=user.pk,
+            )
 
         except Exception as e:
             return Response(
@@ -340,10 +566,16 @@ class UzytkownikViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class OrganizacjaViewSet(viewsets.ReadOnlyModelViewSet):
+class OrganizacjaViewSet(ConditionalGetMixin, ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = OrganizacjaSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    queryset = Organizacja.objects.filter(weryfikacja=True)
+    queryset = Organizacja.objects.filter(weryfikacja=True).order_by('-id')
+    cached_actions = ('list', 'retrieve')
+
+    def response_cache_tags(self):
+        if self.action == 'retrieve':
+            return [organization_tag(self.kwargs['pk'])]
+        return [ORGANIZATIONS]
 
     @action(detail=True, methods=['get'])
     def projekty(self, request, pk=None):
@@ -353,7 +585,7 @@ class OrganizacjaViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = ProjektSerializer(projects, many=True)
         return Response(serializer.data)
 
-class RecenzjaViewSet(viewsets.ModelViewSet):
+class RecenzjaViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     """
     create: organization posts a review for a volunteer (via oferta)
     list: public list (or restricted) — we'll allow read for any, write only for org
@@ -362,6 +594,8 @@ class RecenzjaViewSet(viewsets.ModelViewSet):
     queryset = Recenzja.objects.select_related('organizacja', 'wolontariusz', 'oferta').all()
     # Corrected permission assignment
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-created_at', '-id')
+    list_projection = ReviewListProjection()
 
     def get_permissions(self):
         if self.action == 'create':
@@ -383,6 +617,98 @@ class RecenzjaViewSet(viewsets.ModelViewSet):
             qs = qs.filter(wolontariusz__id=wol_id)
         return qs
 
+class ZadanieViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Background jobs of the current user (certificate renders, ZIP exports).
+    Poll the detail endpoint until `status` is "gotowe", then fetch `download_url`.
+    """
+    serializer_class = ZadanieSerializer
+    permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-id',)
+
+    def get_queryset(self):
+        return Zadanie.objects.filter(zlecajacy=self.request.user).order_by('-id')
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data['status'] in [Zadanie.OCZEKUJE, Zadanie.W_TOKU]:
+            response['Retry-After'] = str(JOB_RETRY_AFTER)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        zadanie = self.get_object()
+        if zadanie.status != Zadanie.GOTOWE:
+            return Response({'error': 'Job is not finished'}, status=status.HTTP_409_CONFLICT)
+
+        if not result_exists(zadanie):
+            return Response({'error': 'Result is no longer available, request the document again'}, status=status.HTTP_410_GONE)
+        return stored_document_response(request, certificate_storage(), zadanie.plik, zadanie.nazwa_pliku)
+
+class WiadomoscViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    list: the user's inbox, newest first (``?nieprzeczytane=true`` for unread only)
+    conversation: messages exchanged with ``?uzytkownik=<id>``, newest first
+    Both are keyset-paginated: follow ``next``, there is no page count.
+    """
+    serializer_class = WiadomoscSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetOnlyPagination
+    # Served by the (odbiorca, data_wyslania, id) and (nadawca, odbiorca, data_wyslania, id) indexes
+    cursor_ordering = ('-data_wyslania', '-id')
+
+    def get_queryset(self):
+        user = self.request.user
+        messages = Wiadomosc.objects.select_related('nadawca', 'odbiorca')
+        if self.action == 'list':
+            messages = messages.filter(odbiorca=user)
+            unread = self.request.query_params.get('nieprzeczytane')
+            if unread and unread.lower() == 'true':
+                messages = messages.filter(przeczytana=False)
+            return messages
+        return messages.filter(Q(nadawca=user) | Q(odbiorca=user))
+
+    def perform_create(self, serializer):
+        serializer.save(nadawca=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def conversation(self, request):
+        try:
+            other = int(request.query_params.get('uzytkownik', ''))
+        except ValueError:
+            return Response({'error': 'uzytkownik must be a user id'}, status=status.HTTP_400_BAD_REQUEST)
+        messages = Wiadomosc.objects.select_related('nadawca', 'odbiorca').filter(
+            Q(nadawca=request.user, odbiorca_id=other) | Q(nadawca_id=other, odbiorca=request.user)
+        )
+        page = self.paginate_queryset(messages)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'nieprzeczytane': messaging.unread_count(request.user)})
+
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        """Body: ``{"ids": [...]}``, ``{"nadawca": id}`` (a whole conversation) or ``{"all": true}``."""
+        ids, nadawca, everyone = request.data.get('ids'), request.data.get('nadawca'), request.data.get('all') is True
+        if [ids is not None, nadawca is not None, everyone].count(True) != 1:
+            return Response({'error': 'Provide one of ids, nadawca or all: true'}, status=status.HTTP_400_BAD_REQUEST)
+
+        messages = Wiadomosc.objects.all()
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                return Response({'error': 'ids must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(ids) > BULK_UPDATE_LIMIT:
+                return Response({'error': f'At most {BULK_UPDATE_LIMIT} messages per request'}, status=status.HTTP_400_BAD_REQUEST)
+            messages = messages.filter(pk__in=ids)
+        elif nadawca is not None:
+            if not isinstance(nadawca, int) or isinstance(nadawca, bool):
+                return Response({'error': 'nadawca must be a user id'}, status=status.HTTP_400_BAD_REQUEST)
+            messages = messages.filter(nadawca_id=nadawca)
+
+        marked = messaging.mark_read(request.user, messages)
+        return Response({'oznaczone': marked, 'nieprzeczytane': messaging.unread_count(request.user)})
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -497,15 +823,75 @@ def logout(request):
 @permission_classes([IsAuthenticated])
 def certificate(request):
     """
-    Generate and download a PDF certificate for the current user
-    based on completed assignments.
+    Download a PDF certificate for the current user based on completed assignments.
+    Answers 202 with a job (see ZadanieViewSet) while the PDF is being rendered.
     """
     user: Uzytkownik = request.user  # type: ignore
     try:
-        content_file = user.certyfikat_gen()
-        resp = HttpResponse(content_file.read(), content_type='application/pdf')
-        filename = f"zaswiadczenie_{user.username}.pdf"
-        resp['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return resp
+        return certificate_or_job(
+            request, user_certificate_job_for(user), Zadanie.CERTYFIKAT, f"zaswiadczenie_{user.username}.pdf",
+            uzytkownik_id=user.pk,
+        )
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def encode_change_position(position):
+    txid, id = position
+    return base64.urlsafe_b64encode(f'{txid}.{id}'.encode('ascii')).decode('ascii')
+
+
+def decode_change_position(token):
+    """The (txid, id) log position of a ``since`` token, or None if it is not one."""
+    try:
+        txid, id = base64.urlsafe_b64decode(token.encode('ascii')).decode('ascii').split('.')
+        return int(txid), int(id)
+    except (ValueError, UnicodeError, binascii.Error):
+        return None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def change_feed(request):
+    """
+    Offers, projects, applications and reviews changed since ``?since=<token>``, each once, in
+    its current state as the list endpoints render it; deleted rows as tombstones (``deleted``
+    true, ``data`` null). Follow ``next`` while ``more`` is true. Without ``since`` only
+    ``next`` is returned: take it before loading the full lists, then sync from it.
+    """
+    since = request.query_params.get('since')
+    if not since:
+        return Response({'changes': [], 'next': encode_change_position(changes.head()), 'more': False})
+    position = decode_change_position(since)
+    if position is None:
+        return Response({'error': 'Invalid since token'}, status=status.HTTP_400_BAD_REQUEST)
+
+    entries = changes.read(position, CHANGES_LIMIT + 1)
+    more = len(entries) > CHANGES_LIMIT
+    entries = entries[:CHANGES_LIMIT]
+    if not entries:
+        return Response({'changes': [], 'next': since, 'more': False})
+
+    # Each row once, at the place of its last entry
+    latest = {}
+    for entry in entries:
+        key = (entry.model, entry.obiekt_id)
+        latest.pop(key, None)
+        latest[key] = entry
+
+    ids = defaultdict(list)
+    for model, obiekt_id in latest:
+        ids[model].append(obiekt_id)
+    current = {}
+    for model, obiekt_ids in ids.items():
+        model_class, projection = CHANGE_PROJECTIONS[model]
+        for row in projection.data(projection.rows(model_class.objects.filter(pk__in=obiekt_ids))):
+            current[model, row['id']] = row
+
+    # A row missing now was deleted, possibly after this batch: its own tombstone comes later
+    results = [
+        {'model': model, 'id': obiekt_id, 'deleted': (model, obiekt_id) not in current, 'data': current.get((model, obiekt_id))}
+        for model, obiekt_id in latest
+    ]
+    last = entries[-1]
+    return Response({'changes': results, 'next': encode_change_position((last.txid, last.id)), 'more': more})
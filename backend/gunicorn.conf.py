@@ -0,0 +1,10 @@
+# Read by gunicorn from the working directory (see wolontariat/metrics.py)
+import os
+
+
+def child_exit(server, worker):
+    # The gauges of a worker that exited must stop counting towards the totals
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
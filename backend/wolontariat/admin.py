@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.utils import timezone
+from . import counters, response_cache
 from .models import (
     Organizacja,
     Uzytkownik,
@@ -7,6 +9,7 @@ from .models import (
     Zlecenie,
     Wiadomosc,
     Recenzja,
+    Zadanie,
 )
 
 
@@ -69,7 +72,9 @@ class OrganizacjaAdmin(admin.ModelAdmin):
     actions = ["zweryfikuj_organizacje"]
 
     def zweryfikuj_organizacje(self, request, queryset):
-        queryset.update(weryfikacja=True)
+        # update() skips auto_now and signals: bump the ETag version and the response cache explicitly
+        queryset.update(weryfikacja=True, updated_at=timezone.now())
+        response_cache.invalidate_organizations(queryset.values_list('id', flat=True))
 
 
 @admin.register(Projekt)
@@ -87,6 +92,11 @@ class OfertaAdmin(admin.ModelAdmin):
     list_filter = ("czy_ukonczone", "organizacja")
     inlines = [ZlecenieInline]
 
+    def save_related(self, request, form, formsets, change):
+        # The inline saves applications directly, not through the offer actions
+        super().save_related(request, form, formsets, change)
+        counters.recount_offers([form.instance.pk])
+
 
 @admin.register(Zlecenie)
 class ZlecenieAdmin(admin.ModelAdmin):
@@ -94,14 +104,50 @@ class ZlecenieAdmin(admin.ModelAdmin):
     list_filter = ("czy_ukonczone", "czy_potwierdzone")
     search_fields = ("oferta__tytul_oferty", "wolontariusz__email")
 
+    # Admin edits bypass the offer actions that keep the counters: recount the offers touched
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        counters.recount_offers(filter(None, {obj.oferta_id, form.initial.get("oferta")}))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        counters.recount_offers([obj.oferta_id])
+
+    def delete_queryset(self, request, queryset):
+        oferta_ids = list(queryset.values_list("oferta_id", flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        counters.recount_offers(oferta_ids)
+
 
 @admin.register(Wiadomosc)
 class WiadomoscAdmin(admin.ModelAdmin):
-    list_display = ("nadawca", "odbiorca", "data_wyslania")
+    list_display = ("nadawca", "odbiorca", "data_wyslania", "przeczytana")
+    list_filter = ("przeczytana",)
     search_fields = ("nadawca__email", "odbiorca__email")
 
+    # Admin edits bypass wolontariat/messaging.py: recount the recipients touched
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        counters.recount_unread(filter(None, {obj.odbiorca_id, form.initial.get("odbiorca")}))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        counters.recount_unread([obj.odbiorca_id])
+
+    def delete_queryset(self, request, queryset):
+        odbiorca_ids = list(queryset.values_list("odbiorca_id", flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        counters.recount_unread(odbiorca_ids)
+
 
 @admin.register(Recenzja)
 class RecenzjaAdmin(admin.ModelAdmin):
     list_display = ("organizacja", "wolontariusz", "ocena")
     list_filter = ("ocena",)
+
+
+@admin.register(Zadanie)
+class ZadanieAdmin(admin.ModelAdmin):
+    list_display = ("id", "rodzaj", "status", "zlecajacy", "proby", "created_at", "finished_at")
+    list_filter = ("status", "rodzaj")
+    search_fields = ("zlecajacy__email", "nazwa_pliku")
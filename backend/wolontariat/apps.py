@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class WolontariatConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'wolontariat'
+
+    def ready(self):
+        from . import metrics, performance, signals  # noqa: F401
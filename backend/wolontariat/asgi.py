@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wolontariat.settings')
+# The async read views (api/async_views.py); ASYNC_READ_VIEWS=0 serves everything through DRF
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
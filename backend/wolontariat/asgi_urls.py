@@ -0,0 +1,10 @@
+"""
+URL configuration of the ASGI application (ASYNC_READ_VIEWS): the routes of
+wolontariat/urls.py, with the read endpoints of api/async_views.py in place of their
+viewset routes.
+"""
+from api.async_urls import with_async_views
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = with_async_views(wsgi_urlpatterns)
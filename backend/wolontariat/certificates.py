@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, islice
+from typing import Callable, NamedTuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+
+from .pdf_utils import PageTemplate, get_pl_font_names
+
+# Bump when the certificate layout changes so cached PDFs are re-rendered.
+RENDER_VERSION = 2
+
+ORGANIZER = "Centrum Wolontariatu"
+
+
+# --- Rendering ---
+# Pure functions of plain data (no ORM access), so they can run in a worker process.
+
+def _certificate_background(title):
+    """Static part of a certificate page: frame, organizer mark, title and footer rule."""
+    def draw(pdf, pagesize, regular_font, bold_font):
+        width, height = pagesize
+        pdf.setStrokeColorRGB(0.16, 0.38, 0.55)
+        pdf.setLineWidth(2)
+        pdf.rect(30, 30, width - 60, height - 60)
+        pdf.setLineWidth(0.5)
+        pdf.rect(36, 36, width - 72, height - 72)
+
+        pdf.setFillColorRGB(0.16, 0.38, 0.55)
+        pdf.circle(70, height - 68, 12, stroke=0, fill=1)
+        pdf.setFont(bold_font, 12)
+        pdf.drawString(90, height - 72, ORGANIZER)
+
+        pdf.setFillColorRGB(0, 0, 0)
+        pdf.setFont(bold_font, 20)
+        pdf.drawCentredString(width / 2, height - 110, title)
+
+        pdf.line(60, 70, width - 60, 70)
+        pdf.setFont(regular_font, 9)
+        pdf.drawCentredString(width / 2, 56, ORGANIZER)
+    return draw
+
+
+USER_CERTIFICATE = PageTemplate('user_certificate', _certificate_background("Zaświadczenie ukończenia zleceń"))
+OFFER_CERTIFICATE = PageTemplate('offer_certificate', _certificate_background("Zaświadczenie"))
+
+
+def render_user_certificate(username, email, assignments) -> bytes:
+    """``assignments``: (zlecenie_id, tytul_oferty, nazwa_projektu) rows, see completed_assignments()."""
+    def draw(pdf, template):
+        regular_font, _ = get_pl_font_names()
+        height = template.pagesize[1]
+        pdf.setFont(regular_font, 14)
+        pdf.drawString(100, height - 160, f"Wolontariusz: {username}")
+        pdf.drawString(100, height - 180, f"E-mail: {email}")
+
+        pdf.drawString(100, height - 210, "Ukończone zlecenia:")
+        y = height - 230
+        for _, tytul_oferty, nazwa_projektu in assignments:
+            pdf.drawString(120, y, f"- {tytul_oferty} ({nazwa_projektu})")
+            y -= 20
+            if y < 90:
+                template.next_page(pdf)
+                pdf.setFont(regular_font, 14)
+                y = height - 150
+
+    return USER_CERTIFICATE.render(draw)
+
+
+def render_offer_certificate(username, tytul_oferty) -> bytes:
+    def draw(pdf, template):
+        regular_font, _ = get_pl_font_names()
+        height = template.pagesize[1]
+        pdf.setFont(regular_font, 14)
+        pdf.drawString(100, height - 160, f"Wolontariusz: {username}")
+        pdf.drawString(100, height - 190, f"Ukończył ofertę: {tytul_oferty}")
+
+    return OFFER_CERTIFICATE.render(draw)
+
+
+# --- Cache ---
+
+class CertificateJob(NamedTuple):
+    """One certificate: where it is cached, how it is named in a ZIP, and how to render it."""
+    cache_name: str
+    filename: str
+    render: Callable[..., bytes]
+    args: tuple
+
+
+def certificate_storage():
+    return storages[settings.CERTIFICATE_STORAGE]
+
+
+def _digest(payload) -> str:
+    raw = json.dumps([RENDER_VERSION, payload], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def _user_dir(user_id) -> str:
+    return f'certificates/{user_id}'
+
+
+def _load(job):
+    storage = certificate_storage()
+    if not storage.exists(job.cache_name):
+        return None
+    with storage.open(job.cache_name, 'rb') as fh:
+        return fh.read()
+
+
+def _store(job, data):
+    storage = certificate_storage()
+    saved_as = storage.save(job.cache_name, ContentFile(data))
+    if saved_as != job.cache_name:
+        # Another worker stored the same content first; keep theirs.
+        storage.delete(saved_as)
+
+
+def completed_assignments(user):
+    """Everything a volunteer's certificate shows, in a single query."""
+    return list(
+        user.zlecenia.filter(czy_ukonczone=True)
+        .order_by('id')
+        .values_list('id', 'oferta__tytul_oferty', 'oferta__projekt__nazwa_projektu')
+    )
+
+
+def user_certificate_job(user_id, username, email, assignments) -> CertificateJob:
+    """
+    The cache name is a digest of the rendered inputs (user details + completed assignment set),
+    so any change produces a new name and stale files can never be served.
+    """
+    assignments = [tuple(row) for row in assignments]
+    digest = _digest(['user', username, email, assignments])
+    return CertificateJob(
+        f'{_user_dir(user_id)}/{digest}.pdf', f'zaswiadczenie_{username}.pdf',
+        render_user_certificate, (username, email, assignments),
+    )
+
+
+def offer_certificate_job(user_id, username, offer_id, tytul_oferty) -> CertificateJob:
+    digest = _digest(['offer', username, offer_id, tytul_oferty])
+    return CertificateJob(
+        f'{_user_dir(user_id)}/oferta_{offer_id}_{digest}.pdf', f'zaswiadczenie_{username}_oferta_{offer_id}.pdf',
+        render_offer_certificate, (username, tytul_oferty),
+    )
+
+
+def user_certificate_job_for(user) -> CertificateJob:
+    return user_certificate_job(user.pk, user.username, user.email, completed_assignments(user))
+
+
+def offer_certificate_job_for(user, offer) -> CertificateJob:
+    return offer_certificate_job(user.pk, user.username, offer.pk, offer.tytul_oferty)
+
+
+def is_cached(job) -> bool:
+    """Whether the PDF for ``job`` has been rendered (it is then served from ``job.cache_name``)."""
+    return certificate_storage().exists(job.cache_name)
+
+
+def ensure_certificate(job) -> str:
+    """Render ``job`` into the cache unless it is there already; returns its storage name."""
+    if not is_cached(job):
+        _store(job, job.render(*job.args))
+    return job.cache_name
+
+
+def invalidate_certificates(user_id) -> None:
+    """Drop every cached certificate of a volunteer (stale digests are unreachable but take space)."""
+    storage = certificate_storage()
+    directory = _user_dir(user_id)
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        storage.delete(f'{directory}/{filename}')
+
+
+# --- Bulk generation ---
+
+def offer_certificate_jobs(offer) -> list[CertificateJob]:
+    """Offer certificates for every volunteer who completed ``offer``."""
+    completed = offer.zlecenia.filter(czy_ukonczone=True).order_by('wolontariusz_id')
+    return [
+        offer_certificate_job(user_id, username, offer.pk, offer.tytul_oferty)
+        for user_id, username in completed.values_list('wolontariusz_id', 'wolontariusz__username')
+    ]
+
+
+def project_certificate_jobs(projekt) -> list[CertificateJob]:
+    """Full volunteer certificates for everyone who completed any offer of ``projekt``, in one query."""
+    from .models import Zlecenie
+
+    volunteers = Zlecenie.objects.filter(oferta__projekt=projekt, czy_ukonczone=True).values('wolontariusz_id')
+    rows = (
+        Zlecenie.objects.filter(wolontariusz_id__in=volunteers, czy_ukonczone=True)
+        .order_by('wolontariusz_id', 'id')
+        .values_list(
+            'wolontariusz_id', 'wolontariusz__username', 'wolontariusz__email',
+            'id', 'oferta__tytul_oferty', 'oferta__projekt__nazwa_projektu',
+        )
+    )
+    return [
+        user_certificate_job(user_id, username, email, [row[3:] for row in group])
+        for (user_id, username, email), group in groupby(rows, key=lambda row: row[:3])
+    ]
+
+
+def export_digest(jobs) -> str:
+    """Digest of what a ZIP of ``jobs`` contains: it changes whenever one of the certificates does."""
+    return _digest(sorted(job.cache_name for job in jobs))
+
+
+def iter_certificates(jobs, workers=None):
+    """
+    Yield ``(filename, pdf_bytes)`` for every job. Cached PDFs are read from storage; misses are
+    rendered across a process pool, keeping only a small window of results in memory at a time.
+    """
+    if workers is None:
+        workers = settings.CERTIFICATE_WORKERS
+
+    misses = []
+    for job in jobs:
+        data = _load(job)
+        if data is None:
+            misses.append(job)
+        else:
+            yield job.filename, data
+
+    if workers <= 1 or len(misses) < 2:
+        for job in misses:
+            data = job.render(*job.args)
+            _store(job, data)
+            yield job.filename, data
+        return
+
+    # "spawn": workers start clean instead of inheriting the parent's DB connections.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        remaining = iter(misses)
+        window = deque((job, pool.submit(job.render, *job.args)) for job in islice(remaining, workers * 2))
+        while window:
+            job, future = window.popleft()
+            data = future.result()
+            _store(job, data)
+            yield job.filename, data
+            for job in islice(remaining, 1):
+                window.append((job, pool.submit(job.render, *job.args)))
+
+
+class _ZipSink:
+    """Write-only file object collecting zipfile output between yields."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(files):
+    """Yield a ZIP archive of ``(filename, bytes)`` pairs chunk by chunk, one member at a time."""
+    sink = _ZipSink()
+    # PDFs are already compressed; storing them keeps the CPU on rendering.
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, data in files:
+            archive.writestr(filename, data)
+            yield sink.drain()
+    yield sink.drain()
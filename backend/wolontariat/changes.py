@@ -0,0 +1,52 @@
+"""
+The change log (Zmiana) behind GET /api/changes/.
+
+Log ids come from a sequence, which hands them out before commit: a transaction can commit
+a lower id after a reader has moved past it. So the log is read in (txid, id) order and only
+below the oldest transaction still running (the xmin of the current snapshot). Everything
+there has committed or rolled back for good, and every later writer gets a larger txid, so
+a position in the log never has anything appear behind it. A transaction left open delays
+the feed but never makes it skip a change.
+"""
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Zmiana
+
+# xid8 has no cast to bigint; transaction ids stay far below 2**63
+_SETTLED_BELOW = RawSQL('pg_snapshot_xmin(pg_current_snapshot())::text::bigint', ())
+
+START = (0, 0)
+
+
+def _settled():
+    return Zmiana.objects.filter(txid__lt=_SETTLED_BELOW)
+
+
+def _after(txid, id, prefix=''):
+    # As KeysetPagination._seek: the redundant txid >= bound starts the index scan at the position
+    return Q(**{f'{prefix}txid__gte': txid}) & (
+        Q(**{f'{prefix}txid__gt': txid}) | Q(**{f'{prefix}txid': txid, f'{prefix}id__gt': id})
+    )
+
+
+def head():
+    """Position of the newest settled entry; reading from it returns only later changes."""
+    return _settled().order_by('-txid', '-id').values_list('txid', 'id').first() or START
+
+
+def read(position, limit):
+    """Up to ``limit`` settled entries after ``position`` (a (txid, id) pair), oldest first."""
+    return list(_settled().filter(_after(*position)).order_by('txid', 'id')[:limit])
+
+
+def compact(dry_run=False) -> int:
+    """
+    Delete the entries of rows that have a later settled entry: a reader at any position
+    still gets the row (its state is read when the feed is served), only once. Returns how many.
+    """
+    later = _settled().filter(_after(OuterRef('txid'), OuterRef('id')), model=OuterRef('model'), obiekt_id=OuterRef('obiekt_id'))
+    superseded = Zmiana.objects.filter(Exists(later))
+    if dry_run:
+        return superseded.count()
+    return superseded.delete()[0]
@@ -0,0 +1,124 @@
+"""
+Denormalized counters: Oferta.liczba_uczestnikow / liczba_potwierdzonych / liczba_ukonczonych
+(its Zlecenie rows, confirmed ones, completed ones), Projekt.liczba_ofert and
+Uzytkownik.nieprzeczytane_wiadomosci (kept by wolontariat/messaging.py).
+
+They are adjusted with F() in the same transaction as the write they describe: the offer
+actions in api/views.py for applications, the signals in wolontariat/signals.py for offers.
+Applying goes through ``apply_for_offer``, which also enforces Oferta.max_uczestnikow.
+Writes that bypass both (admin forms, bulk_create, raw SQL) are recounted with
+``recount_offers`` / ``recount_projects`` / ``recount_unread``, which `manage.py repair_counters`
+runs for every row.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Oferta, Projekt, Uzytkownik, Wiadomosc, Zlecenie
+
+OFFER_COUNTERS = Oferta.counter_fields
+
+
+def adjust_offer(oferta_id, uczestnicy=0, potwierdzeni=0, ukonczeni=0) -> None:
+    deltas = dict(zip(OFFER_COUNTERS, (uczestnicy, potwierdzeni, ukonczeni)))
+    changes = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    if changes:
+        Oferta.objects.filter(pk=oferta_id).update(**changes)
+
+
+def adjust_project(projekt_id, oferty) -> None:
+    Projekt.objects.filter(pk=projekt_id).update(liczba_ofert=F('liczba_ofert') + oferty)
+
+
+def application_deltas(zlecenie, sign=1):
+    """Counter changes for adding (sign=1) or removing (sign=-1) an application."""
+    return {
+        'uczestnicy': sign,
+        'potwierdzeni': sign * zlecenie.czy_potwierdzone,
+        'ukonczeni': sign * zlecenie.czy_ukonczone,
+    }
+
+
+APPLIED = 'applied'
+ALREADY_APPLIED = 'already_applied'
+CLOSED = 'closed'
+FULL = 'full'
+
+# Takes a place and records the application in one statement. The guarded UPDATE locks only
+# the offer's row, so concurrent applicants queue on it and each sees the count left by the
+# one before; a full or closed offer updates nothing and so inserts nothing.
+_APPLY_SQL = f"""
+WITH place AS (
+    UPDATE {Oferta._meta.db_table} SET liczba_uczestnikow = liczba_uczestnikow + 1
+    WHERE id = %(oferta)s AND NOT czy_ukonczone
+      AND (max_uczestnikow IS NULL OR liczba_uczestnikow < max_uczestnikow)
+      AND NOT EXISTS (
+          SELECT 1 FROM {Zlecenie._meta.db_table} WHERE oferta_id = %(oferta)s AND wolontariusz_id = %(wolontariusz)s
+      )
+    RETURNING id
+), application AS (
+    INSERT INTO {Zlecenie._meta.db_table} (oferta_id, wolontariusz_id, czy_potwierdzone, czy_ukonczone, updated_at)
+    SELECT id, %(wolontariusz)s, false, false, now() FROM place
+    ON CONFLICT (oferta_id, wolontariusz_id) DO NOTHING
+    RETURNING id
+)
+SELECT (SELECT count(*) FROM place), (SELECT id FROM application)
+"""
+
+
+def apply_for_offer(oferta_id, wolontariusz_id) -> str:
+    """
+    Apply ``wolontariusz_id`` for the offer unless it is closed, full or applied for already.
+    Returns APPLIED, ALREADY_APPLIED, CLOSED or FULL. No signals are sent for the new Zlecenie.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_APPLY_SQL, {'oferta': oferta_id, 'wolontariusz': wolontariusz_id})
+            places, zlecenie_id = cursor.fetchone()
+        if zlecenie_id is not None:
+            return APPLIED
+        if places:
+            # The same volunteer's concurrent request inserted first: give the place back
+            transaction.set_rollback(True)
+            return ALREADY_APPLIED
+
+    # Nothing was written; find out why
+    if Zlecenie.objects.filter(oferta_id=oferta_id, wolontariusz_id=wolontariusz_id).exists():
+        return ALREADY_APPLIED
+    if Oferta.objects.filter(pk=oferta_id, czy_ukonczone=False).exists():
+        return FULL
+    return CLOSED
+
+
+def _count(queryset, outer_field, **filters):
+    counted = queryset.filter(**{outer_field: OuterRef('pk')}, **filters).order_by()
+    counted = counted.values(outer_field).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def _recount(queryset, expected, dry_run):
+    """Rows of ``queryset`` whose counters differ from ``expected``; fixed with one UPDATE unless ``dry_run``."""
+    wrong = queryset.annotate(**{f'expected_{name}': value for name, value in expected.items()})
+    wrong = wrong.filter(~Q(**{name: F(f'expected_{name}') for name in expected}))
+    if dry_run:
+        return wrong.count()
+    return queryset.filter(pk__in=wrong.values('pk')).update(**expected)
+
+
+def recount_offers(oferta_ids=None, dry_run=False) -> int:
+    offers = Oferta.objects.all() if oferta_ids is None else Oferta.objects.filter(pk__in=oferta_ids)
+    return _recount(offers, {
+        'liczba_uczestnikow': _count(Zlecenie.objects, 'oferta'),
+        'liczba_potwierdzonych': _count(Zlecenie.objects, 'oferta', czy_potwierdzone=True),
+        'liczba_ukonczonych': _count(Zlecenie.objects, 'oferta', czy_ukonczone=True),
+    }, dry_run)
+
+
+def recount_projects(projekt_ids=None, dry_run=False) -> int:
+    projects = Projekt.objects.all() if projekt_ids is None else Projekt.objects.filter(pk__in=projekt_ids)
+    return _recount(projects, {'liczba_ofert': _count(Oferta.objects, 'projekt')}, dry_run)
+
+
+def recount_unread(user_ids=None, dry_run=False) -> int:
+    users = Uzytkownik.objects.all() if user_ids is None else Uzytkownik.objects.filter(pk__in=user_ids)
+    return _recount(users, {'nieprzeczytane_wiadomosci': _count(Wiadomosc.objects, 'odbiorca', przeczytana=False)}, dry_run)
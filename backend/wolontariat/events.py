@@ -0,0 +1,130 @@
+"""
+Per-user events pushed to browsers as server-sent events (GET /api/events/).
+
+Writers call ``publish`` inside the transaction of the change: it is a Postgres NOTIFY, so
+the event goes out on commit and never for a rolled-back change. Each ASGI worker process
+holds one LISTEN connection (opened with the first subscriber, closed with the last) and
+hands every notification to the queues of the recipients connected to that process, so
+any number of workers serve connections without a broker between them.
+
+Events are hints, not a log: a client that reconnects re-fetches what it shows.
+"""
+import asyncio
+import json
+import weakref
+from collections import defaultdict
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from django.db import connection, connections
+
+from .models import Uzytkownik
+
+CHANNEL = 'wolontariat_events'
+# NOTIFY payloads are limited to 8000 bytes: recipients are sent in batches
+MAX_RECIPIENTS = 500
+# Events buffered for one connection; a client that falls further behind is disconnected
+QUEUE_SIZE = 100
+
+APPLICATION_CREATED = 'application_created'
+APPLICATION_WITHDRAWN = 'application_withdrawn'
+APPLICATION_CONFIRMED = 'application_confirmed'
+APPLICATION_COMPLETED = 'application_completed'
+REVIEW_CREATED = 'review_created'
+MESSAGE_RECEIVED = 'message_received'
+
+
+def publish(user_ids, event, data) -> None:
+    """Send ``event`` with ``data`` (JSON-serializable) to the users, once the transaction commits."""
+    user_ids = list(dict.fromkeys(user_ids))
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), MAX_RECIPIENTS):
+            payload = json.dumps({'users': user_ids[start:start + MAX_RECIPIENTS], 'event': event, 'data': data})
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+
+
+def publish_to_organization(organizacja_id, event, data) -> None:
+    publish(Uzytkownik.objects.filter(organizacja_id=organizacja_id).values_list('pk', flat=True), event, data)
+
+
+def format_event(event, data) -> bytes:
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
+
+
+class Listener:
+    """The LISTEN connection of one event loop and the queues of its subscribers."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = defaultdict(set)
+        self.connection = None
+        self.connecting = asyncio.Lock()
+
+    async def subscribe(self, user_id) -> asyncio.Queue:
+        """A queue receiving the user's events as SSE bytes, and None when the stream must end."""
+        queue = asyncio.Queue(QUEUE_SIZE)
+        async with self.connecting:
+            if self.connection is None:
+                self.connection = await asyncio.to_thread(self._connect)
+                self.loop.add_reader(self.connection.fileno(), self._read)
+            self.subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue) -> None:
+        queues = self.subscribers.get(user_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.subscribers.pop(user_id, None)
+        if not self.subscribers:
+            self._disconnect()
+
+    def _connect(self):
+        # Not Django's connection: this one stays open outside any request, in autocommit
+        listen = psycopg2.connect(**connections['default'].get_connection_params())
+        listen.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with listen.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+        return listen
+
+    def _disconnect(self):
+        if self.connection is not None:
+            self.loop.remove_reader(self.connection.fileno())
+            self.connection.close()
+            self.connection = None
+
+    def _read(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error:
+            # Lost the database: end every stream, the clients reconnect and re-fetch
+            self._disconnect()
+            for queues in list(self.subscribers.values()):
+                for queue in queues:
+                    self._end(queue)
+            return
+
+        while self.connection.notifies:
+            message = json.loads(self.connection.notifies.pop(0).payload)
+            chunk = format_event(message['event'], message['data'])
+            for user_id in message['users']:
+                for queue in self.subscribers.get(user_id, ()):
+                    try:
+                        queue.put_nowait(chunk)
+                    except asyncio.QueueFull:
+                        self._end(queue)
+
+    def _end(self, queue):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+_listeners = weakref.WeakKeyDictionary()
+
+
+def listener() -> Listener:
+    """The Listener of the running event loop (one per ASGI worker process)."""
+    loop = asyncio.get_running_loop()
+    if loop not in _listeners:
+        _listeners[loop] = Listener(loop)
+    return _listeners[loop]
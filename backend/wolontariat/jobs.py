@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .certificates import (
+    certificate_storage, ensure_certificate, iter_certificates, offer_certificate_job_for,
+    offer_certificate_jobs, project_certificate_jobs, stream_zip, user_certificate_job_for,
+)
+from .models import Oferta, Projekt, Uzytkownik, Zadanie
+
+
+ACTIVE = [Zadanie.OCZEKUJE, Zadanie.W_TOKU]
+EXPORTS = [Zadanie.ZIP_OFERTY, Zadanie.ZIP_PROJEKTU]
+# Where export ZIPs are stored; certificates live in the shared certificate cache instead
+EXPORT_DIR = 'exports/'
+
+
+# --- Queue ---
+
+def enqueue(rodzaj, zlecajacy, nazwa_pliku, klucz='', **parametry) -> Zadanie:
+    """
+    Queue a job for ``zlecajacy``. While a job with the same ``klucz`` is still queued or
+    running for that user it is returned instead, so retries and double clicks share one render.
+    """
+    if klucz:
+        existing = Zadanie.objects.filter(zlecajacy=zlecajacy, klucz=klucz, status__in=ACTIVE).first()
+        if existing is not None:
+            return existing
+    return Zadanie.objects.create(
+        rodzaj=rodzaj, zlecajacy=zlecajacy, nazwa_pliku=nazwa_pliku, klucz=klucz, parametry=parametry,
+    )
+
+
+def claim() -> Zadanie | None:
+    """
+    Take the oldest queued job. ``SKIP LOCKED`` lets any number of workers poll the same table:
+    each one skips rows another worker has locked instead of waiting on them. Jobs left
+    "running" by a worker that died are picked up again once JOB_TIMEOUT has passed, unless
+    they already used up JOB_MAX_ATTEMPTS: a job that kills its worker (out of memory, a crash
+    in the PDF renderer) never reaches run()'s error handling, and would take down every
+    worker that claims it.
+    """
+    abandoned = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+    with transaction.atomic():
+        while True:
+            zadanie = (
+                Zadanie.objects.select_for_update(skip_locked=True)
+                .filter(Q(status=Zadanie.OCZEKUJE) | Q(status=Zadanie.W_TOKU, started_at__lt=abandoned))
+                .order_by('id')
+                .first()
+            )
+            if zadanie is None:
+                return None
+            if zadanie.status == Zadanie.OCZEKUJE or zadanie.proby < settings.JOB_MAX_ATTEMPTS:
+                break
+            zadanie.status = Zadanie.BLAD
+            zadanie.blad = f'Worker stopped during each of {zadanie.proby} attempts'
+            zadanie.finished_at = timezone.now()
+            zadanie.save(update_fields=['status', 'blad', 'finished_at'])
+
+        zadanie.status = Zadanie.W_TOKU
+        zadanie.started_at = timezone.now()
+        zadanie.proby += 1
+        zadanie.save(update_fields=['status', 'started_at', 'proby'])
+    return zadanie
+
+
+def run(zadanie) -> None:
+    """Execute a claimed job and record the outcome; failures are retried up to JOB_MAX_ATTEMPTS."""
+    try:
+        plik = HANDLERS[zadanie.rodzaj](zadanie)
+    except Exception as e:
+        zadanie.blad = f'{type(e).__name__}: {e}'
+        zadanie.status = Zadanie.OCZEKUJE if zadanie.proby < settings.JOB_MAX_ATTEMPTS else Zadanie.BLAD
+        if zadanie.status == Zadanie.BLAD:
+            zadanie.finished_at = timezone.now()
+        zadanie.save(update_fields=['status', 'blad', 'finished_at'])
+        return
+
+    zadanie.plik = plik
+    zadanie.blad = ''
+    zadanie.status = Zadanie.GOTOWE
+    zadanie.finished_at = timezone.now()
+    zadanie.save(update_fields=['plik', 'blad', 'status', 'finished_at'])
+
+
+def run_pending(limit=None) -> int:
+    """Process queued jobs until the queue is empty (or ``limit`` jobs ran); returns how many ran."""
+    count = 0
+    while limit is None or count < limit:
+        zadanie = claim()
+        if zadanie is None:
+            break
+        run(zadanie)
+        count += 1
+    return count
+
+
+def result_exists(zadanie) -> bool:
+    """False once a finished job's file was removed from storage (e.g. certificate invalidated)."""
+    return bool(zadanie.plik) and certificate_storage().exists(zadanie.plik)
+
+
+def delete_export(zadanie) -> None:
+    if zadanie.plik.startswith(EXPORT_DIR):
+        certificate_storage().delete(zadanie.plik)
+
+
+def expire_exports() -> int:
+    """
+    Delete the ZIPs of exports finished more than JOB_EXPORT_TTL ago (they are regenerated on
+    request; the job's download answers 410 Gone meanwhile). Returns how many were deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_EXPORT_TTL)
+    expired = list(
+        Zadanie.objects.filter(rodzaj__in=EXPORTS, status=Zadanie.GOTOWE, finished_at__lt=cutoff).exclude(plik='')
+    )
+    for zadanie in expired:
+        delete_export(zadanie)
+    Zadanie.objects.filter(pk__in=[zadanie.pk for zadanie in expired]).update(plik='')
+    return len(expired)
+
+
+# --- Handlers ---
+# Each returns the storage name of the produced file.
+
+def _user_certificate(zadanie):
+    user = Uzytkownik.objects.get(pk=zadanie.parametry['uzytkownik_id'])
+    return ensure_certificate(user_certificate_job_for(user))
+
+
+def _offer_certificate(zadanie):
+    user = Uzytkownik.objects.get(pk=zadanie.parametry['uzytkownik_id'])
+    offer = Oferta.objects.get(pk=zadanie.parametry['oferta_id'])
+    return ensure_certificate(offer_certificate_job_for(user, offer))
+
+
+# ZIPs up to this size are assembled in memory before they are stored
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
+
+def _export_zip(zadanie, jobs):
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as fh:
+        for chunk in stream_zip(iter_certificates(jobs)):
+            fh.write(chunk)
+        fh.seek(0)
+        return certificate_storage().save(f'{EXPORT_DIR}{zadanie.pk}/{zadanie.nazwa_pliku}', File(fh))
+
+
+def _offer_zip(zadanie):
+    offer = Oferta.objects.get(pk=zadanie.parametry['oferta_id'])
+    return _export_zip(zadanie, offer_certificate_jobs(offer))
+
+
+def _project_zip(zadanie):
+    projekt = Projekt.objects.get(pk=zadanie.parametry['projekt_id'])
+    return _export_zip(zadanie, project_certificate_jobs(projekt))
+
+
+HANDLERS = {
+    Zadanie.CERTYFIKAT: _user_certificate,
+    Zadanie.CERTYFIKAT_OFERTY: _offer_certificate,
+    Zadanie.ZIP_OFERTY: _offer_zip,
+    Zadanie.ZIP_PROJEKTU: _project_zip,
+}
@@ -0,0 +1,219 @@
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from wolontariat.models import Oferta, Projekt, Uzytkownik
+from wolontariat.response_cache import response_cache
+from wolontariat.synthetic import PASSWORD, generate, reset
+
+# Dataset sizes (arguments of wolontariat.synthetic.generate); "large" is about a million rows
+SIZES = {
+    "small": dict(organizations=20, volunteers=2000),
+    "medium": dict(organizations=100, volunteers=10000),
+    "large": dict(organizations=500, volunteers=50000),
+}
+DATASET_SEED = 0
+DATASET_DATE = date(2025, 6, 1)
+
+# Metric -> default allowed relative increase over the baseline before --compare fails
+THRESHOLDS = {"p95_ms": 0.25, "queries": 0.0, "bytes": 0.10}
+# Latency differences below this many milliseconds are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 2.0
+
+
+def endpoints(volunteer, organizer, offer, project, completed_offer):
+    """(name, user or None, method, path, body, requests) for every benchmarked endpoint."""
+    return [
+        ("offers.list", None, "get", "/api/offers/", None, None),
+        ("offers.list_cursor", None, "get", "/api/offers/?pagination=cursor", None, None),
+        ("offers.search", None, "get", "/api/offers/?search=spacery", None, None),
+        ("offers.free", None, "get", "/api/offers/?tylko_wolne=true", None, None),
+        ("offers.detail", None, "get", f"/api/offers/{offer.pk}/", None, None),
+        ("offers.my_offers", volunteer, "get", "/api/offers/my_offers/", None, None),
+        ("offers.my_offers_org", organizer, "get", "/api/offers/my_offers/", None, None),
+        ("offers.certificate", volunteer, "get", f"/api/offers/{completed_offer.pk}/certificate/", None, None),
+        ("projects.list", None, "get", "/api/projects/", None, None),
+        ("projects.search", None, "get", "/api/projects/?search=zbiorka", None, None),
+        ("projects.detail", None, "get", f"/api/projects/{project.pk}/", None, None),
+        ("projects.offers", None, "get", f"/api/projects/{project.pk}/oferty/", None, None),
+        ("reviews.list", None, "get", "/api/reviews/", None, None),
+        ("volunteers.list", organizer, "get", "/api/volunteers/volunteers/", None, None),
+        ("messages.inbox", organizer, "get", "/api/messages/", None, None),
+        ("messages.unread_count", organizer, "get", "/api/messages/unread_count/", None, None),
+        ("changes.head", None, "get", "/api/changes/", None, None),
+        ("auth.certificate", volunteer, "get", "/api/auth/certificate/", None, None),
+        # Password hashing dominates by design (PBKDF2); a few requests are enough
+        ("auth.login", None, "post", "/api/auth/login/", {"username": volunteer.email, "password": PASSWORD}, 5),
+    ]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API endpoints on a generated dataset: p50/p95/p99 latency, SQL queries and "
+        "their time, and response bytes per endpoint, through the full middleware stack. The "
+        "dataset is created in a transaction that is rolled back. --output writes a JSON report; "
+        "--compare checks it against an earlier one and fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", choices=SIZES, default="small", help="Generated dataset (large: ~1M rows)")
+        parser.add_argument("--existing", action="store_true", help="Use the data in the database instead of generating")
+        parser.add_argument("--requests", type=int, default=30, help="Measured requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per endpoint first")
+        parser.add_argument("--warm-cache", action="store_true", help="Keep the response cache between requests")
+        parser.add_argument("--only", help="Comma-separated endpoint name prefixes, e.g. offers,auth.login")
+        parser.add_argument("--output", help="Write the JSON report to this file")
+        parser.add_argument("--compare", help="Baseline JSON report to check this run against")
+        for metric, default in THRESHOLDS.items():
+            parser.add_argument(
+                f"--max-{metric.replace('_', '-')}-increase", type=float, default=default, dest=f"max_{metric}",
+                help=f"Allowed relative increase of {metric} over the baseline (default {default})",
+            )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["existing"]:
+                dataset = {"existing": True}
+            else:
+                reset()
+                counts = generate(seed=DATASET_SEED, base_date=DATASET_DATE, **SIZES[options["size"]])
+                dataset = {"size": options["size"], "seed": DATASET_SEED, "rows": counts}
+            results = self._run(options)
+            transaction.set_rollback(True)
+
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "dataset": dataset,
+                "requests": options["requests"],
+                "warm_cache": options["warm_cache"],
+            },
+            "endpoints": results,
+        }
+        self._print(results)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write("\n")
+        if options["compare"]:
+            self._compare(options["compare"], report, options)
+
+    def _users(self):
+        volunteer = Uzytkownik.objects.filter(rola="wolontariusz", zlecenia__czy_ukonczone=True).order_by("id").first()
+        organizer = Uzytkownik.objects.filter(rola="organizacja", organizacja__isnull=False).order_by("id").first()
+        if volunteer is None or organizer is None:
+            raise CommandError("The dataset needs an organization account and a volunteer with completed work")
+        return volunteer, organizer
+
+    def _run(self, options):
+        volunteer, organizer = self._users()
+        offer = Oferta.objects.order_by("-liczba_uczestnikow", "id").first()
+        project = Projekt.objects.order_by("-liczba_ofert", "id").first()
+        completed_offer = Oferta.objects.filter(zlecenia__wolontariusz=volunteer, zlecenia__czy_ukonczone=True).order_by("id").first()
+        # The Host header must pass ALLOWED_HOSTS like a real request's
+        host = {"SERVER_NAME": settings.ALLOWED_HOSTS[0]} if settings.ALLOWED_HOSTS else {}
+        clients = {None: Client(**host)}
+        for user in (volunteer, organizer):
+            token, _ = Token.objects.get_or_create(user=user)
+            clients[user.pk] = Client(HTTP_AUTHORIZATION=f"Token {token.key}", **host)
+
+        only = [prefix.strip() for prefix in (options["only"] or "").split(",") if prefix.strip()]
+        results = {}
+        for name, user, method, path, body, requests in endpoints(volunteer, organizer, offer, project, completed_offer):
+            if only and not name.startswith(tuple(only)):
+                continue
+            client = clients[user.pk if user else None]
+            request = lambda: getattr(client, method)(path, body, content_type="application/json") if body else getattr(client, method)(path)
+            results[name] = self._measure(request, requests or options["requests"], options)
+        return results
+
+    def _measure(self, request, requests, options):
+        latencies, queries, sql_times = [], [], []
+        for i in range(options["warmup"] + requests):
+            if not options["warm_cache"]:
+                response_cache().clear()
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = request()
+                # Streamed bodies are produced while they are read
+                body = b"".join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - start
+            if i < options["warmup"]:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(len(ctx.captured_queries))
+            sql_times.append(sum(float(query["time"]) for query in ctx.captured_queries) * 1000)
+        return {
+            "status": response.status_code,
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "queries": statistics.median_low(queries),
+            "sql_ms": round(statistics.median(sql_times), 2),
+            "bytes": len(body),
+        }
+
+    def _print(self, results):
+        self.stdout.write(
+            f"{'endpoint':<24} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'sql ms':>8} {'bytes':>10}"
+        )
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<24} {r['status']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+                f"{r['queries']:>8} {r['sql_ms']:>8.1f} {r['bytes']:>10,}"
+            )
+
+    def _compare(self, path, report, options):
+        with open(path) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("dataset") != report["meta"]["dataset"]:
+            self.stderr.write("Warning: the baseline was measured on a different dataset")
+
+        regressions = []
+        for name, current in report["endpoints"].items():
+            before = baseline["endpoints"].get(name)
+            if before is None:
+                continue
+            for metric in THRESHOLDS:
+                old, new = before[metric], current[metric]
+                allowed = old * (1 + options[f"max_{metric}"])
+                if metric == "p95_ms":
+                    allowed = max(allowed, old + MIN_LATENCY_DELTA_MS)
+                if new > allowed:
+                    regressions.append(f"{name}: {metric} {old} -> {new} (allowed {allowed:.2f})")
+            if current["status"] != before["status"]:
+                regressions.append(f"{name}: status {before['status']} -> {current['status']}")
+
+        baseline_commit = baseline["meta"].get("commit") or "baseline"
+        if regressions:
+            raise CommandError(f"Regressions against {baseline_commit}:\n  " + "\n  ".join(regressions))
+        self.stdout.write(f"No regressions against {baseline_commit}")
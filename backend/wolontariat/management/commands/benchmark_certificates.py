@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from reportlab.pdfbase import pdfmetrics
+
+from wolontariat.certificates import render_offer_certificate, render_user_certificate
+from wolontariat.pdf_utils import CachedSubsetTTFont, get_pl_font_names
+
+
+def _clear_font_caches():
+    for font_name in set(get_pl_font_names()):
+        font = pdfmetrics.getFont(font_name)
+        if isinstance(font, CachedSubsetTTFont):
+            font.clear_subset_cache()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure certificate renders per second. 'cold' drops the cached font subsets before "
+        "every render (what each render cost before they were cached), 'warm' reuses them."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=2.0, help="Duration of each measurement")
+        parser.add_argument("--assignments", type=int, default=5, help="Completed assignments on the volunteer certificate")
+
+    def _rate(self, render, args, seconds, cold):
+        count = 0
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < seconds:
+            if cold:
+                _clear_font_caches()
+            render(*args)
+            count += 1
+        return count / elapsed
+
+    def handle(self, *args, **options):
+        assignments = [
+            (i, f"Sprzątanie brzegów Wisły {i}", "Zielona Łódź") for i in range(options["assignments"])
+        ]
+        cases = [
+            ("volunteer", render_user_certificate, ("Łukasz Żółkiewski", "lukasz@example.com", assignments)),
+            ("offer", render_offer_certificate, ("Łukasz Żółkiewski", "Zbiórka żywności")),
+        ]
+        self.stdout.write(f"fonts: {', '.join(get_pl_font_names())}")
+        for name, render, render_args in cases:
+            size = len(render(*render_args))
+            cold = self._rate(render, render_args, options["seconds"], cold=True)
+            warm = self._rate(render, render_args, options["seconds"], cold=False)
+            self.stdout.write(
+                f"{name:<10} cold {cold:8.1f}/s  warm {warm:8.1f}/s  x{warm / cold:.2f}  {size} bytes"
+            )
@@ -0,0 +1,223 @@
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from wolontariat.models import Oferta, Organizacja, Projekt
+
+from .benchmark_api import percentile
+
+# gunicorn arguments of each setup: sync workers on WSGI, or uvicorn workers on ASGI with
+# the async read views (api/async_views.py)
+SERVERS = {
+    "wsgi": {"app": "wolontariat.wsgi:application", "args": [], "env": {"ASYNC_READ_VIEWS": "0"}},
+    "asgi": {
+        "app": "wolontariat.asgi:application",
+        "args": ["--worker-class", "uvicorn_worker.UvicornWorker"],
+        "env": {"ASYNC_READ_VIEWS": "1"},
+    },
+}
+STARTUP_TIMEOUT = 30
+REQUEST_TIMEOUT = 60
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def read_paths():
+    """The read endpoints served by the async views, on rows of the current database."""
+    offer = Oferta.objects.order_by("-liczba_uczestnikow", "id").first()
+    project = Projekt.objects.order_by("-liczba_ofert", "id").first()
+    if offer is None or project is None:
+        raise CommandError("The database has no offers; run generate_data first")
+    organization = Organizacja.objects.filter(pk=project.organizacja_id).first()
+    return [
+        "/api/offers/",
+        f"/api/offers/{offer.pk}/",
+        "/api/projects/",
+        f"/api/projects/{project.pk}/",
+        "/api/organizations/",
+        f"/api/organizations/{organization.pk}/",
+        "/api/reviews/",
+    ]
+
+
+class Server:
+    """A gunicorn process serving one of SERVERS against the current database."""
+
+    def __init__(self, name, workers, warm_cache):
+        self.name = name
+        self.port = free_port()
+        db = connection.settings_dict
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "wolontariat.settings"),
+            POSTGRES_DB=db["NAME"], POSTGRES_USER=db["USER"], POSTGRES_PASSWORD=db["PASSWORD"],
+            POSTGRES_HOST=db["HOST"], POSTGRES_PORT=str(db["PORT"]),
+            # As in production: no query log kept in memory, no sampled instrumentation
+            DEBUG="0", PERFORMANCE_SAMPLE_RATE="0",
+            **SERVERS[name]["env"],
+        )
+        if not warm_cache:
+            # Every request reaches the database: cached responses hide what the setups differ in
+            env["RESPONSE_CACHE_TIMEOUT"] = "0"
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", SERVERS[name]["app"], *SERVERS[name]["args"],
+             "--bind", f"127.0.0.1:{self.port}", "--workers", str(workers), "--timeout", str(REQUEST_TIMEOUT)],
+            cwd=settings.BASE_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+
+    def wait(self, path):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=REQUEST_TIMEOUT)
+                conn.request("GET", path)
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        self.log.seek(0)
+        output = self.log.read().decode(errors="replace")[-2000:]
+        raise CommandError(f"The {self.name} server did not start:\n{output}")
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+
+
+def load(port, paths, clients, duration):
+    """``clients`` connections requesting ``paths`` in turn for ``duration`` seconds."""
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=REQUEST_TIMEOUT)
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            sent = time.perf_counter()
+            try:
+                # Reconnects by itself after servers that close the connection (gunicorn's sync workers)
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                errors.append(path)
+                continue
+            latencies.append((time.perf_counter() - sent) * 1000)
+            if response.status != 200:
+                errors.append(path)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the WSGI setup (gunicorn sync workers) with the ASGI one (gunicorn with uvicorn "
+        "workers and the async read views) under concurrent connections: both servers are started "
+        "on free ports against the current database, and each concurrency level runs for "
+        "--duration seconds on the read endpoints. Reports requests per second and latency "
+        "percentiles; --output writes them as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servers", default="wsgi,asgi", help="Comma-separated setups to run: wsgi, asgi")
+        parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated numbers of concurrent connections")
+        parser.add_argument("--duration", type=float, default=10, help="Measured seconds per concurrency level")
+        parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds of load before each server")
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes of each server")
+        parser.add_argument("--warm-cache", action="store_true", help="Let the servers answer from the response cache")
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        servers = [name.strip() for name in options["servers"].split(",") if name.strip()]
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown servers: {', '.join(sorted(unknown))}")
+        levels = [int(level) for level in options["concurrency"].split(",")]
+        paths = read_paths()
+
+        results = {}
+        for name in servers:
+            server = Server(name, options["workers"], options["warm_cache"])
+            try:
+                server.wait(paths[0])
+                if options["warmup"]:
+                    load(server.port, paths, max(levels), options["warmup"])
+                results[name] = {}
+                for clients in levels:
+                    latencies, errors, elapsed = load(server.port, paths, clients, options["duration"])
+                    results[name][str(clients)] = self._summary(latencies, errors, elapsed)
+            finally:
+                server.stop()
+
+        self._print(results)
+        if options["output"]:
+            report = {
+                "meta": {
+                    "workers": options["workers"],
+                    "duration": options["duration"],
+                    "warm_cache": options["warm_cache"],
+                    "paths": paths,
+                },
+                "servers": results,
+            }
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write("\n")
+
+    def _summary(self, latencies, errors, elapsed):
+        if not latencies:
+            raise CommandError(f"No request succeeded ({len(errors)} errors)")
+        return {
+            "requests": len(latencies),
+            "errors": len(errors),
+            "req_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+        }
+
+    def _print(self, results):
+        self.stdout.write(f"{'server':<8} {'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for name, levels in results.items():
+            for clients, r in levels.items():
+                self.stdout.write(
+                    f"{name:<8} {clients:>8} {r['req_s']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                    f"{r['p99_ms']:>8.1f} {r['errors']:>7}"
+                )
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.renderers import ORJSONRenderer
+from api.views import OfertaViewSet, UzytkownikViewSet
+from wolontariat import middleware
+from wolontariat.models import Uzytkownik
+
+from .benchmark_serialization import create_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure CPU time of rendering the offers and volunteers lists with DRF's JSONRenderer "
+        "versus ORJSONRenderer, and their size on the wire with each Content-Encoding. The data "
+        "is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000, help="Offers (and volunteers) in the lists")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best one is reported")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        with transaction.atomic():
+            organizacja = create_data(rows, participants=3, n_volunteers=rows)
+            user = Uzytkownik.objects.create_user(
+                username=f"benchmark-org-{organizacja.nip}", password="!", rola="organizacja",
+                nr_telefonu="500000000", organizacja=organizacja,
+            )
+            lists = {
+                "offers": OfertaViewSet.as_view({"get": "my_offers"}),
+                "volunteers": UzytkownikViewSet.as_view({"get": "volunteers"}),
+            }
+            self.stdout.write(
+                f"{'list':<11} {'json ms':>8} {'orjson ms':>10} {'identity B':>11} "
+                + " ".join(f"{coding + ' B':>9} {coding + ' ms':>8}" for coding in middleware.CODINGS)
+            )
+            for name, view in lists.items():
+                request = APIRequestFactory().get("/")
+                force_authenticate(request, user)
+                data = view(request).data
+
+                stdlib = self._cpu(lambda: JSONRenderer().render(data), repeat)
+                fast = self._cpu(lambda: ORJSONRenderer().render(data), repeat)
+                body = ORJSONRenderer().render(data)
+                line = f"{name:<11} {stdlib * 1000:>8.1f} {fast * 1000:>10.1f} {len(body):>11,}"
+                for compress, _, _ in middleware.CODINGS.values():
+                    elapsed = self._cpu(lambda: compress(body), repeat)
+                    line += f" {len(compress(body)):>9,} {elapsed * 1000:>8.1f}"
+                self.stdout.write(line)
+            transaction.set_rollback(True)
+
+    def _cpu(self, work, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.process_time()
+            work()
+            elapsed = time.process_time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
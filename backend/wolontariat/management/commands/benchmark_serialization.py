@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.projections import OfferListProjection, ProjectListProjection, ReviewListProjection
+from api.serializers import OfertaSerializer
+from wolontariat.counters import recount_offers, recount_projects
+from wolontariat.models import Oferta, Organizacja, Projekt, Recenzja, Uzytkownik, Zlecenie
+
+
+def create_data(rows, participants, n_volunteers=None):
+    """
+    One organization with ``rows`` projects, offers (``participants`` volunteers each) and
+    reviews, shared by ``n_volunteers`` volunteers (ten per participant by default).
+    """
+    # bulk_create: no signals, so the response caches are left alone
+    organizacja = Organizacja.objects.create(nazwa_organizacji="Benchmark", nr_telefonu="500000000", nip=str(time.time_ns())[-10:])
+    volunteers = Uzytkownik.objects.bulk_create(
+        Uzytkownik(
+            username=f"benchmark{i}", email=f"benchmark{i}@{organizacja.nip}.example.com", password="!", rola="wolontariusz",
+            nr_telefonu="500000000", wiek=15 + i % 50, first_name="Jan", last_name=f"Kowalski {i}",
+        )
+        for i in range(n_volunteers or max(participants, 1) * 10)
+    )
+    projekty = Projekt.objects.bulk_create(
+        Projekt(organizacja=organizacja, nazwa_projektu=f"Projekt {i}", opis_projektu="Opis projektu " * 10)
+        for i in range(rows)
+    )
+    oferty = Oferta.objects.bulk_create(
+        Oferta(
+            organizacja=organizacja, projekt=projekty[i], tytul_oferty=f"Oferta {i}", lokalizacja="Kraków",
+            tematyka="Ekologia", czas_trwania="2 tygodnie", wymagania="Brak", wolontariusz=volunteers[i % len(volunteers)],
+        )
+        for i in range(rows)
+    )
+    Zlecenie.objects.bulk_create(
+        Zlecenie(oferta=oferta, wolontariusz=volunteers[(i + j) % len(volunteers)], czy_potwierdzone=bool(j % 2))
+        for i, oferta in enumerate(oferty)
+        for j in range(participants)
+    )
+    Recenzja.objects.bulk_create(
+        Recenzja(organizacja=organizacja, wolontariusz=volunteers[i % len(volunteers)], oferta=oferta, ocena=5, komentarz="Dziękujemy")
+        for i, oferta in enumerate(oferty)
+    )
+    # bulk_create also skips the counters
+    recount_offers([oferta.pk for oferta in oferty])
+    recount_projects([projekt.pk for projekt in projekty])
+    return organizacja
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure rows per second serialized for one large page of offers, projects and reviews: "
+        "the serializers versus the values() projections of api/projections.py. The data is "
+        "created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Rows per page")
+        parser.add_argument("--participants", type=int, default=3, help="Volunteers applied to each offer")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best one is reported")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        with transaction.atomic():
+            create_data(rows, options["participants"])
+            querysets = {
+                "offers": (OfferListProjection(), OfertaSerializer.setup_eager_loading(Oferta.objects.order_by("id"))),
+                "projects": (ProjectListProjection(), Projekt.objects.select_related("organizacja").order_by("id")),
+                "reviews": (ReviewListProjection(), Recenzja.objects.select_related("organizacja", "wolontariusz").order_by("id")),
+            }
+            self.stdout.write(f"{'endpoint':<10} {'serializer rows/s':>18} {'values() rows/s':>16} {'speed-up':>9}")
+            for name, (projection, queryset) in querysets.items():
+                page = queryset[:rows]
+                serializer = self._rate(lambda: projection.serializer_class(page, many=True).data, rows, options["repeat"])
+                projected = self._rate(lambda: projection.data(projection.rows(page)), rows, options["repeat"])
+                self.stdout.write(f"{name:<10} {serializer:>18,.0f} {projected:>16,.0f} {projected / serializer:>8.1f}x")
+            transaction.set_rollback(True)
+
+    def _rate(self, serialize, rows, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = serialize()
+            elapsed = time.perf_counter() - start
+            assert len(data) == rows
+            best = elapsed if best is None else min(best, elapsed)
+        return rows / best
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from wolontariat.changes import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete change log entries (GET /api/changes/) superseded by a later entry of the same row, "
+        "so the log grows with the rows changed rather than with the number of changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only count the superseded entries")
+
+    def handle(self, *args, **options):
+        deleted = compact(dry_run=options["dry_run"])
+        verb = "superseded" if options["dry_run"] else "deleted"
+        self.stdout.write(f"{deleted} change log entries {verb}")
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from wolontariat.certificates import iter_certificates, offer_certificate_jobs, project_certificate_jobs, stream_zip
+from wolontariat.models import Oferta, Projekt
+
+
+class Command(BaseCommand):
+    help = "Render certificates for every volunteer who completed an offer or a project and write them to a ZIP."
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--offer", type=int, help="Oferta id")
+        target.add_argument("--project", type=int, help="Projekt id")
+        parser.add_argument("-o", "--output", help="ZIP path (default: zaswiadczenia_<oferta|projekt>_<id>.zip)")
+        parser.add_argument("--workers", type=int, default=settings.CERTIFICATE_WORKERS, help="Render processes")
+
+    def handle(self, *args, **options):
+        if options["offer"] is not None:
+            try:
+                offer = Oferta.objects.get(pk=options["offer"])
+            except Oferta.DoesNotExist:
+                raise CommandError(f"Oferta {options['offer']} does not exist")
+            jobs = offer_certificate_jobs(offer)
+            default_output = f"zaswiadczenia_oferta_{offer.pk}.zip"
+        else:
+            try:
+                projekt = Projekt.objects.get(pk=options["project"])
+            except Projekt.DoesNotExist:
+                raise CommandError(f"Projekt {options['project']} does not exist")
+            jobs = project_certificate_jobs(projekt)
+            default_output = f"zaswiadczenia_projekt_{projekt.pk}.zip"
+
+        if not jobs:
+            raise CommandError("No completed assignments")
+
+        output = options["output"] or default_output
+        with open(output, "wb") as fh:
+            for chunk in stream_zip(iter_certificates(jobs, workers=options["workers"])):
+                fh.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(jobs)} certificates to {output}"))
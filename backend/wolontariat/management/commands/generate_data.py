@@ -0,0 +1,43 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from wolontariat.synthetic import PASSWORD, generate, reset
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset: organizations, volunteers, projects, offers, applications, "
+        "reviews and messages with skewed, realistic distributions, written with COPY. The same "
+        "--seed and --base-date give the same data. The defaults write about a million rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Empty the application tables first (one TRUNCATE)")
+        parser.add_argument("--organizations", type=int, default=500)
+        parser.add_argument("--volunteers", type=int, default=50000)
+        parser.add_argument("--projects", type=int, default=5, help="Projects per organization (average)")
+        parser.add_argument("--offers", type=int, default=10, help="Offers per project (average)")
+        parser.add_argument("--applications", type=int, default=8, help="Applications per offer (average)")
+        parser.add_argument("--messages", type=int, default=15, help="Messages per volunteer (average)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--base-date", type=date.fromisoformat, help="'Today' of the dataset (YYYY-MM-DD); defaults to today")
+        parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per COPY")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            if options["reset"]:
+                reset()
+            counts = generate(
+                organizations=options["organizations"], volunteers=options["volunteers"],
+                projects_per_organization=options["projects"], offers_per_project=options["offers"],
+                applications_per_offer=options["applications"], messages_per_volunteer=options["messages"],
+                seed=options["seed"], base_date=options["base_date"], chunk_size=options["chunk_size"],
+            )
+        elapsed = time.perf_counter() - start
+        for name, count in counts.items():
+            self.stdout.write(f"{name:<12} {count:>10,}")
+        self.stdout.write(f"{sum(counts.values()):,} rows in {elapsed:.1f} s; every account's password is '{PASSWORD}'")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from wolontariat.counters import recount_offers, recount_projects, recount_unread
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized counters (participants per offer, offers per project, unread "
+        "messages per user) from the rows they count; one UPDATE per table, touching only wrong rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that are out of date")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        with transaction.atomic():
+            offers = recount_offers(dry_run=dry_run)
+            projects = recount_projects(dry_run=dry_run)
+            users = recount_unread(dry_run=dry_run)
+        verb = "out of date" if dry_run else "repaired"
+        self.stdout.write(f"{offers} offers, {projects} projects and {users} users {verb}")
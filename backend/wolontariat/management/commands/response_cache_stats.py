@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from wolontariat import response_cache
+
+
+class Command(BaseCommand):
+    help = "Show hits and misses of the API response cache (shared by all processes unless it is locmem)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = response_cache.stats()
+        self.stdout.write(
+            f"{settings.CACHE_BACKEND}: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_ratio']:.1%} hit ratio)"
+        )
+        if options["reset"]:
+            response_cache.reset_stats()
@@ -0,0 +1,55 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from prometheus_client import start_http_server
+
+from wolontariat import metrics
+from wolontariat.jobs import expire_exports, run_pending
+
+# Seconds between sweeps of expired export ZIPs
+EXPIRY_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued certificate and export jobs. Run as many workers as needed: "
+        "jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so they never collide."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit instead of polling")
+        parser.add_argument("--interval", type=float, default=settings.JOB_POLL_INTERVAL, help="Seconds between polls of an empty queue")
+        parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics (render durations...) on this port")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            count = run_pending()
+            expired = expire_exports()
+            self.stdout.write(f"Processed {count} jobs, deleted {expired} expired exports")
+            return
+
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        # Finish the current job on SIGTERM/SIGINT (docker stop, Ctrl+C) instead of dropping it
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        if options["metrics_port"]:
+            start_http_server(options["metrics_port"], registry=metrics.registry())
+
+        self.stdout.write("Waiting for jobs...")
+        expired_at = None
+        while not stopping:
+            close_old_connections()
+            if expired_at is None or time.monotonic() - expired_at >= EXPIRY_INTERVAL:
+                expire_exports()
+                expired_at = time.monotonic()
+            if not run_pending(limit=1):
+                time.sleep(options["interval"])
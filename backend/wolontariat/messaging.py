@@ -0,0 +1,38 @@
+"""
+Sending and reading messages.
+
+Uzytkownik.nieprzeczytane_wiadomosci holds each recipient's number of unread messages, so
+the unread badge is a primary-key read instead of a count over an inbox that can hold
+millions of rows. It changes with F() in the same transaction as the messages it counts;
+`manage.py repair_counters` recounts it from the partial index of unread messages.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import Uzytkownik, Wiadomosc
+
+
+def _adjust_unread(odbiorca_id, delta) -> None:
+    Uzytkownik.objects.filter(pk=odbiorca_id).update(nieprzeczytane_wiadomosci=F('nieprzeczytane_wiadomosci') + delta)
+
+
+def send(nadawca, odbiorca, tresc) -> Wiadomosc:
+    with transaction.atomic():
+        wiadomosc = Wiadomosc.objects.create(nadawca=nadawca, odbiorca=odbiorca, tresc=tresc)
+        _adjust_unread(odbiorca.pk, 1)
+    return wiadomosc
+
+
+def mark_read(odbiorca, messages) -> int:
+    """Mark the unread messages of ``odbiorca`` among ``messages`` (a queryset) read; returns how many."""
+    with transaction.atomic():
+        # The przeczytana=False guard makes concurrent calls count every message once
+        count = messages.filter(odbiorca=odbiorca, przeczytana=False).update(przeczytana=True)
+        if count:
+            _adjust_unread(odbiorca.pk, -count)
+    return count
+
+
+def unread_count(user) -> int:
+    # Not user.nieprzeczytane_wiadomosci: request.user may come from the token cache
+    return Uzytkownik.objects.filter(pk=user.pk).values_list('nieprzeczytane_wiadomosci', flat=True).first() or 0
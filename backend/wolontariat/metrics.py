@@ -0,0 +1,115 @@
+"""
+Prometheus metrics, served at GET /metrics.
+
+Request latency by view (the URL name, so each viewset action such as ``offers-apply`` or
+``offers-confirm-volunteer`` is its own series), requests in flight, SQL queries and their
+time, cache lookups by result (hit ratio = hits / all lookups) and PDF render durations.
+
+With several worker processes (gunicorn, uvicorn --workers) set PROMETHEUS_MULTIPROC_DIR
+to an empty directory before they start: every process then writes its values to
+memory-mapped files there, and /metrics adds up the files of all of them, whichever worker
+answers the scrape. docker-compose.yml empties it before starting the processes, and
+gunicorn.conf.py drops the live gauges of workers that exit. Without the variable each
+process reports only itself, which is right for runserver and the tests.
+
+METRICS_TOKEN, when set, is required as ``Authorization: Bearer <token>``.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+REQUEST_DURATION = Histogram(
+    'wolontariat_http_request_duration_seconds', 'Time until the response is returned, by view',
+    ['view', 'method', 'status'],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'wolontariat_http_requests_in_progress', 'Requests being served', multiprocess_mode='livesum',
+)
+DB_QUERIES = Counter('wolontariat_db_queries_total', 'SQL statements executed')
+DB_QUERY_SECONDS = Counter('wolontariat_db_query_seconds_total', 'Time spent executing SQL statements')
+CACHE_LOOKUPS = Counter(
+    'wolontariat_cache_lookups_total', 'Cache lookups (responses, tokens, certificates) by result',
+    ['cache', 'result'],
+)
+DOCUMENT_RENDER_DURATION = Histogram(
+    'wolontariat_document_render_seconds', 'PDF rendering time, by page template', ['template'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+def cache_lookup(cache, hit) -> None:
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERY_SECONDS.inc(time.perf_counter() - start)
+        DB_QUERIES.inc()
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _view_name(request):
+    match = request.resolver_match
+    # Unresolved paths share one series: their number is unbounded
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with REQUESTS_IN_PROGRESS.track_inprogress():
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with REQUESTS_IN_PROGRESS.track_inprogress():
+            response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, duration):
+        REQUEST_DURATION.labels(_view_name(request), request.method, str(response.status_code)).observe(duration)
+
+
+def registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:56
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import wolontariat.search
+from django.db import migrations, models
+
+
+PL_UNACCENT_SQL = """
+CREATE OR REPLACE FUNCTION pl_unaccent(value text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT translate(lower(value), 'ąćęłńóśźżĄĆĘŁŃÓŚŹŻ', 'acelnoszzacelnoszz') $$;
+"""
+
+# pg_trgm is optional: managed servers without contrib still get full-text search.
+TRIGRAM_EXTENSION_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    END IF;
+END $$;
+"""
+
+OFERTA_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION wolontariat_oferta_search_vector() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', pl_unaccent(coalesce(NEW.tytul_oferty, ''))), 'A') ||
+        setweight(to_tsvector('simple', pl_unaccent(coalesce(NEW.tematyka, ''))), 'B') ||
+        setweight(to_tsvector('simple', pl_unaccent(coalesce(NEW.lokalizacja, ''))), 'B') ||
+        setweight(to_tsvector('simple', pl_unaccent(coalesce(NEW.wymagania, ''))), 'C') ||
+        setweight(to_tsvector('simple', pl_unaccent(coalesce(
+            (SELECT opis_projektu FROM wolontariat_projekt WHERE id = NEW.projekt_id), ''
+        ))), 'D');
+    RETURN NEW;
+END $$;
+
+CREATE TRIGGER wolontariat_oferta_search_vector
+    BEFORE INSERT OR UPDATE OF tytul_oferty, tematyka, lokalizacja, wymagania, projekt_id
+    ON wolontariat_oferta
+    FOR EACH ROW EXECUTE FUNCTION wolontariat_oferta_search_vector();
+
+-- Re-index a project's offers when its description changes. Listing projekt_id in the SET
+-- clause is enough to fire the column trigger above, even though the value is unchanged.
+CREATE OR REPLACE FUNCTION wolontariat_projekt_search_vector() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE wolontariat_oferta SET projekt_id = projekt_id WHERE projekt_id = NEW.id;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER wolontariat_projekt_search_vector
+    AFTER UPDATE OF opis_projektu ON wolontariat_projekt
+    FOR EACH ROW WHEN (OLD.opis_projektu IS DISTINCT FROM NEW.opis_projektu)
+    EXECUTE FUNCTION wolontariat_projekt_search_vector();
+
+UPDATE wolontariat_oferta SET projekt_id = projekt_id;
+"""
+
+OFERTA_TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS wolontariat_projekt_search_vector ON wolontariat_projekt;
+DROP FUNCTION IF EXISTS wolontariat_projekt_search_vector();
+DROP TRIGGER IF EXISTS wolontariat_oferta_search_vector ON wolontariat_oferta;
+DROP FUNCTION IF EXISTS wolontariat_oferta_search_vector();
+"""
+
+# Expression indexes matching PlUnaccent(<title>) in wolontariat.search, used by the `%>` fallback.
+TRIGRAM_INDEXES_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS oferta_tytul_trgm
+            ON wolontariat_oferta USING gin (pl_unaccent(tytul_oferty) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS projekt_nazwa_trgm
+            ON wolontariat_projekt USING gin (pl_unaccent(nazwa_projektu) gin_trgm_ops);
+    END IF;
+END $$;
+"""
+
+TRIGRAM_INDEXES_REVERSE_SQL = """
+DROP INDEX IF EXISTS oferta_tytul_trgm;
+DROP INDEX IF EXISTS projekt_nazwa_trgm;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PL_UNACCENT_SQL, 'DROP FUNCTION IF EXISTS pl_unaccent(text);'),
+        migrations.RunSQL(TRIGRAM_EXTENSION_SQL, migrations.RunSQL.noop),
+        migrations.AddField(
+            model_name='oferta',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projekt',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector(wolontariat.search.PlUnaccent('nazwa_projektu'), config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector(wolontariat.search.PlUnaccent('opis_projektu'), config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='oferta',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='oferta_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='projekt',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='projekt_search_vector_gin'),
+        ),
+        migrations.RunSQL(OFERTA_TRIGGER_SQL, OFERTA_TRIGGER_REVERSE_SQL),
+        migrations.RunSQL(TRIGRAM_INDEXES_SQL, TRIGRAM_INDEXES_REVERSE_SQL),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:59
+
+import datetime
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0002_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='oferta',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('data', models.Value(datetime.date(9999, 12, 31), output_field=models.DateField())), models.F('id'), name='oferta_data_id_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='recenzja',
+            index=models.Index(fields=['created_at', 'id'], name='recenzja_created_id_keyset'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Zadanie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rodzaj', models.CharField(choices=[('certyfikat', 'Zaświadczenie wolontariusza'), ('certyfikat_oferty', 'Zaświadczenie ukończenia oferty'), ('zip_oferty', 'Zaświadczenia uczestników oferty (ZIP)'), ('zip_projektu', 'Zaświadczenia uczestników projektu (ZIP)')], max_length=20)),
+                ('status', models.CharField(choices=[('oczekuje', 'Oczekuje'), ('w_toku', 'W toku'), ('gotowe', 'Gotowe'), ('blad', 'Błąd')], default='oczekuje', max_length=10)),
+                ('parametry', models.JSONField(default=dict)),
+                ('klucz', models.CharField(blank=True, max_length=255)),
+                ('nazwa_pliku', models.CharField(max_length=255)),
+                ('plik', models.CharField(blank=True, help_text='Nazwa pliku w magazynie CERTIFICATE_STORAGE', max_length=255)),
+                ('blad', models.TextField(blank=True)),
+                ('proby', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('zlecajacy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zadania', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status__in', ['oczekuje', 'w_toku'])), fields=['id'], name='zadanie_kolejka'), models.Index(fields=['zlecajacy', 'klucz'], name='zadanie_zlecajacy_klucz')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0004_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oferta',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='organizacja',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='projekt',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='zlecenie',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+# Same numbers as `manage.py repair_counters`
+BACKFILL_SQL = """
+UPDATE wolontariat_oferta o SET
+    liczba_uczestnikow = c.uczestnicy,
+    liczba_potwierdzonych = c.potwierdzeni,
+    liczba_ukonczonych = c.ukonczeni
+FROM (
+    SELECT oferta_id,
+           COUNT(*) AS uczestnicy,
+           COUNT(*) FILTER (WHERE czy_potwierdzone) AS potwierdzeni,
+           COUNT(*) FILTER (WHERE czy_ukonczone) AS ukonczeni
+    FROM wolontariat_zlecenie GROUP BY oferta_id
+) c
+WHERE c.oferta_id = o.id;
+
+UPDATE wolontariat_projekt p SET liczba_ofert = c.oferty
+FROM (SELECT projekt_id, COUNT(*) AS oferty FROM wolontariat_oferta GROUP BY projekt_id) c
+WHERE c.projekt_id = p.id;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oferta',
+            name='liczba_potwierdzonych',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='oferta',
+            name='liczba_uczestnikow',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='oferta',
+            name='liczba_ukonczonych',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projekt',
+            name='liczba_ofert',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='oferta',
+            index=models.Index(condition=models.Q(('liczba_uczestnikow', 0)), fields=['id'], name='oferta_wolne'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:05
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oferta',
+            name='max_uczestnikow',
+            field=models.PositiveIntegerField(blank=True, help_text='Maksymalna liczba uczestników', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0007_max_uczestnikow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uzytkownik',
+            name='nieprzeczytane_wiadomosci',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='wiadomosc',
+            name='przeczytana',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='wiadomosc',
+            name='nadawca',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='wyslane_wiadomosci', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='wiadomosc',
+            name='odbiorca',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='otrzymane_wiadomosci', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='wiadomosc',
+            index=models.Index(fields=['odbiorca', 'data_wyslania', 'id'], name='wiadomosc_skrzynka_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='wiadomosc',
+            index=models.Index(fields=['nadawca', 'odbiorca', 'data_wyslania', 'id'], name='wiadomosc_rozmowa_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='wiadomosc',
+            index=models.Index(condition=models.Q(('przeczytana', False)), fields=['odbiorca'], name='wiadomosc_nieprzeczytane'),
+        ),
+        # Messages from before read receipts count as read, so nobody starts with a backlog of "unread"
+        migrations.RunSQL('UPDATE wolontariat_wiadomosc SET przeczytana = true;', migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+LOGGED_TABLES = {
+    'oferta': 'wolontariat_oferta',
+    'projekt': 'wolontariat_projekt',
+    'zlecenie': 'wolontariat_zlecenie',
+    'recenzja': 'wolontariat_recenzja',
+}
+
+# Statement triggers with transition tables: a bulk UPDATE of 500 rows logs them with one INSERT
+FUNCTION_SQL = """
+CREATE FUNCTION wolontariat_log_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO wolontariat_zmiana (model, obiekt_id, usuniety, txid, created_at)
+        SELECT TG_ARGV[0], id, true, pg_current_xact_id()::text::bigint, now() FROM old_rows;
+    ELSE
+        INSERT INTO wolontariat_zmiana (model, obiekt_id, usuniety, txid, created_at)
+        SELECT TG_ARGV[0], id, false, pg_current_xact_id()::text::bigint, now() FROM new_rows;
+    END IF;
+    RETURN NULL;
+END $$;
+"""
+
+TRIGGER_SQL = """
+CREATE TRIGGER {table}_log_insert AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION wolontariat_log_changes('{model}');
+CREATE TRIGGER {table}_log_update AFTER UPDATE ON {table}
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION wolontariat_log_changes('{model}');
+CREATE TRIGGER {table}_log_delete AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION wolontariat_log_changes('{model}');
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER {table}_log_insert ON {table};
+DROP TRIGGER {table}_log_update ON {table};
+DROP TRIGGER {table}_log_delete ON {table};
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0008_messages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Zmiana',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=10)),
+                ('obiekt_id', models.BigIntegerField()),
+                ('usuniety', models.BooleanField(default=False)),
+                ('txid', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['txid', 'id'], name='zmiana_pozycja'), models.Index(fields=['model', 'obiekt_id'], name='zmiana_obiekt')],
+            },
+        ),
+        migrations.RunSQL(FUNCTION_SQL, 'DROP FUNCTION wolontariat_log_changes();'),
+        migrations.RunSQL(
+            ''.join(TRIGGER_SQL.format(table=table, model=model) for model, table in LOGGED_TABLES.items()),
+            ''.join(DROP_TRIGGER_SQL.format(table=table) for table in LOGGED_TABLES.values()),
+        ),
+    ]
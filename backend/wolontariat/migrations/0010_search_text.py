@@ -0,0 +1,56 @@
+import django.db.models.functions.text
+import wolontariat.search
+from django.db import migrations, models
+
+# The trigram match covers the same own-table text as the full-text vector, not just the
+# title or name; the indexes follow it to the new columns (pg_trgm is optional, as in 0002).
+TRIGRAM_INDEXES_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        DROP INDEX IF EXISTS oferta_tytul_trgm;
+        DROP INDEX IF EXISTS projekt_nazwa_trgm;
+        CREATE INDEX IF NOT EXISTS oferta_search_text_trgm
+            ON wolontariat_oferta USING gin (search_text gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS projekt_search_text_trgm
+            ON wolontariat_projekt USING gin (search_text gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+TRIGRAM_INDEXES_REVERSE_SQL = """
+DO $$
+BEGIN
+    DROP INDEX IF EXISTS oferta_search_text_trgm;
+    DROP INDEX IF EXISTS projekt_search_text_trgm;
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS oferta_tytul_trgm
+            ON wolontariat_oferta USING gin (pl_unaccent(tytul_oferty) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS projekt_nazwa_trgm
+            ON wolontariat_projekt USING gin (pl_unaccent(nazwa_projektu) gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wolontariat', '0009_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oferta',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=wolontariat.search.PlUnaccent(django.db.models.functions.text.Concat('tytul_oferty', models.Value(' '), 'tematyka', models.Value(' '), 'lokalizacja', models.Value(' '), 'wymagania', output_field=models.TextField())), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='projekt',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=wolontariat.search.PlUnaccent(django.db.models.functions.text.Concat('nazwa_projektu', models.Value(' '), 'opis_projektu', output_field=models.TextField())), output_field=models.TextField()),
+        ),
+        migrations.RunSQL(TRIGRAM_INDEXES_SQL, TRIGRAM_INDEXES_REVERSE_SQL),
+    ]
@@ -1,13 +1,45 @@
+from datetime import date
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Concat
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.contrib.auth.models import AbstractUser, PermissionsMixin
-from django.core.validators import RegexValidator
+from django.core.validators import MinValueValidator, RegexValidator
 from django.utils import timezone
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from .pdf_utils import get_pl_font_names
-from io import BytesIO
+from .search import PlUnaccent, SEARCH_CONFIG
+from .certificates import completed_assignments, render_user_certificate
 from django.core.files.base import ContentFile
 
+class DenormalizedCountersMixin(models.Model):
+    """
+    ``counter_fields`` are only changed with F() updates (wolontariat/counters.py). The UPDATE
+    of a save() without ``update_fields`` leaves them out, so it cannot write a stale copy over
+    a concurrent change; everything else about save() is Django's (an INSERT when the row is
+    gone, force_insert, explicit update_fields).
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        deferred = self.get_deferred_fields()
+        if deferred and kwargs.get('update_fields') is None and not kwargs.get('force_insert') and not self._state.adding:
+            # Django saves such an instance as save(update_fields=<the loaded fields>), counters included
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.attname not in deferred
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.counter_fields]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+
 # ---Organizacja---
 class Organizacja(models.Model):
     telefon_validator = RegexValidator(
@@ -19,6 +51,7 @@ class Organizacja(models.Model):
     nr_telefonu = models.CharField(max_length=9, validators=[telefon_validator], help_text="Podaj numer telefonu składający się tylko z 9 cyfr")
     nip = models.CharField(max_length=10, unique=True)
     weryfikacja = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if self.nip:
@@ -30,7 +63,7 @@ class Organizacja(models.Model):
 
 
 # ---Uzytkownik---
-class Uzytkownik(AbstractUser):
+class Uzytkownik(AbstractUser, DenormalizedCountersMixin):
     telefon_validator = RegexValidator(regex=r'^\d{9}$', message="Numer telefonu musi składać się z dokładnie 9 cyfr.")
 
     email = models.EmailField(unique=True)
@@ -44,6 +77,9 @@ class Uzytkownik(AbstractUser):
         ('organizacja', 'Organizacja'),
     ]
     rola = models.CharField(max_length=20, choices=ROLE_TYPE)
+    # Denormalized; see wolontariat/messaging.py
+    nieprzeczytane_wiadomosci = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('nieprzeczytane_wiadomosci',)
 
     groups = models.ManyToManyField(
         'auth.Group', verbose_name='groups', blank=True, related_name='uzytkownik_set', related_query_name='uzytkownik'
@@ -59,47 +95,44 @@ class Uzytkownik(AbstractUser):
         return f"{self.username} ({self.rola})"
 
     def certyfikat_gen(self):
-        # Fetch completed assignments via Zlecenie
-        completed_zlecenia = self.zlecenia.filter(czy_ukonczone=True)
-
-        buffer = BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-
-        pdf.setFont("Helvetica-Bold", 20)
-        pdf.drawCentredString(width / 2, height - 100, "Zaświadczenie ukończenia zleceń")
-
-        pdf.setFont("Helvetica", 14)
-        pdf.drawString(100, height - 150, f"Wolontariusz: {self.username}")
-        pdf.drawString(100, height - 170, f"E-mail: {self.email}")
-
-        pdf.drawString(100, height - 200, "Ukończone zlecenia:")
-        y = height - 220
-        for zlecenie in completed_zlecenia:
-            pdf.drawString(120, y, f"- {zlecenie.oferta.tytul_oferty} ({zlecenie.oferta.projekt.nazwa_projektu})")
-            y -= 20
-            if y < 50:
-                pdf.showPage()
-                y = height - 50
-
-        pdf.showPage()
-        pdf.save()
-        buffer.seek(0)
-        return ContentFile(buffer.read(), name=f"zaswiadczenie_{self.username}.pdf")
+        # Fetch completed assignments via Zlecenie (one query, including offer and project names)
+        pdf = render_user_certificate(self.username, self.email, completed_assignments(self))
+        return ContentFile(pdf, name=f"zaswiadczenie_{self.username}.pdf")
 
 
 # ---Projekt---
-class Projekt(models.Model):
+class Projekt(DenormalizedCountersMixin, models.Model):
     organizacja = models.ForeignKey(Organizacja, on_delete=models.CASCADE, related_name='projekty')
     nazwa_projektu = models.CharField(max_length=100)
     opis_projektu = models.TextField()
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector(PlUnaccent('nazwa_projektu'), config=SEARCH_CONFIG, weight='A')
+            + SearchVector(PlUnaccent('opis_projektu'), config=SEARCH_CONFIG, weight='B')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    # The same text, for the typo-tolerant trigram match (wolontariat/search.py)
+    search_text = models.GeneratedField(
+        expression=PlUnaccent(Concat('nazwa_projektu', Value(' '), 'opis_projektu', output_field=models.TextField())),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized; see wolontariat/counters.py
+    liczba_ofert = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('liczba_ofert',)
+
+    class Meta:
+        indexes = [GinIndex(fields=['search_vector'], name='projekt_search_vector_gin')]
 
     def __str__(self):
         return self.nazwa_projektu
 
 
 # ---Oferta---
-class Oferta(models.Model):
+class Oferta(DenormalizedCountersMixin, models.Model):
     organizacja = models.ForeignKey(Organizacja, on_delete=models.CASCADE, related_name='oferty')
     projekt = models.ForeignKey(Projekt, on_delete=models.CASCADE, related_name='oferty')
     tytul_oferty = models.CharField(max_length=100)
@@ -115,6 +148,38 @@ class Oferta(models.Model):
     czas_trwania = models.CharField(max_length=50, blank=True)
     wymagania = models.TextField(blank=True)
 
+    # Maintained by the wolontariat_oferta_search_vector trigger (migration 0002): it also
+    # folds in the parent project's description, which a generated column cannot reference.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # The offer's own searchable text, for the typo-tolerant trigram match (wolontariat/search.py)
+    search_text = models.GeneratedField(
+        expression=PlUnaccent(Concat(
+            'tytul_oferty', Value(' '), 'tematyka', Value(' '), 'lokalizacja', Value(' '), 'wymagania',
+            output_field=models.TextField(),
+        )),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Empty: no limit. Enforced when applying (wolontariat.counters.apply_for_offer)
+    max_uczestnikow = models.PositiveIntegerField(null=True, blank=True, validators=[MinValueValidator(1)], help_text="Maksymalna liczba uczestników")
+
+    # Denormalized Zlecenie counts; see wolontariat/counters.py
+    liczba_uczestnikow = models.PositiveIntegerField(default=0, editable=False)
+    liczba_potwierdzonych = models.PositiveIntegerField(default=0, editable=False)
+    liczba_ukonczonych = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('liczba_uczestnikow', 'liczba_potwierdzonych', 'liczba_ukonczonych')
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='oferta_search_vector_gin'),
+            # ?tylko_wolne=true: offers nobody has applied to yet
+            models.Index(fields=['id'], condition=models.Q(liczba_uczestnikow=0), name='oferta_wolne'),
+            # Keyset pagination key; must match api.pagination.keyset_expression('data')
+            models.Index(Coalesce('data', Value(date.max, output_field=models.DateField())), F('id'), name='oferta_data_id_keyset'),
+        ]
+
     def __str__(self):
         return self.tytul_oferty
 
@@ -127,6 +192,7 @@ class Zlecenie(models.Model):
 
     czy_ukonczone = models.BooleanField(default=False)     # Did they finish the job?
     czy_potwierdzone = models.BooleanField(default=False)  # Did the Org accept their application?
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('oferta', 'wolontariusz')
@@ -134,12 +200,24 @@ class Zlecenie(models.Model):
     def __str__(self):
         return f"Zlecenie: {self.oferta} - {self.wolontariusz}"
 
-# ---Wiadomosc & Recenzja (unchanged)---
+# ---Wiadomosc & Recenzja---
 class Wiadomosc(models.Model):
-    nadawca = models.ForeignKey(Uzytkownik, on_delete=models.CASCADE, related_name='wyslane_wiadomosci')
-    odbiorca = models.ForeignKey(Uzytkownik, on_delete=models.CASCADE, related_name='otrzymane_wiadomosci')
+    # No single-column indexes: both columns lead one of the composite indexes below
+    nadawca = models.ForeignKey(Uzytkownik, on_delete=models.CASCADE, related_name='wyslane_wiadomosci', db_index=False)
+    odbiorca = models.ForeignKey(Uzytkownik, on_delete=models.CASCADE, related_name='otrzymane_wiadomosci', db_index=False)
     tresc = models.TextField()
     data_wyslania = models.DateTimeField(auto_now_add=True)
+    przeczytana = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Inbox, newest first: keyset pagination on (data_wyslania, id) within one recipient
+            models.Index(fields=['odbiorca', 'data_wyslania', 'id'], name='wiadomosc_skrzynka_keyset'),
+            # Conversation: one range per direction of the pair
+            models.Index(fields=['nadawca', 'odbiorca', 'data_wyslania', 'id'], name='wiadomosc_rozmowa_keyset'),
+            # "Mark all read" and repair_counters touch only the (few) unread rows
+            models.Index(fields=['odbiorca'], condition=models.Q(przeczytana=False), name='wiadomosc_nieprzeczytane'),
+        ]
 
 class Recenzja(models.Model):
     organizacja = models.ForeignKey('Organizacja', on_delete=models.CASCADE, related_name='recenzje')
@@ -152,3 +230,84 @@ class Recenzja(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('oferta', 'organizacja')
+        indexes = [models.Index(fields=['created_at', 'id'], name='recenzja_created_id_keyset')]
+
+
+# ---Zadanie (background job)---
+class Zadanie(models.Model):
+    """Certificate render / export job, processed off-request by `manage.py run_jobs`."""
+    CERTYFIKAT = 'certyfikat'
+    CERTYFIKAT_OFERTY = 'certyfikat_oferty'
+    ZIP_OFERTY = 'zip_oferty'
+    ZIP_PROJEKTU = 'zip_projektu'
+    RODZAJ_TYPE = [
+        (CERTYFIKAT, 'Zaświadczenie wolontariusza'),
+        (CERTYFIKAT_OFERTY, 'Zaświadczenie ukończenia oferty'),
+        (ZIP_OFERTY, 'Zaświadczenia uczestników oferty (ZIP)'),
+        (ZIP_PROJEKTU, 'Zaświadczenia uczestników projektu (ZIP)'),
+    ]
+
+    OCZEKUJE = 'oczekuje'
+    W_TOKU = 'w_toku'
+    GOTOWE = 'gotowe'
+    BLAD = 'blad'
+    STATUS_TYPE = [
+        (OCZEKUJE, 'Oczekuje'),
+        (W_TOKU, 'W toku'),
+        (GOTOWE, 'Gotowe'),
+        (BLAD, 'Błąd'),
+    ]
+
+    rodzaj = models.CharField(max_length=20, choices=RODZAJ_TYPE)
+    status = models.CharField(max_length=10, choices=STATUS_TYPE, default=OCZEKUJE)
+    zlecajacy = models.ForeignKey(Uzytkownik, on_delete=models.CASCADE, related_name='zadania')
+    parametry = models.JSONField(default=dict)
+    # Identifies the result (e.g. the certificate cache name), so repeated requests share one job
+    klucz = models.CharField(max_length=255, blank=True)
+    nazwa_pliku = models.CharField(max_length=255)
+    plik = models.CharField(max_length=255, blank=True, help_text="Nazwa pliku w magazynie CERTIFICATE_STORAGE")
+    blad = models.TextField(blank=True)
+    proby = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest unfinished job; the partial index stays as small as the queue
+            models.Index(fields=['id'], condition=models.Q(status__in=['oczekuje', 'w_toku']), name='zadanie_kolejka'),
+            models.Index(fields=['zlecajacy', 'klucz'], name='zadanie_zlecajacy_klucz'),
+        ]
+
+    def __str__(self):
+        return f"Zadanie {self.pk}: {self.rodzaj} ({self.status})"
+
+
+# ---Zmiana (change log)---
+class Zmiana(models.Model):
+    """
+    One INSERT / UPDATE / DELETE of an Oferta, Projekt, Zlecenie or Recenzja, written by the
+    statement triggers of migration 0009 in the transaction of the change (so also for
+    update(), bulk_create and raw SQL). Read by GET /api/changes/ (wolontariat/changes.py).
+    """
+    OFERTA = 'oferta'
+    PROJEKT = 'projekt'
+    ZLECENIE = 'zlecenie'
+    RECENZJA = 'recenzja'
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=10)
+    obiekt_id = models.BigIntegerField()
+    usuniety = models.BooleanField(default=False)
+    # pg_current_xact_id() of the writing transaction: (txid, id) orders the log by commit safety
+    txid = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='zmiana_pozycja'),
+            models.Index(fields=['model', 'obiekt_id'], name='zmiana_obiekt'),
+        ]
+
+    def __str__(self):
+        return f"Zmiana {self.pk}: {self.model} {self.obiekt_id}{' (usunięty)' if self.usuniety else ''}"
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
 import os
+import zlib
 from functools import lru_cache
-from typing import Tuple
+from io import BytesIO
+from typing import Callable, Tuple
 
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfdoc, pdfmetrics
+from reportlab.pdfbase.ttfonts import FF_NONSYMBOLIC, FF_SYMBOLIC, SUBSETN, TTFont, makeToUnicodeCMap
+from reportlab.pdfgen import canvas
+
+from .metrics import DOCUMENT_RENDER_DURATION
+from .performance import timed
 
 
 REGULAR_CANDIDATES = [
@@ -28,6 +35,102 @@ BOLD_CANDIDATES = [
 ]
 
 
+# Seeded into every document's font subsets (ASCII is always in subset 0), so all
+# certificates with Polish text embed the same subset and hit CachedSubsetTTFont's cache.
+PL_SUBSET_SEED = "ąćęłńóśźżĄĆĘŁŃÓŚŹŻ"
+
+
+class _Preformatted(pdfdoc.PDFObject):
+    """A PDF value serialized once and embedded as-is afterwards."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def format(self, document):
+        return self.data
+
+
+class CachedSubsetTTFont(TTFont):
+    """
+    reportlab cuts, deflates and re-serializes a fresh font subset for every document,
+    which is most of the cost of a one-page PDF. Fonts are registered once per process,
+    so build the PDF objects of each subset once and embed the cached bytes afterwards.
+    """
+    max_cached_subsets = 64
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._subsets = {}
+
+    def _subset_objects(self, doc, base_font_name, subset):
+        key = (base_font_name, tuple(subset))
+        cached = self._subsets.get(key)
+        if cached is None:
+            font_program = self.face.makeSubset(subset)
+            cached = (
+                pdfdoc.PDFArray(list(map(self.face.getCharWidth, subset))).format(doc),
+                zlib.compress(makeToUnicodeCMap(base_font_name, subset).encode('latin-1')),
+                zlib.compress(font_program),
+                len(font_program),
+            )
+            if len(self._subsets) >= self.max_cached_subsets:
+                self._subsets.clear()
+            self._subsets[key] = cached
+        return cached
+
+    def clear_subset_cache(self):
+        self._subsets.clear()
+
+    @staticmethod
+    def _deflated_stream(data):
+        stream = pdfdoc.PDFStream(content=data)
+        # An explicit Filter stops PDFStream.format from compressing the content again
+        stream.dictionary['Filter'] = pdfdoc.PDFArray([pdfdoc.PDFName(pdfdoc.PDFZCompress.pdfname)])
+        return stream
+
+    def addObjects(self, doc):
+        # Same objects as TTFont.addObjects / TTFontFace.addSubsetObjects, built from the cache.
+        if not doc.compression:
+            return super().addObjects(doc)
+
+        face = self.face
+        state = self.state.setdefault(doc, TTFont.State(self._asciiReadable))
+        state.frozen = 1
+        for n, subset in enumerate(state.subsets):
+            internal_name = self.getSubsetInternalName(n, doc)[1:]
+            base_font_name = b''.join((SUBSETN(n), b'+', face.name, face.subfontNameX)).decode('pdfdoc')
+            widths, cmap, font_program, font_program_length = self._subset_objects(doc, base_font_name, subset)
+
+            font_file = self._deflated_stream(font_program)
+            font_file.dictionary['Length1'] = font_program_length
+            descriptor = pdfdoc.PDFDictionary({
+                'Type': '/FontDescriptor',
+                'Ascent': face.ascent,
+                'CapHeight': face.capHeight,
+                'Descent': face.descent,
+                'Flags': (face.flags & ~FF_NONSYMBOLIC) | FF_SYMBOLIC,
+                'FontBBox': pdfdoc.PDFArray(face.bbox),
+                'FontName': pdfdoc.PDFName(base_font_name),
+                'ItalicAngle': face.italicAngle,
+                'StemV': face.stemV,
+                'FontFile2': doc.Reference(font_file, 'fontFile:%s(%s)' % (face.filename, base_font_name)),
+                'MissingWidth': face.defaultWidth,
+            })
+
+            pdf_font = pdfdoc.PDFTrueTypeFont()
+            pdf_font.Name = internal_name
+            pdf_font.BaseFont = base_font_name
+            pdf_font.FirstChar = 0
+            pdf_font.LastChar = len(subset) - 1
+            pdf_font.Widths = _Preformatted(widths)
+            pdf_font.ToUnicode = doc.Reference(self._deflated_stream(cmap), 'toUnicodeCMap:' + base_font_name)
+            pdf_font.FontDescriptor = doc.Reference(descriptor, 'fontDescriptor:' + base_font_name)
+
+            doc.Reference(pdf_font, internal_name)
+            doc.idToObject['BasicFonts'].dict[internal_name] = pdf_font
+        del self.state[doc]
+
+
 def _first_existing(paths):
     for p in paths:
         if p and os.path.exists(p):
@@ -64,10 +167,10 @@ def get_pl_font_names() -> Tuple[str, str]:
     registered = False
     try:
         if regular_path:
-            pdfmetrics.registerFont(TTFont(regular_name, regular_path))
+            pdfmetrics.registerFont(CachedSubsetTTFont(regular_name, regular_path))
             registered = True
         if bold_path:
-            pdfmetrics.registerFont(TTFont(bold_name, bold_path))
+            pdfmetrics.registerFont(CachedSubsetTTFont(bold_name, bold_path))
         else:
             # if bold missing, just reuse regular for bold
             bold_name = regular_name
@@ -79,3 +182,47 @@ def get_pl_font_names() -> Tuple[str, str]:
 
     # Fallback to built-in fonts (limited charset)
     return "Helvetica", "Helvetica-Bold"
+
+
+class PageTemplate:
+    """
+    Page layout split into a static background and per-document text.
+
+    The background is drawn once per document into a form XObject that every page
+    references, so multi-page certificates do not repeat it. Text is drawn on top with
+    the PL fonts, whose subsets are seeded so that repeated renders share one font program.
+    """
+
+    def __init__(self, name: str, draw_background: Callable, pagesize=A4):
+        self.name = name
+        self.draw_background = draw_background
+        self.pagesize = pagesize
+
+    def render(self, draw_text: Callable) -> bytes:
+        """``draw_text(pdf, template)`` draws the document's text; see ``next_page`` for page breaks."""
+        with timed('pdf'), DOCUMENT_RENDER_DURATION.labels(self.name).time():
+            return self._render(draw_text)
+
+    def _render(self, draw_text: Callable) -> bytes:
+        buffer = BytesIO()
+        fonts = get_pl_font_names()
+        # The default initial font (Helvetica) would be embedded with its full encoding table
+        pdf = canvas.Canvas(buffer, pagesize=self.pagesize, initialFontName=fonts[0])
+        for font_name in set(fonts):
+            font = pdfmetrics.getFont(font_name)
+            if isinstance(font, TTFont):
+                font.splitString(PL_SUBSET_SEED, pdf._doc)
+
+        pdf.beginForm(self.name)
+        self.draw_background(pdf, self.pagesize, *fonts)
+        pdf.endForm()
+
+        pdf.doForm(self.name)
+        draw_text(pdf, self)
+        pdf.showPage()
+        pdf.save()
+        return buffer.getvalue()
+
+    def next_page(self, pdf: canvas.Canvas) -> None:
+        pdf.showPage()
+        pdf.doForm(self.name)
@@ -0,0 +1,163 @@
+"""
+Where a request spends its time: SQL queries (count, time, shapes run more than once, the
+usual N+1 sign), serialization, JSON rendering and PDF rendering.
+
+PerformanceMiddleware follows PERFORMANCE_SAMPLE_RATE of the requests. Those get a
+Server-Timing header (browser dev tools show it next to the request) and, when they took
+PERFORMANCE_SLOW_MS or longer, a JSON line on the ``wolontariat.performance`` logger.
+Every database connection carries the execute wrapper, and the serializers, the JSON
+renderer and the PDF templates call ``timed()``; outside a sampled request both only look
+up a context variable, so the instrumentation can stay on in production.
+
+Durations overlap: ``serialize`` includes the queries that lazy relations run while
+serializing, which is where N+1 queries come from.
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# IN (%s, %s, ...) lists of any length are one query shape
+_PARAMETER_LIST = re.compile(r'IN \(%s(?:, %s)*\)')
+# Logged without the column list, which would hide the FROM and WHERE that tell shapes apart
+_COLUMNS = re.compile(r'^SELECT (?:DISTINCT )?.*? FROM ')
+# Repeated query shapes in a slow-request log line, most frequent first
+MAX_REPEATED = 5
+MAX_SQL_LENGTH = 500
+
+_current = ContextVar('wolontariat_request_timings', default=None)
+
+
+class RequestTimings:
+    """What one sampled request spent; shared by the threads and tasks serving it."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.durations = defaultdict(float)
+        self.running = set()
+
+    def repeated(self):
+        """(executions, query shape) of the shapes run more than once, most frequent first."""
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[_PARAMETER_LIST.sub('IN (%s, ...)', str(sql))] += count
+        return [(count, shape) for shape, count in shapes.most_common() if count > 1]
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to ``name``; nested blocks of the same name count once."""
+    timings = _current.get()
+    if timings is None or name in timings.running:
+        yield
+        return
+    timings.running.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[name] += time.perf_counter() - start
+        timings.running.discard(name)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql_time += time.perf_counter() - start
+        timings.queries += 1
+        # Counted by the statement as written: parameters are not part of it
+        timings.statements[sql] += 1
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def server_timing(timings, total):
+    metrics = [
+        f'total;dur={total * 1000:.1f}',
+        f'db;dur={timings.sql_time * 1000:.1f};desc="{timings.queries} queries"',
+    ]
+    extra = sum(count - 1 for count, _ in timings.repeated())
+    if extra:
+        metrics.append(f'repeated;desc="{extra} repeated queries"')
+    metrics += [f'{name};dur={duration * 1000:.1f}' for name, duration in timings.durations.items()]
+    return ', '.join(metrics)
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    def finish(self, request, response, timings, total):
+        response.headers['Server-Timing'] = server_timing(timings, total)
+        if total * 1000 >= settings.PERFORMANCE_SLOW_MS:
+            match = request.resolver_match
+            record = {
+                'method': request.method,
+                # Not the query string: it can carry a token (?token= of the event stream)
+                'path': request.path,
+                'route': match.route if match else None,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 1),
+                'queries': timings.queries,
+                'sql_ms': round(timings.sql_time * 1000, 1),
+                **{f'{name}_ms': round(duration * 1000, 1) for name, duration in timings.durations.items()},
+                'repeated': [
+                    {'count': count, 'sql': _COLUMNS.sub('SELECT ... FROM ', shape)[:MAX_SQL_LENGTH]} for count, shape in timings.repeated()[:MAX_REPEATED]
+                ],
+            }
+            logger.warning('slow request %s', json.dumps(record), extra={'performance': record})
+        return response
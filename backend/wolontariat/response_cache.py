@@ -0,0 +1,137 @@
+"""
+Cache of serialized API responses for the public read endpoints (see api/caching.py).
+
+Entries are keyed by the view, its normalized query parameters and the current generation
+of every tag the response depends on (the organization and project collections, or one
+organization / project). Signals bump the generations of what a write touched, so only
+listings that can show the changed rows are invalidated; old entries are never read
+again and simply expire.
+
+The cache is the ``responses`` alias of CACHES: local memory, files or a Redis-compatible
+server, chosen with CACHE_BACKEND.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+from .metrics import cache_lookup
+from .models import Projekt
+
+
+ORGANIZATIONS = 'organizations'
+PROJECTS = 'projects'
+OFFERS = 'offers'
+
+_STATS = ('hits', 'misses')
+
+
+def organization_tag(organizacja_id) -> str:
+    return f'organization:{organizacja_id}'
+
+
+def project_tag(projekt_id) -> str:
+    return f'project:{projekt_id}'
+
+
+def response_cache():
+    return caches['responses']
+
+
+def generations(tags):
+    """The current generation of each tag; any write a tag covers changes it."""
+    cache = response_cache()
+    keys = [f'tag:{tag}' for tag in tags]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # A tag seen for the first time (or evicted) starts at the clock, above any generation it had
+        start = time.time_ns()
+        for key in missing:
+            cache.add(key, start, timeout=None)
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def cache_key(view, params, tags) -> str:
+    """``params`` is a list of (name, values) pairs; order and empty values do not matter."""
+    normalized = sorted((name, sorted(values)) for name, values in params if any(values))
+    raw = repr((view, normalized, list(zip(tags, generations(tags)))))
+    return 'response:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def lookup(key):
+    data = response_cache().get(key)
+    _count('hits' if data is not None else 'misses')
+    cache_lookup('responses', data is not None)
+    return data
+
+
+def store(key, data) -> None:
+    response_cache().set(key, data)
+
+
+def _count(name):
+    cache = response_cache()
+    try:
+        cache.incr(f'stats:{name}')
+    except ValueError:
+        cache.add(f'stats:{name}', 1, timeout=None)
+
+
+def stats() -> dict:
+    values = response_cache().get_many([f'stats:{name}' for name in _STATS])
+    result = {name: values.get(f'stats:{name}', 0) for name in _STATS}
+    total = result['hits'] + result['misses']
+    result['hit_ratio'] = result['hits'] / total if total else 0.0
+    return result
+
+
+def reset_stats() -> None:
+    response_cache().delete_many([f'stats:{name}' for name in _STATS])
+
+
+# --- Invalidation ---
+
+def _bump(tags):
+    cache = response_cache()
+    for tag in tags:
+        try:
+            cache.incr(f'tag:{tag}')
+        except ValueError:
+            # Never read yet: the next reader starts a fresh generation anyway
+            pass
+
+
+def invalidate(*tags) -> None:
+    """
+    Bump ``tags`` now, so this process stops serving the old data, and again on commit, so a
+    response cached from not-yet-committed data in between is discarded as well.
+    """
+    tags = set(tags)
+    _bump(tags)
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def invalidate_organizations(organizacja_ids) -> None:
+    """Organization data is shown in every listing: organizations, projects and offers."""
+    organizacja_ids = list(organizacja_ids)
+    projekt_ids = Projekt.objects.filter(organizacja_id__in=organizacja_ids).values_list('id', flat=True)
+    invalidate(
+        ORGANIZATIONS, PROJECTS, OFFERS,
+        *map(organization_tag, organizacja_ids), *map(project_tag, projekt_ids),
+    )
+
+
+def invalidate_projects(placements) -> None:
+    """
+    Projects, or offers and their participants, under the given (projekt_id, organizacja_id)
+    pairs changed. Offer listings show project names and project listings offer counts.
+    """
+    tags = [OFFERS, PROJECTS]
+    for projekt_id, organizacja_id in placements:
+        tags += [project_tag(projekt_id), organization_tag(organizacja_id)]
+    invalidate(*tags)
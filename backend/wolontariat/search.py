@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Func, Q, TextField, Value
+
+
+# Polish diacritics folded by the ``pl_unaccent`` SQL function (created in migration 0002).
+# Kept in sync with the Python side so query terms are normalized the same way as the vectors.
+# Upper-case letters are listed too, so folding does not depend on the server's LC_CTYPE.
+PL_DIACRITICS = 'ąćęłńóśźżĄĆĘŁŃÓŚŹŻ'
+PL_ASCII = 'acelnoszzacelnoszz'
+_PL_TRANSLATION = str.maketrans(PL_DIACRITICS, PL_ASCII)
+
+# "simple" does no stemming (Postgres ships no Polish snowball stemmer), but unlike a
+# language config it keeps every word, which is what we want for names and places.
+SEARCH_CONFIG = 'simple'
+
+
+class PlUnaccent(Func):
+    """Lower-cases and strips Polish diacritics; IMMUTABLE, so it can be indexed."""
+    function = 'pl_unaccent'
+    output_field = TextField()
+
+
+def normalize(term: str) -> str:
+    return term.translate(_PL_TRANSLATION).lower().strip()
+
+
+@lru_cache(maxsize=1)
+def trigram_available() -> bool:
+    """
+    pg_trgm is installed by migration 0002 when the server ships it (postgres:16 does).
+    Without it we still have full-text search, just no typo tolerance.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def _search(queryset, term):
+    term = normalize(term)
+    if not term:
+        return queryset
+
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+    rank = SearchRank(F('search_vector'), query)
+    match = Q(search_vector=query)
+
+    if trigram_available():
+        # `search_text %> term` is served by the GIN trigram index on the column (migration 0010),
+        # so Postgres can BitmapOr it with the full-text index in a single scan.
+        match |= Q(search_text__trigram_word_similar=term)
+        rank = rank + TrigramWordSimilarity(Value(term), 'search_text')
+
+    # Every match is ranked; the page's LIMIT lets Postgres keep only the top rows (top-N heapsort)
+    return queryset.filter(match).annotate(search_rank=rank).order_by('-search_rank', '-id')
+
+
+def search_offers(queryset, term):
+    """
+    Filter offers by title, location, topic, requirements and project description; best matches first.
+    The typo-tolerant match covers the offer's own fields only, not the project description.
+    """
+    return _search(queryset, term)
+
+
+def search_projects(queryset, term):
+    """Filter projects by name and description; best matches first."""
+    return _search(queryset, term)
@@ -1,17 +1,14 @@
 from wolontariat.models import Organizacja, Uzytkownik, Projekt, Oferta, Zlecenie, Wiadomosc, Recenzja
+from wolontariat.counters import recount_offers, recount_unread
+from wolontariat.synthetic import reset
 from django.contrib.auth.hashers import make_password
 from django.utils import timezone
 from datetime import timedelta
 
 # --- Wyczyść istniejące dane ---
+# One TRUNCATE; for a large dataset use `python manage.py generate_data --reset` instead of this script
 print("Czyszczenie bazy danych...")
-Recenzja.objects.all().delete()
-Wiadomosc.objects.all().delete()
-Zlecenie.objects.all().delete()
-Oferta.objects.all().delete()
-Projekt.objects.all().delete()
-Uzytkownik.objects.all().delete()
-Organizacja.objects.all().delete()
+reset()
 
 # --- Organizacje ---
 print("Tworzenie organizacji...")
@@ -150,4 +147,8 @@ Wiadomosc.objects.create(
     tresc="Dzięki Janek! Liczymy na Ciebie przy kolejnych akcjach."
 )
 
+# Zlecenia and messages were created directly, not through the code that keeps the counters
+recount_offers()
+recount_unread()
+
 print("Wszystkie dane testowe zostały pomyślnie utworzone!")
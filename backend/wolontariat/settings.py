@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()  # take environment variables from .env.
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
+    "django.contrib.postgres",
     "rest_framework",
     "wolontariat",
     "api",
@@ -41,8 +43,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "wolontariat.metrics.MetricsMiddleware",
+    # Early, so its total covers the other middleware too
+    "wolontariat.performance.PerformanceMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # Before everything that reads or writes the body, so it compresses last
+    "wolontariat.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -51,7 +58,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "wolontariat.urls"
+# Serve the hot GET endpoints with the async views of api/async_views.py. The ASGI application
+# (wolontariat/asgi.py) turns this on; under WSGI every request would need its own event loop.
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "0") == "1"
+
+ROOT_URLCONF = "wolontariat.asgi_urls" if ASYNC_READ_VIEWS else "wolontariat.urls"
 
 TEMPLATES = [
     {
@@ -118,6 +129,89 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = "static/"
+
+# Rendered certificate PDFs, keyed by a digest of their content (see wolontariat/certificates.py).
+# Point the "certificates" alias at any Django storage backend (e.g. S3) to share it between hosts.
+CERTIFICATE_STORAGE = "certificates"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "certificates": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": os.getenv("CERTIFICATE_CACHE_DIR", str(BASE_DIR / "cache")),
+        },
+    },
+}
+# Processes used to render certificates in bulk (ZIP downloads, generate_certificates command).
+CERTIFICATE_WORKERS = int(os.getenv("CERTIFICATE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Hand stored documents to the front web server instead of streaming them from Python:
+# "x-accel-redirect" (nginx; DOCUMENT_SENDFILE_ROOT is an `internal` location aliased to the
+# certificate storage directory) or "x-sendfile" (Apache mod_xsendfile, lighttpd). Empty: off.
+DOCUMENT_SENDFILE = os.getenv("DOCUMENT_SENDFILE", "")
+DOCUMENT_SENDFILE_ROOT = os.getenv("DOCUMENT_SENDFILE_ROOT", "/protected-documents/")
+
+# Background jobs (wolontariat.jobs, `python manage.py run_jobs`)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", 600))  # seconds before a running job counts as abandoned
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_EXPORT_TTL = int(os.getenv("JOB_EXPORT_TTL", 24 * 3600))  # seconds a finished ZIP export is kept
+
+# Caches shared by the API processes: public listing responses (wolontariat/response_cache.py)
+# and authenticated tokens (api/authentication.py). "locmem" keeps them per process, so use
+# "file" (the processes of one host or container) or "redis" (any Redis-compatible server; needs the
+# `redis` package) when
+# several workers serve the API: invalidation must reach all of them.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "wolontariat"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", os.path.join(tempfile.gettempdir(), "wolontariat-cache")),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://localhost:6379/1"),
+    "dummy": ("django.core.cache.backends.dummy.DummyCache", ""),
+}
+CACHE_LOCATION = os.getenv("CACHE_LOCATION", _CACHE_BACKENDS[CACHE_BACKEND][1])
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))
+TOKEN_CACHE_TIMEOUT = int(os.getenv("TOKEN_CACHE_TIMEOUT", 300))
+
+
+def _shared_cache(name, timeout):
+    # A Redis server is shared by all caches and told apart by the key prefix
+    location = CACHE_LOCATION if CACHE_BACKEND == "redis" else f"{CACHE_LOCATION}-{name}"
+    return {
+        "BACKEND": _CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": location,
+        "TIMEOUT": timeout,
+        "KEY_PREFIX": f"wolontariat-{name}",
+    }
+
+
+# Build list responses of offers, projects and reviews from values() rows (api/projections.py)
+# instead of model instances and serializers. Same output; "0" falls back to the serializers.
+FAST_LIST_SERIALIZATION = os.getenv("FAST_LIST_SERIALIZATION", "1") == "1"
+
+# Smaller bodies go out uncompressed (wolontariat/middleware.py): the headers cost more
+COMPRESSION_MIN_LENGTH = int(os.getenv("COMPRESSION_MIN_LENGTH", 512))
+
+# Server-sent events (GET /api/events/, ASGI only): seconds between keep-alive comments, which
+# also let proxies with idle timeouts keep the stream open
+EVENTS_HEARTBEAT = int(os.getenv("EVENTS_HEARTBEAT", 15))
+
+# Request instrumentation (wolontariat/performance.py): the share of requests that get a
+# Server-Timing header, and the duration from which a sampled request is logged
+PERFORMANCE_SAMPLE_RATE = float(os.getenv("PERFORMANCE_SAMPLE_RATE", 1.0 if DEBUG else 0.1))
+PERFORMANCE_SLOW_MS = float(os.getenv("PERFORMANCE_SLOW_MS", 500))
+
+# Prometheus metrics (GET /metrics, wolontariat/metrics.py). Set PROMETHEUS_MULTIPROC_DIR in the
+# environment to aggregate worker processes. When METRICS_TOKEN is set, scrapers must send it
+# as a bearer token.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "responses": _shared_cache("responses", RESPONSE_CACHE_TIMEOUT),
+    "tokens": _shared_cache("tokens", TOKEN_CACHE_TIMEOUT),
+}
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -164,14 +258,24 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
+        # Token first: API clients never touch the session table
+        "api.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",  # Add this
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.OptInCursorPagination",
     "PAGE_SIZE": 20,
 }
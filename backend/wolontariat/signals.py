@@ -0,0 +1,148 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import counters, events, response_cache
+from .certificates import invalidate_certificates
+from .jobs import delete_export
+from .models import Oferta, Organizacja, Projekt, Recenzja, Uzytkownik, Wiadomosc, Zadanie, Zlecenie
+
+
+@receiver(post_save, sender=Zlecenie)
+@receiver(post_delete, sender=Zlecenie)
+def zlecenie_changed(sender, instance, **kwargs):
+    invalidate_certificates(instance.wolontariusz_id)
+
+
+@receiver(post_save, sender=Uzytkownik)
+def uzytkownik_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Certificates show the username and e-mail; ignore e.g. last_login bumps.
+    if created or (update_fields is not None and not {'username', 'email'} & set(update_fields)):
+        return
+    invalidate_certificates(instance.pk)
+
+
+@receiver(post_save, sender=Oferta)
+def oferta_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    for wolontariusz_id in instance.zlecenia.filter(czy_ukonczone=True).values_list('wolontariusz_id', flat=True):
+        invalidate_certificates(wolontariusz_id)
+
+
+@receiver(post_save, sender=Projekt)
+def projekt_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    completed = Zlecenie.objects.filter(oferta__projekt=instance, czy_ukonczone=True)
+    for wolontariusz_id in completed.values_list('wolontariusz_id', flat=True).distinct():
+        invalidate_certificates(wolontariusz_id)
+
+
+# --- Response cache (public listings of organizations, projects and offers) ---
+
+@receiver(post_save, sender=Organizacja)
+@receiver(post_delete, sender=Organizacja)
+def organizacja_listed(sender, instance, **kwargs):
+    response_cache.invalidate_organizations([instance.pk])
+
+
+@receiver(pre_save, sender=Projekt)
+@receiver(pre_save, sender=Oferta)
+def remember_placement(sender, instance, **kwargs):
+    # A project or offer can be moved; listings of its previous place must be invalidated too
+    if instance.pk is not None:
+        fields = ('id', 'organizacja_id') if sender is Projekt else ('projekt_id', 'organizacja_id')
+        instance._previous_placement = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(post_save, sender=Projekt)
+@receiver(post_delete, sender=Projekt)
+def projekt_listed(sender, instance, **kwargs):
+    placements = {(instance.pk, instance.organizacja_id), getattr(instance, '_previous_placement', None)}
+    response_cache.invalidate_projects(filter(None, placements))
+
+
+@receiver(post_save, sender=Oferta)
+@receiver(post_delete, sender=Oferta)
+def oferta_listed(sender, instance, **kwargs):
+    placements = {(instance.projekt_id, instance.organizacja_id), getattr(instance, '_previous_placement', None)}
+    response_cache.invalidate_projects(filter(None, placements))
+
+
+@receiver(post_save, sender=Zlecenie)
+@receiver(post_delete, sender=Zlecenie)
+def zlecenie_listed(sender, instance, **kwargs):
+    placement = Oferta.objects.filter(pk=instance.oferta_id).values_list('projekt_id', 'organizacja_id').first()
+    response_cache.invalidate_projects([placement] if placement else [])
+
+
+@receiver(post_save, sender=Uzytkownik)
+def uzytkownik_listed(sender, instance, created, update_fields=None, **kwargs):
+    # Offer listings show their volunteers' profiles
+    if created or (update_fields is not None and set(update_fields) <= {'last_login', 'password'}):
+        return
+    placements = (
+        Oferta.objects.filter(Q(wolontariusz=instance) | Q(zlecenia__wolontariusz=instance))
+        .values_list('projekt_id', 'organizacja_id').distinct()
+    )
+    if placements:
+        response_cache.invalidate_projects(placements)
+
+
+# --- Denormalized counters (wolontariat/counters.py) ---
+
+@receiver(post_save, sender=Oferta)
+def oferta_counted(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_project(instance.projekt_id, 1)
+        return
+    previous = getattr(instance, '_previous_placement', None)
+    if previous and previous[0] != instance.projekt_id:
+        counters.adjust_project(previous[0], -1)
+        counters.adjust_project(instance.projekt_id, 1)
+
+
+@receiver(post_delete, sender=Oferta)
+def oferta_uncounted(sender, instance, **kwargs):
+    counters.adjust_project(instance.projekt_id, -1)
+
+
+@receiver(pre_delete, sender=Uzytkownik)
+def remember_counted_rows(sender, instance, **kwargs):
+    # The account's applications and sent messages go with it, past the code that keeps the counters
+    instance._applied_offers = list(instance.zlecenia.values_list('oferta_id', flat=True))
+    instance._unread_recipients = list(
+        instance.wyslane_wiadomosci.filter(przeczytana=False).values_list('odbiorca_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Uzytkownik)
+def counted_rows_removed(sender, instance, **kwargs):
+    if getattr(instance, '_applied_offers', None):
+        counters.recount_offers(instance._applied_offers)
+    if getattr(instance, '_unread_recipients', None):
+        counters.recount_unread(instance._unread_recipients)
+
+
+@receiver(post_save, sender=Recenzja)
+def recenzja_published(sender, instance, created, **kwargs):
+    if created:
+        events.publish([instance.wolontariusz_id], events.REVIEW_CREATED, {
+            'recenzja': instance.pk, 'oferta': instance.oferta_id, 'organizacja': instance.organizacja_id,
+        })
+
+
+@receiver(post_save, sender=Wiadomosc)
+def wiadomosc_published(sender, instance, created, **kwargs):
+    if created:
+        events.publish([instance.odbiorca_id], events.MESSAGE_RECEIVED, {
+            'wiadomosc': instance.pk, 'nadawca': instance.nadawca_id,
+        })
+
+
+@receiver(post_delete, sender=Zadanie)
+def zadanie_deleted(sender, instance, **kwargs):
+    # Jobs go with their user; their exports must not stay behind in storage
+    transaction.on_commit(lambda: delete_export(instance))
@@ -0,0 +1,314 @@
+"""
+Synthetic datasets at production scale, for `manage.py generate_data` and the benchmarks.
+
+Rows are built as plain tuples and written with COPY in chunks, not as model instances
+through save(): a million rows take seconds instead of hours. The same seed and base date
+give the same data. Counters (participants per offer, offers per project, unread messages)
+are filled in as the rows are generated. ``reset`` empties the tables with one TRUNCATE
+instead of deleting row by row through the ORM's cascade.
+
+Distributions are skewed as real ones are: a few organizations run most of the projects, a
+few volunteers send most of the applications, most offers are small and a few are crowded.
+"""
+import io
+import itertools
+import math
+import random
+from datetime import date, datetime, time, timedelta, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from .counters import recount_unread
+from .models import Oferta, Organizacja, Projekt, Recenzja, Uzytkownik, Wiadomosc, Zadanie, Zlecenie, Zmiana
+from .response_cache import response_cache
+
+# Everyone generated logs in with this password
+PASSWORD = 'haslo123'
+
+FIRST_NAMES_F = [
+    'Anna', 'Maria', 'Katarzyna', 'Małgorzata', 'Agnieszka', 'Barbara', 'Ewa', 'Magdalena', 'Joanna', 'Zofia',
+    'Julia', 'Zuzanna', 'Maja', 'Lena', 'Hanna', 'Alicja', 'Oliwia', 'Natalia', 'Wiktoria', 'Aleksandra',
+]
+FIRST_NAMES_M = [
+    'Jan', 'Piotr', 'Krzysztof', 'Andrzej', 'Tomasz', 'Paweł', 'Michał', 'Marcin', 'Jakub', 'Adam',
+    'Kacper', 'Szymon', 'Antoni', 'Filip', 'Mateusz', 'Wojciech', 'Bartosz', 'Łukasz', 'Marek', 'Stanisław',
+]
+LAST_NAMES = [
+    'Nowak', 'Kowalski', 'Wiśniewski', 'Wójcik', 'Kowalczyk', 'Kamiński', 'Lewandowski', 'Zieliński',
+    'Szymański', 'Woźniak', 'Dąbrowski', 'Kozłowski', 'Jankowski', 'Mazur', 'Kwiatkowski', 'Krawczyk',
+    'Piotrowski', 'Grabowski', 'Nowakowski', 'Pawłowski', 'Michalski', 'Adamczyk', 'Dudek', 'Zając',
+]
+# City, relative number of offers (roughly the population)
+CITIES = [
+    ('Warszawa', 18), ('Kraków', 8), ('Łódź', 7), ('Wrocław', 6), ('Poznań', 5), ('Gdańsk', 5), ('Szczecin', 4),
+    ('Bydgoszcz', 3), ('Lublin', 3), ('Białystok', 3), ('Katowice', 3), ('Gdynia', 2), ('Częstochowa', 2),
+    ('Radom', 2), ('Toruń', 2), ('Rzeszów', 2), ('Kielce', 2), ('Olsztyn', 2), ('Opole', 1), ('Zielona Góra', 1),
+]
+# Topic, offer titles
+TOPICS = {
+    'Opieka nad zwierzętami': ['Spacery z psami', 'Socjalizacja kotów', 'Sprzątanie boksów', 'Dyżur w schronisku'],
+    'Ekologia': ['Sprzątanie lasu', 'Sadzenie drzew', 'Warsztaty recyklingu', 'Liczenie ptaków'],
+    'Edukacja': ['Korepetycje z matematyki', 'Czytanie dzieciom', 'Pomoc w odrabianiu lekcji', 'Warsztaty programowania'],
+    'Pomoc seniorom': ['Zakupy dla seniorów', 'Odwiedziny w domu opieki', 'Nauka obsługi smartfona', 'Spacery z seniorami'],
+    'Sport': ['Obsługa biegu charytatywnego', 'Trening dla dzieci', 'Sędziowanie turnieju', 'Punkt z wodą na maratonie'],
+    'Kultura': ['Obsługa festiwalu', 'Oprowadzanie po muzeum', 'Pomoc przy spektaklu', 'Digitalizacja archiwum'],
+    'Logistyka': ['Sortowanie darów', 'Rozwożenie paczek', 'Pakowanie żywności', 'Inwentaryzacja magazynu'],
+    'Zdrowie': ['Akcja krwiodawstwa', 'Wsparcie w hospicjum', 'Punkt informacyjny w szpitalu', 'Kampania profilaktyczna'],
+    'Prace manualne': ['Renowacja bud', 'Malowanie świetlicy', 'Budowa karmników', 'Porządki w ogrodzie'],
+}
+ORGANIZATION_KINDS = ['Fundacja', 'Stowarzyszenie', 'Towarzystwo', 'Bank Żywności', 'Centrum Wolontariatu']
+ORGANIZATION_NAMES = [
+    'Serce dla Zwierząt', 'Zielona Ziemia', 'Pomocna Dłoń', 'Uśmiech Dziecka', 'Razem Raźniej', 'Dobry Sąsiad',
+    'Otwarte Drzwi', 'Nowa Nadzieja', 'Kultura Bez Barier', 'Sport dla Wszystkich', 'Srebrny Wiek', 'Czysta Rzeka',
+]
+PROJECT_NAMES = ['Zbiórka {season} {year}', 'Wsparcie {city} – {season}', '{topic} {year}', 'Akcja {season} w mieście {city}']
+SEASONS = ['Zimowa', 'Wiosenna', 'Letnia', 'Jesienna']
+DURATIONS = ['2h', '3h', '4h', '6h', '1 dzień', '2 dni', 'weekend', '1 tydzień', '2 tygodnie', '1 miesiąc']
+REQUIREMENTS = [
+    'Brak wymagań.', 'Punktualność i zaangażowanie.', 'Ukończone 16 lat.', 'Wygodne ubranie robocze.',
+    'Umiejętność pracy w zespole.', 'Zaświadczenie o niekaralności.', 'Brak alergii na sierść.', 'Prawo jazdy kat. B.',
+]
+REVIEW_COMMENTS = [
+    'Wzorowe zaangażowanie, polecamy!', 'Bardzo sumienna praca.', 'Punktualnie i rzetelnie.', 'Dziękujemy za pomoc!',
+    'Dobra współpraca, choć zdarzały się spóźnienia.', 'Świetny kontakt z podopiecznymi.', '', '',
+]
+MESSAGES = [
+    'Dzień dobry, czy są jeszcze wolne miejsca?', 'Dziękuję za zgłoszenie, potwierdzamy udział.',
+    'O której godzinie zaczynamy?', 'Zbiórka o 9:00 przy głównym wejściu.', 'Czy trzeba coś ze sobą zabrać?',
+    'Wystarczy wygodne ubranie, resztę zapewniamy.', 'Niestety nie dam rady przyjść, przepraszam.',
+    'Dziękujemy za dzisiejszą pomoc!', 'Czy mogę dostać zaświadczenie o wolontariacie?', 'Jasne, wyślemy je w tym tygodniu.',
+]
+# Review scores 1..5, relative frequency
+SCORES = [3, 5, 12, 35, 45]
+
+
+def _skewed(rng, mean, cap=None):
+    """A positive count averaging about ``mean``, log-normally spread: mostly small, some large."""
+    sigma = 1.0
+    value = max(1, round(rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)))
+    return min(value, cap) if cap else value
+
+
+def _active(rng, n):
+    """An index below ``n`` favouring the low ones: a few very active users, a long tail of rare ones."""
+    return int(n * rng.random() ** 2)
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class _Copier:
+    """Buffers rows per model and writes them with COPY; all buffers are flushed together, in model order."""
+
+    def __init__(self, cursor, columns, chunk_size):
+        self.cursor = cursor
+        # model -> field names, in the order the models must be written
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.buffers = {model: [] for model in columns}
+        self.counts = {model: 0 for model in columns}
+
+    def add(self, model, row):
+        buffer = self.buffers[model]
+        buffer.append('\t'.join(map(_copy_value, row)))
+        if len(buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        # Projects go before their offers: the offer search trigger reads the project description
+        for model, buffer in self.buffers.items():
+            if not buffer:
+                continue
+            columns = ', '.join(model._meta.get_field(name).column for name in self.columns[model])
+            data = io.StringIO('\n'.join(buffer) + '\n')
+            self.cursor.copy_expert(f'COPY {model._meta.db_table} ({columns}) FROM STDIN', data)
+            self.counts[model] += len(buffer)
+            buffer.clear()
+
+
+def _reserve_ids(cursor, model, n):
+    """First of ``n`` consecutive ids taken from the model's sequence, so rows can be written with their ids."""
+    table = model._meta.db_table
+    cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, 'id'))", [table])
+    first = cursor.fetchone()[0]
+    if n > 1:
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", [table, first + n - 1])
+    return first
+
+
+# Cleared in reverse dependency order by one TRUNCATE; CASCADE takes tokens, admin log and M2M rows along
+RESET_MODELS = [Zmiana, Zadanie, Wiadomosc, Recenzja, Zlecenie, Oferta, Projekt, Uzytkownik, Organizacja]
+
+
+def reset() -> None:
+    """Empty every application table (and the caches built from them) and restart their ids."""
+    tables = ', '.join(model._meta.db_table for model in RESET_MODELS)
+    with connection.cursor() as cursor:
+        # Deferred foreign key checks of earlier writes in this transaction would block the TRUNCATE
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'TRUNCATE {tables} RESTART IDENTITY CASCADE')
+    transaction.on_commit(_clear_caches)
+
+
+def _clear_caches():
+    # Cached tokens would authenticate users that are gone, or someone else reusing their id
+    response_cache().clear()
+    caches['tokens'].clear()
+
+
+COLUMNS = {
+    Organizacja: ('id', 'nazwa_organizacji', 'nr_telefonu', 'nip', 'weryfikacja', 'updated_at'),
+    Uzytkownik: (
+        'id', 'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+        'date_joined', 'nr_telefonu', 'wiek', 'organizacja', 'rola', 'nieprzeczytane_wiadomosci',
+    ),
+    Projekt: ('id', 'organizacja', 'nazwa_projektu', 'opis_projektu', 'updated_at', 'liczba_ofert'),
+    Oferta: (
+        'id', 'organizacja', 'projekt', 'tytul_oferty', 'lokalizacja', 'data', 'data_wyslania', 'czy_ukonczone',
+        'tematyka', 'czas_trwania', 'wymagania', 'updated_at', 'max_uczestnikow',
+        'liczba_uczestnikow', 'liczba_potwierdzonych', 'liczba_ukonczonych',
+    ),
+    Zlecenie: ('oferta', 'wolontariusz', 'czy_ukonczone', 'czy_potwierdzone', 'updated_at'),
+    Recenzja: ('organizacja', 'wolontariusz', 'oferta', 'ocena', 'komentarz', 'created_at'),
+    Wiadomosc: ('nadawca', 'odbiorca', 'tresc', 'data_wyslania', 'przeczytana'),
+}
+
+
+def generate(organizations=500, volunteers=50000, projects_per_organization=5, offers_per_project=10,
+             applications_per_offer=8, messages_per_volunteer=15, seed=0, base_date=None, chunk_size=50000) -> dict:
+    """
+    Write a dataset of the given size (the per-parent numbers are averages) in the current
+    database, next to what is there. Returns the number of rows written per model name.
+    """
+    rng = random.Random(seed)
+    today = base_date or date.today()
+    now = datetime.combine(today, time(12), tzinfo=timezone.utc)
+    password = make_password(PASSWORD, salt=f'synthetic{seed}')
+    city_names = [city for city, _ in CITIES]
+    city_weights = list(itertools.accumulate(weight for _, weight in CITIES))
+    score_weights = list(itertools.accumulate(SCORES))
+    topics = list(TOPICS)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        copier = _Copier(cursor, COLUMNS, chunk_size)
+        # Organization staff: one or two accounts per organization, and a coordinator per 200 volunteers
+        staff = [(o, 'organizacja') for o in range(organizations) for _ in range(1 + (rng.random() < 0.3))]
+        staff += [(None, 'koordynator') for _ in range(max(1, volunteers // 200))]
+        first_org = _reserve_ids(cursor, Organizacja, organizations)
+        first_user = _reserve_ids(cursor, Uzytkownik, volunteers + len(staff))
+        volunteer_ids = range(first_user, first_user + volunteers)
+        staff_ids = {}
+
+        for o in range(organizations):
+            city = rng.choices(city_names, cum_weights=city_weights)[0]
+            name = f'{rng.choice(ORGANIZATION_KINDS)} {rng.choice(ORGANIZATION_NAMES)} – {city}'
+            copier.add(Organizacja, (first_org + o, name, f'{rng.randrange(500000000, 800000000)}', f'9{first_org + o:09d}', True, now))
+
+        for i in range(volunteers + len(staff)):
+            user_id = first_user + i
+            female = rng.random() < 0.55
+            first_name = rng.choice(FIRST_NAMES_F if female else FIRST_NAMES_M)
+            last_name = rng.choice(LAST_NAMES)
+            if female and last_name.endswith(('ski', 'cki')):
+                last_name = last_name[:-1] + 'a'
+            if i < volunteers:
+                organizacja, rola = None, 'wolontariusz'
+                wiek = None if rng.random() < 0.1 else int(15 + rng.betavariate(1.5, 4) * 60)
+            else:
+                o, rola = staff[i - volunteers]
+                organizacja, wiek = (None if o is None else first_org + o), None
+                if o is not None:
+                    staff_ids.setdefault(first_org + o, []).append(user_id)
+            copier.add(Uzytkownik, (
+                user_id, password, False, f'{first_name} {last_name} {user_id}', first_name, last_name,
+                f'{rola}{user_id}@example.com', False, True, now - timedelta(days=rng.randrange(3 * 365)),
+                f'{rng.randrange(500000000, 800000000)}', wiek, organizacja, rola, 0,
+            ))
+
+        for o in range(organizations):
+            organizacja = first_org + o
+            n_projects = _skewed(rng, projects_per_organization, cap=projects_per_organization * 20)
+            first_project = _reserve_ids(cursor, Projekt, n_projects)
+            for p in range(n_projects):
+                projekt = first_project + p
+                topic = rng.choice(topics)
+                city = rng.choices(city_names, cum_weights=city_weights)[0]
+                n_offers = _skewed(rng, offers_per_project, cap=offers_per_project * 20)
+                name = rng.choice(PROJECT_NAMES).format(
+                    season=rng.choice(SEASONS), year=today.year - rng.randrange(3), city=city, topic=topic,
+                )
+                description = f'{topic}: {name}. ' + ' '.join(rng.sample(REQUIREMENTS, 3))
+                copier.add(Projekt, (projekt, organizacja, name[:100], description, now, n_offers))
+
+                first_offer = _reserve_ids(cursor, Oferta, n_offers)
+                for f in range(n_offers):
+                    oferta = first_offer + f
+                    if rng.random() < 0.1:
+                        day, past = None, rng.random() < 0.5
+                    else:
+                        past = rng.random() < 0.55
+                        day = today - timedelta(days=rng.randrange(1, 366)) if past else today + timedelta(days=rng.randrange(1, 121))
+                    completed = past and rng.random() < 0.9
+                    limit = rng.choice([5, 10, 15, 20, 30, 50]) if rng.random() < 0.35 else None
+                    posted = (datetime.combine(day, time(12), tzinfo=timezone.utc) if day else now) - timedelta(days=rng.randrange(7, 60))
+
+                    n_applications = _skewed(rng, applications_per_offer, cap=min(limit or volunteers, volunteers)) if volunteers else 0
+                    applicants = {volunteer_ids[_active(rng, volunteers)] for _ in range(n_applications)}
+                    confirmed = completed_ids = 0
+                    done = []
+                    for wolontariusz in sorted(applicants):
+                        potwierdzone = rng.random() < (0.9 if completed else 0.5)
+                        ukonczone = completed and potwierdzone and rng.random() < 0.85
+                        confirmed += potwierdzone
+                        completed_ids += ukonczone
+                        if ukonczone:
+                            done.append(wolontariusz)
+                        copier.add(Zlecenie, (oferta, wolontariusz, ukonczone, potwierdzone, posted + timedelta(days=rng.randrange(7))))
+
+                    copier.add(Oferta, (
+                        oferta, organizacja, projekt, rng.choice(TOPICS[topic]), city, day, posted, completed, topic,
+                        rng.choice(DURATIONS), rng.choice(REQUIREMENTS), posted, limit,
+                        len(applicants), confirmed, completed_ids,
+                    ))
+                    # At most one review per offer and organization (Recenzja.unique_together)
+                    if done and rng.random() < 0.6:
+                        reviewed = (datetime.combine(day, time(18), tzinfo=timezone.utc) if day else now) + timedelta(days=rng.randrange(14))
+                        copier.add(Recenzja, (
+                            organizacja, rng.choice(done), oferta, rng.choices(range(1, 6), cum_weights=score_weights)[0],
+                            rng.choice(REVIEW_COMMENTS), min(reviewed, now),
+                        ))
+
+        # Conversations between a volunteer and an organization's staff, about four messages each
+        organization_staff = list(staff_ids.values())
+        for _ in range(volunteers * messages_per_volunteer // 4 if organization_staff else 0):
+            volunteer = volunteer_ids[_active(rng, volunteers)]
+            member = rng.choice(rng.choice(organization_staff))
+            sent = now - timedelta(days=rng.randrange(180), minutes=rng.randrange(1440))
+            length = _skewed(rng, 4, cap=50)
+            unread_tail = rng.randrange(1, 3) if rng.random() < 0.3 else 0
+            for m in range(length):
+                nadawca, odbiorca = (volunteer, member) if m % 2 == 0 else (member, volunteer)
+                sent += timedelta(minutes=rng.randrange(5, 2 * 1440))
+                copier.add(Wiadomosc, (nadawca, odbiorca, rng.choice(MESSAGES), min(sent, now), m < length - unread_tail))
+
+        copier.flush()
+        recount_unread()
+
+    with connection.cursor() as cursor:
+        for model in COLUMNS:
+            # Fresh statistics, or the planner sizes queries for the empty tables
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+    return {model.__name__: count for model, count in copier.counts.items()}
@@ -1,4 +1,5 @@
 import api from './axios';
+import { fetchDocument } from './jobs';
 
 type LoginResponse = {
   user: Uzytkownik;
@@ -41,7 +42,7 @@ export async function logoutApi(): Promise<void> {
 }
 
 export async function downloadCertificate(): Promise<void> {
-  const res = await api.get('auth/certificate/', { responseType: 'blob' });
+  const res = await fetchDocument('auth/certificate/');
   const blob = new Blob([res.data], { type: 'application/pdf' });
   // Try to infer filename from Content-Disposition
   const disposition = res.headers['content-disposition'] as string | undefined;
@@ -0,0 +1,25 @@
+import api from "./axios";
+
+export type Change = {
+  model: "oferta" | "projekt" | "zlecenie" | "recenzja";
+  id: number;
+  deleted: boolean;
+  data: any | null; // the row as its list endpoint renders it; null for deleted rows
+};
+
+// Without `since`: the current end of the change log. Take it before loading the full lists.
+export async function getChangeToken(): Promise<string> {
+  const res = await api.get("changes/");
+  return res.data.next;
+}
+
+// Every change after `since`, following pages; keep the returned token for the next sync
+export async function getChanges(since: string): Promise<{ changes: Change[]; next: string }> {
+  const changes: Change[] = [];
+  for (;;) {
+    const res = await api.get("changes/", { params: { since } });
+    changes.push(...res.data.changes);
+    since = res.data.next;
+    if (!res.data.more) return { changes, next: since };
+  }
+}
@@ -0,0 +1,25 @@
+// Server-sent events for the logged-in user (GET /api/events/, served by the ASGI app).
+// Events only say what changed: refetch the affected offer, review or message on receipt.
+const EVENTS_URL = import.meta.env.VITE_EVENTS_URL || 'http://localhost:8081/api/events/';
+
+export type ServerEvent =
+  | 'application_created'
+  | 'application_withdrawn'
+  | 'application_confirmed'
+  | 'application_completed'
+  | 'review_created'
+  | 'message_received';
+
+// Returns a function that closes the stream. EventSource reconnects by itself.
+export function subscribeToEvents(
+  handlers: Partial<Record<ServerEvent, (data: any) => void>>,
+): () => void {
+  const token = localStorage.getItem('token');
+  if (!token) return () => {};
+  // EventSource cannot send an Authorization header
+  const source = new EventSource(`${EVENTS_URL}?token=${encodeURIComponent(token)}`);
+  for (const [event, handler] of Object.entries(handlers)) {
+    source.addEventListener(event, (e) => handler(JSON.parse((e as MessageEvent).data)));
+  }
+  return () => source.close();
+}
@@ -0,0 +1,37 @@
+import type { AxiosResponse } from "axios";
+import api from "./axios";
+
+type Zadanie = {
+  id: number;
+  status: "oczekuje" | "w_toku" | "gotowe" | "blad";
+  blad: string;
+  status_url: string;
+  download_url: string | null;
+};
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function retryAfterMs(res: AxiosResponse): number {
+  const seconds = Number(res.headers["retry-after"]);
+  return (Number.isFinite(seconds) && seconds > 0 ? seconds : 1) * 1000;
+}
+
+// Certificate endpoints answer 202 with a job while the PDF is rendered in the background.
+// Poll the job until it is finished, then fetch the file; cached documents come back directly.
+export async function fetchDocument(path: string): Promise<AxiosResponse<Blob>> {
+  const res = await api.get<Blob>(path, { responseType: "blob" });
+  if (res.status !== 202) return res;
+
+  let job = JSON.parse(await res.data.text()) as Zadanie;
+  let wait = retryAfterMs(res);
+  while (job.status === "oczekuje" || job.status === "w_toku") {
+    await sleep(wait);
+    const poll = await api.get<Zadanie>(job.status_url);
+    job = poll.data;
+    wait = retryAfterMs(poll);
+  }
+  if (job.status !== "gotowe" || !job.download_url) {
+    throw new Error(job.blad || "Nie udało się wygenerować dokumentu");
+  }
+  return api.get<Blob>(job.download_url, { responseType: "blob" });
+}
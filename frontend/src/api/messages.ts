@@ -1,11 +1,45 @@
-import { mockWiadomosci } from '@/mock-data/data';
+import api from "./axios";
 
-export async function getMessages(): Promise<Wiadomosc[]> {
-  // TODO: replace with real API call, e.g. api.get('/messages/')
-  return Promise.resolve(mockWiadomosci);
+// Message lists are cursor-paginated: pass back `next` to load older messages
+export type MessagePage = { results: Wiadomosc[]; next: string | null };
+
+async function getPage(url: string, params?: Record<string, any>): Promise<MessagePage> {
+  const res = await api.get(url, { params });
+  return { results: res.data?.results || [], next: res.data?.next ?? null };
+}
+
+export async function getMessages(opts?: {
+  unreadOnly?: boolean;
+  next?: string | null;
+}): Promise<MessagePage> {
+  if (opts?.next) return getPage(opts.next);
+  return getPage("messages/", opts?.unreadOnly ? { nieprzeczytane: true } : undefined);
+}
+
+export async function getConversation(userId: number, next?: string | null): Promise<MessagePage> {
+  if (next) return getPage(next);
+  return getPage("messages/conversation/", { uzytkownik: userId });
 }
 
 export async function getMessageById(id: number): Promise<Wiadomosc | undefined> {
-  // TODO: replace with real API call, e.g. api.get(`/messages/${id}/`)
-  return Promise.resolve(mockWiadomosci.find(m => m.id === id));
+  const res = await api.get(`messages/${id}/`);
+  return res.data;
+}
+
+export async function sendMessage(recipientId: number, tresc: string): Promise<Wiadomosc> {
+  const res = await api.post("messages/", { odbiorca_id: recipientId, tresc });
+  return res.data;
+}
+
+export async function getUnreadCount(): Promise<number> {
+  const res = await api.get("messages/unread_count/");
+  return res.data?.nieprzeczytane ?? 0;
+}
+
+// Pass ids, a sender or { all: true }; returns the remaining unread count
+export async function markMessagesRead(
+  which: { ids: number[] } | { nadawca: number } | { all: true },
+): Promise<number> {
+  const res = await api.post("messages/mark_read/", which);
+  return res.data?.nieprzeczytane ?? 0;
 }
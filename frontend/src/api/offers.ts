@@ -1,4 +1,5 @@
 import api from "./axios";
+import { fetchDocument } from "./jobs";
 import { mapOfertaFromApi } from "./mappers";
 
 export async function getOffers(opts?: {
@@ -12,8 +13,12 @@ export async function getOffers(opts?: {
   return items.map(mapOfertaFromApi);
 }
 
-export async function getAllOffers(): Promise<Oferta[]> {
-  const res = await api.get("offers/");
+// Listings carry slim participant data; pass withParticipants for their contact details
+export async function getAllOffers(opts?: {
+  withParticipants?: boolean;
+}): Promise<Oferta[]> {
+  const params = opts?.withParticipants ? { expand: "wolontariusze" } : {};
+  const res = await api.get("offers/", { params });
   const items = Array.isArray(res.data) ? res.data : res.data?.results || [];
   return items.map(mapOfertaFromApi);
 }
@@ -49,6 +54,33 @@ export async function approveVolunteerCompletion(
   return mapOfertaFromApi(res.data);
 }
 
+export type BulkApplicationResult = {
+  oferta: number;
+  updated: number;
+  results: { wolontariusz_id: number; status: "updated" | "unchanged" | "not_found" }[];
+};
+
+// One request for many volunteers; "all" means every pending application
+function bulkBody(volunteerIds: number[] | "all") {
+  return volunteerIds === "all" ? { all: true } : { wolontariusz_ids: volunteerIds };
+}
+
+export async function confirmVolunteerApplications(
+  offerId: number,
+  volunteerIds: number[] | "all",
+): Promise<BulkApplicationResult> {
+  const res = await api.post(`offers/${offerId}/confirm_volunteers/`, bulkBody(volunteerIds));
+  return res.data;
+}
+
+export async function approveVolunteerCompletions(
+  offerId: number,
+  volunteerIds: number[] | "all",
+): Promise<BulkApplicationResult> {
+  const res = await api.post(`offers/${offerId}/approve_volunteers/`, bulkBody(volunteerIds));
+  return res.data;
+}
+
 export async function applyToOffer(
   offerId: number,
   user: Uzytkownik,
@@ -150,9 +182,7 @@ export async function getMyOffers(): Promise<Oferta[]> {
 }
 
 export async function downloadOfferCertificate(offerId: number): Promise<void> {
-  const res = await api.get(`offers/${offerId}/certificate/`, {
-    responseType: "blob",
-  });
+  const res = await fetchDocument(`offers/${offerId}/certificate/`);
   const blob = new Blob([res.data], { type: "application/pdf" });
   const disposition = res.headers["content-disposition"] as string | undefined;
   let filename = `zaswiadczenie_oferta_${offerId}.pdf`;
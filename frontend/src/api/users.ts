@@ -1,5 +1,6 @@
 // Temporary mock-backed API with TODOs for real endpoints
 import api from "./axios";
+import { fetchDocument } from "./jobs";
 import { mockUzytkownicy } from "@/mock-data/data";
 
 export async function getUsers(): Promise<Uzytkownik[]> {
@@ -44,9 +45,7 @@ export async function downloadVolunteerCertificate(
   volunteerId: number,
   volunteerName: string,
 ): Promise<void> {
-  const res = await api.get(`volunteers/${volunteerId}/certificate/`, {
-    responseType: "blob",
-  });
+  const res = await fetchDocument(`volunteers/${volunteerId}/certificate/`);
   const blob = new Blob([res.data], { type: "application/pdf" });
 
   const url = window.URL.createObjectURL(blob);
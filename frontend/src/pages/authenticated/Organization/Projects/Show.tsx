@@ -20,7 +20,7 @@ export default function OrganizationProjectsShowPage() {
     getProjects().then((all) =>
       setProject(all.find((p) => p.id === id) || null),
     );
-    getAllOffers().then(setOffers);
+    getAllOffers({ withParticipants: true }).then(setOffers);
   }, [id]);
 
   if (!project) return <div>Nie znaleziono projektu</div>;
@@ -62,6 +62,7 @@ type Oferta = {
   czas_trwania?: string; // e.g., "2-4h tygodniowo"
   wymagania?: string; // free text from backend
   tematyka?: string; // topic/category (backend field)
+  max_uczestnikow?: number | null; // empty: no limit
   liczba_uczestnikow?: number;
 };
 
@@ -72,6 +73,7 @@ type Wiadomosc = {
   odbiorca: Uzytkownik; // Foreign key relation
   tresc: string;
   data_wyslania: string; // ISO datetime string (auto_now_add)
+  przeczytana?: boolean;
 };
 
 // --- Recenzja ---